@@ -3,29 +3,185 @@ Online Admission System with QR Code
 Secure Flask application for collecting admission data
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, url_for, session, redirect
+from flask import Flask, render_template, request, jsonify, send_file, url_for, session, redirect, Response, stream_with_context, g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from sqlalchemy import text, and_, or_, insert, select, literal, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from werkzeug.security import check_password_hash, generate_password_hash
+import click
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
+from PIL import Image, ImageOps
+from concurrent.futures import ThreadPoolExecutor
 import qrcode
+import qrcode.image.svg
 import os
+import re
 import secrets
-from datetime import datetime
-from io import BytesIO
+import shutil
+import sqlite3
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+import tempfile
 import base64
+from urllib.parse import urlencode
+import csv
 import hashlib
-from functools import wraps
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+
+try:
+    import fcntl
+except ImportError:  # Windows: the write-behind submission queue is unavailable
+    fcntl = None
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+try:
+    import brotli
+except ImportError:  # optional; responses are gzip-compressed instead
+    brotli = None
+import gzip
+import json
+import mimetypes
+import time
+from functools import wraps, lru_cache
 
 # Configuration
 app = Flask(__name__)
 app.config['SECRET_KEY'] = secrets.token_hex(32)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///admissions.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///admissions.db')
+# One pooled connection per gthread worker thread, plus headroom for SSE streams
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 16)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 8)),
+    'pool_timeout': 10,
+}
+# Applied to every new SQLite connection, in order (busy_timeout first so the
+# WAL switch itself waits for locks instead of failing)
+app.config['SQLITE_PRAGMAS'] = {
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),  # negative = KiB
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'temp_store': 'MEMORY',
+}
+# Held while applying schema migrations so only one process runs them
+app.config['MIGRATION_LOCK'] = os.environ.get('MIGRATION_LOCK', os.path.join(app.instance_path, 'migrate.lock'))
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max file size
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+app.config['UPLOAD_CHUNK_SIZE'] = 64 * 1024
+# Resumable uploads: pictures sent in chunks to /api/uploads, then referenced
+# by the form through the upload_token that finalizing returns
+app.config['UPLOAD_SESSION_CHUNK_SIZE'] = 256 * 1024  # largest chunk accepted per PUT
+app.config['UPLOAD_SESSION_TTL'] = 24 * 3600  # seconds an unfinished or unclaimed upload is kept
+app.config['IMAGE_SIZES'] = {'thumb': 160, 'medium': 640, 'full': 2048}  # longest edge in pixels
+app.config['IMAGE_QUALITY'] = 85
+app.config['IMAGE_WORKERS'] = 2
+app.config['DERIVATIVE_RETRY_AFTER'] = 3600  # seconds before a picture whose renditions failed is retried on view
+app.config['PICTURE_MAX_AGE'] = 365 * 24 * 3600  # pictures are immutable once stored
+# Releasing a picture tries the exclusive picture lock this many extra times,
+# PICTURE_LOCK_RETRY_DELAY seconds apart, then leaves it to the job runner's sweep
+app.config['PICTURE_LOCK_RETRIES'] = 3
+app.config['PICTURE_LOCK_RETRY_DELAY'] = 0.05
+# Let the front proxy stream pictures: nginx via X-Accel-Redirect (set to the
+# internal location mapped to UPLOAD_FOLDER, e.g. /protected-uploads/) or
+# Apache/lighttpd via X-Sendfile
+app.config['X_ACCEL_REDIRECT_PREFIX'] = os.environ.get('X_ACCEL_REDIRECT_PREFIX')
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+app.config['ADMISSIONS_PAGE_SIZE'] = 50
+app.config['ADMISSIONS_MAX_PAGE_SIZE'] = 200
+app.config['CHANGES_MAX_PAGE_SIZE'] = 500
+app.config['EXPORT_BATCH_SIZE'] = 500  # rows fetched per server-side cursor batch
+app.config['BULK_MAX_IDS'] = 10000
+# Duplicate submissions: reject, merge into the earlier record, flag, or off
+app.config['DUPLICATE_POLICY'] = os.environ.get('DUPLICATE_POLICY', 'flag')
+app.config['DUPLICATE_WINDOW_HOURS'] = int(os.environ.get('DUPLICATE_WINDOW_HOURS', 24))
+app.config['DUPLICATE_PHONE_DIGITS'] = 9  # trailing digits compared, so +20 10... matches 010...
+DUPLICATE_POLICIES = ('reject', 'merge', 'flag', 'off')
+if app.config['DUPLICATE_POLICY'] not in DUPLICATE_POLICIES:
+    raise RuntimeError('DUPLICATE_POLICY must be one of: ' + ', '.join(DUPLICATE_POLICIES))
+# Number of reverse proxies in front of the app that append to X-Forwarded-For.
+# 0 ignores the header; set it only when the app is reachable through the proxy alone.
+app.config['TRUSTED_PROXY_COUNT'] = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+# Submission rate limits: (tokens per second, burst). Generous per IP because
+# everyone at an event may share one NAT address.
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+app.config['RATE_LIMIT_DB'] = os.environ.get('RATE_LIMIT_DB', os.path.join(app.instance_path, 'ratelimit.db'))
+app.config['RATE_LIMIT_PER_IP'] = (
+    float(os.environ.get('RATE_LIMIT_PER_IP_RATE', 5.0)),
+    int(os.environ.get('RATE_LIMIT_PER_IP_BURST', 150)),
+)
+app.config['RATE_LIMIT_GLOBAL'] = (20.0, 100)
+app.config['MAX_CONCURRENT_UPLOADS'] = 16
+app.config['UPLOAD_SLOT_TTL'] = 120  # seconds before a slot held by a crashed worker is reclaimed
+# Write-behind ingestion: journal submissions and group-commit them in batches
+app.config['SUBMISSION_QUEUE_ENABLED'] = os.environ.get('SUBMISSION_QUEUE') == '1'
+app.config['SUBMISSION_JOURNAL_DIR'] = os.environ.get('SUBMISSION_JOURNAL_DIR', 'queue')
+app.config['SUBMISSION_BATCH_SIZE'] = 200
+app.config['SUBMISSION_BATCH_DELAY'] = 0.05  # seconds to let a burst accumulate before committing
+app.config['SUBMISSION_JOURNAL_FSYNC'] = True
+# Compress JSON/HTML/text responses above COMPRESS_MIN_SIZE bytes (br when the
+# brotli package is installed, else gzip). Streams and files are left alone.
+app.config['COMPRESS_ENABLED'] = os.environ.get('COMPRESS', '1') == '1'
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_MIMETYPES'] = {
+    'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript', 'image/svg+xml',
+}
+app.config['COMPRESS_GZIP_LEVEL'] = 6
+app.config['COMPRESS_BROTLI_QUALITY'] = 5
+# Built assets (python build_assets.py) have content-hashed names, so they never change
+app.config['ASSET_MAX_AGE'] = 365 * 24 * 3600
+app.config['QR_CACHE_MAX_AGE'] = 7 * 24 * 3600  # seconds browsers/proxies may reuse /qr.png
+app.config['SSE_POLL_INTERVAL'] = 1.0  # seconds between change-log checks per stream
+app.config['SSE_HEARTBEAT_INTERVAL'] = 15  # seconds of silence before a keep-alive comment
+app.config['SSE_MAX_BACKLOG'] = 500  # changes a stream may lag behind before it is told to resync
+app.config['SSE_MAX_DURATION'] = 300  # seconds before a stream closes and the browser reconnects
+# Each open stream holds a gthread worker thread; past this many per process
+# the stream endpoint answers 503 and the admin page polls instead
+app.config['SSE_MAX_STREAMS'] = int(os.environ.get('SSE_MAX_STREAMS', 4))
+# Each worker flushes its metrics here; /metrics sums every file
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+app.config['METRICS_FLUSH_INTERVAL'] = 5  # seconds
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # optional bearer token for /metrics
+# Admin read responses are cached per data version (the change-log sequence)
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE', '1') == '1'
+app.config['RESPONSE_CACHE_SIZE'] = 512  # entries per process
+app.config['RESPONSE_CACHE_TTL'] = 300  # seconds; only bounds how long superseded entries linger
+app.config['RESPONSE_CACHE_DB'] = os.environ.get('RESPONSE_CACHE_DB')  # optional SQLite file shared by workers
+# Background jobs (exports, bulk deletes, thumbnail backfills, duplicate scans).
+# 'thread' runs them on a pool inside each app process; 'external' leaves them
+# to a separate `flask --app app run-jobs` worker (see Procfile)
+app.config['JOB_RUNNER'] = os.environ.get('JOB_RUNNER', 'thread')
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_RESULT_DIR'] = os.environ.get('JOB_RESULT_DIR', os.path.join(app.instance_path, 'jobs'))
+app.config['JOB_POLL_INTERVAL'] = 1.0  # seconds between checks for queued jobs
+app.config['JOB_HEARTBEAT_INTERVAL'] = 30  # seconds between heartbeats for each running job
+app.config['JOB_STALE_AFTER'] = 300  # seconds without a heartbeat before a running job is retried
+app.config['JOB_MAX_ATTEMPTS'] = 3
+app.config['JOB_RESULT_TTL'] = 24 * 3600  # finished jobs and their files are purged after this
+# Cold tier: admissions archived longer than ARCHIVE_COLD_AFTER_DAYS are moved
+# out of the admission table into admission_archive (`flask archive-cold` or
+# an `archive` job), and pictures only they reference into COLD_FOLDER
+app.config['ARCHIVE_COLD_AFTER_DAYS'] = int(os.environ.get('ARCHIVE_COLD_AFTER_DAYS', 90))
+app.config['ARCHIVE_BATCH_SIZE'] = 500  # rows moved per transaction
+app.config['COLD_FOLDER'] = os.environ.get('COLD_FOLDER', os.path.join(app.config['UPLOAD_FOLDER'], '.cold'))
+# Online backups (`flask backup` or a `backup` job): database snapshots taken
+# with the SQLite backup API, plus a picture pool shared by all snapshots
+app.config['BACKUP_DIR'] = os.environ.get('BACKUP_DIR', os.path.join(app.instance_path, 'backups'))
+app.config['BACKUP_PAGES_PER_STEP'] = 1024  # pages copied per step; locks are released between steps
+app.config['BACKUP_MAX_RESTARTS'] = 3  # writes restart a paged copy; after this many, copy in one step
+app.config['BACKUP_KEEP'] = int(os.environ.get('BACKUP_KEEP', 7))  # snapshots kept; older ones are pruned
+# Database copies are stored as blocks of this many bytes (a multiple of the
+# page size) in a shared pool, so only blocks whose pages changed take new space
+app.config['BACKUP_DB_BLOCK_SIZE'] = 256 * 1024
 
 # Admin credentials (set your admin username/password)
 ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
@@ -33,78 +189,3227 @@ ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'egy$4119')
 ADMIN_PASSWORD_HASH = generate_password_hash(ADMIN_PASSWORD)
 
-# Initialize extensions
-db = SQLAlchemy(app)
-CORS(app)
+class Metrics:
+    """Prometheus-style counters and histograms aggregated across worker processes.
+
+    Each process accumulates in memory and a background thread periodically
+    writes a snapshot to METRICS_DIR/metrics-<pid>-<token>.json; the random
+    token keeps a reused PID (e.g. after a container restart) from
+    overwriting a dead process's totals. Every process holds a flock on its
+    own .lock file for its lifetime. When rendering, snapshots whose lock is
+    free belong to exited processes and are folded into retired.json, so
+    counters stay monotonic when gunicorn recycles workers and the number of
+    files stays bounded.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.help = {}
+        self.buckets = {}
+        self.pid = None
+        self.name = None
+        self.lock_file = None
+
+    def describe(self, name, kind, text, buckets=None):
+        self.help[name] = (kind, text)
+        if buckets:
+            self.buckets[name] = buckets
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.ensure_flusher()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self.buckets.get(name, self.BUCKETS)
+        with self.lock:
+            histogram = self.histograms.setdefault(key, [0] * len(buckets) + [0, 0])
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self.ensure_flusher()
+
+    def ensure_flusher(self):
+        # Started lazily so each forked worker gets its own thread and file
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.name = f"metrics-{self.pid}-{secrets.token_hex(4)}"
+            self.lock_file = None
+        threading.Thread(target=self.flush_loop, name='metrics-flush', daemon=True).start()
+
+    def flush_loop(self):
+        while True:
+            time.sleep(app.config['METRICS_FLUSH_INTERVAL'])
+            try:
+                self.flush()
+            except OSError as exc:
+                app.logger.error(f"Metrics flush failed: {exc}")
+
+    def flush(self):
+        with self.lock:
+            snapshot = {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, values] for (name, labels), values in self.histograms.items()],
+            }
+        self.ensure_flusher()
+        metrics_dir = app.config['METRICS_DIR']
+        os.makedirs(metrics_dir, exist_ok=True)
+        if self.lock_file is None and fcntl is not None:
+            # Locked before it becomes visible, so a free lock always means a dead owner
+            fd, temp_path = tempfile.mkstemp(dir=metrics_dir, prefix='.metrics-')
+            self.lock_file = os.fdopen(fd, 'a')
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+            os.rename(temp_path, os.path.join(metrics_dir, f"{self.name}.lock"))
+        self.write_json(os.path.join(metrics_dir, f"{self.name}.json"), snapshot)
+
+    @staticmethod
+    def write_json(path, data):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.metrics-')
+        with os.fdopen(fd, 'w') as out:
+            json.dump(data, out)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def add_snapshot(counters, histograms, snapshot):
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            total = histograms.setdefault(key, [0] * len(values))
+            histograms[key] = [a + b for a, b in zip(total, values)]
+
+    @staticmethod
+    def read_snapshot(path):
+        try:
+            with open(path) as snapshot_file:
+                return json.load(snapshot_file)
+        except (OSError, ValueError):
+            return None
+
+    def retire_dead(self, metrics_dir):
+        """Fold snapshots of exited processes into retired.json (caller holds the retire lock)
+
+        retired.json lists the snapshots already folded, so a crash between
+        rewriting it and deleting a snapshot never counts that snapshot twice.
+        """
+        retired_path = os.path.join(metrics_dir, 'retired.json')
+        retired = self.read_snapshot(retired_path) or {'counters': [], 'histograms': [], 'folded': []}
+        folded = set(retired['folded'])
+        filenames = [filename for filename in os.listdir(metrics_dir) if filename.startswith('metrics-')]
+        locked = {filename[:-len('.lock')] for filename in filenames if filename.endswith('.lock')}
+        # A snapshot without a lock file predates lock files, so its process is gone too
+        dead = [filename[:-len('.json')] for filename in filenames
+                if filename.endswith('.json') and filename[:-len('.json')] not in locked]
+        for name in locked:
+            with open(os.path.join(metrics_dir, f"{name}.lock"), 'a') as lock_file:
+                try:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # owner is alive
+            dead.append(name)
+        pending = [name for name in dead if name not in folded]
+        if pending:
+            counters, histograms = {}, {}
+            self.add_snapshot(counters, histograms, retired)
+            for name in pending:
+                snapshot = self.read_snapshot(os.path.join(metrics_dir, f"{name}.json"))
+                if snapshot is not None:
+                    self.add_snapshot(counters, histograms, snapshot)
+            existing = {os.path.splitext(filename)[0] for filename in filenames}
+            self.write_json(retired_path, {
+                'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                'histograms': [[name, labels, values] for (name, labels), values in histograms.items()],
+                'folded': sorted((folded & existing) | set(pending)),
+            })
+        for name in dead:
+            for suffix in ('.json', '.lock'):
+                try:
+                    os.remove(os.path.join(metrics_dir, name + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def collect(self):
+        """Sum retired totals and the snapshots of all live processes into (counters, histograms)"""
+        self.flush()
+        counters, histograms = {}, {}
+        metrics_dir = app.config['METRICS_DIR']
+        with open(os.path.join(metrics_dir, '.retire.lock'), 'a') as retire_lock:
+            if fcntl is not None:
+                fcntl.flock(retire_lock.fileno(), fcntl.LOCK_EX)
+                self.retire_dead(metrics_dir)
+            for filename in os.listdir(metrics_dir):
+                if not (filename == 'retired.json' or (filename.startswith('metrics-') and filename.endswith('.json'))):
+                    continue
+                snapshot = self.read_snapshot(os.path.join(metrics_dir, filename))
+                if snapshot is not None:
+                    self.add_snapshot(counters, histograms, snapshot)
+        return counters, histograms
+
+    def render(self, extra_counters=None):
+        """Prometheus text exposition of every metric"""
+        counters, histograms = self.collect()
+        counters.update(extra_counters or {})
+
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs]
+            return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+        lines = []
+        for name in sorted({key[0] for key in counters} | {key[0] for key in histograms}):
+            kind, text_help = self.help.get(name, ('counter', name))
+            lines.append(f"# HELP {name} {text_help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{label_text(labels)} {value}")
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                # Bucket counts are stored cumulatively by observe()
+                for bound, count in zip(self.buckets.get(name, self.BUCKETS), values):
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {values[-1]}")
+                lines.append(f"{name}_sum{label_text(labels)} {values[-2]}")
+                lines.append(f"{name}_count{label_text(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.describe('http_requests_total', 'counter', 'HTTP requests by route, method and status')
+metrics.describe('http_request_duration_seconds', 'histogram', 'HTTP request latency by route')
+metrics.describe('db_queries_total', 'counter', 'SQL statements executed, by route')
+metrics.describe('db_query_seconds_total', 'counter', 'Time spent executing SQL, by route')
+metrics.describe('db_queries_per_request', 'histogram', 'SQL statements per request, by route',
+                 buckets=(1, 2, 5, 10, 20, 50, 100))
+metrics.describe('sqlite_lock_errors_total', 'counter', 'Statements that failed with "database is locked"')
+metrics.describe('upload_bytes_total', 'counter', 'Bytes of picture uploads received')
+metrics.describe('upload_hash_seconds', 'histogram', 'Time spent hashing each upload')
+metrics.describe('qr_render_seconds', 'histogram', 'Time spent rendering an uncached QR code')
+metrics.describe('submission_batch_retries_total', 'counter', 'Write-behind batches retried after a failed commit')
+metrics.describe('rate_limit_hits_total', 'counter', 'Requests admitted by each limiter')
+metrics.describe('rate_limit_rejects_total', 'counter', 'Requests rejected by each limiter')
+metrics.describe('response_cache_requests_total', 'counter', 'Cached admin reads by endpoint and result (hit, shared_hit, miss)')
+metrics.describe('jobs_total', 'counter', 'Background jobs finished, by kind and status')
+metrics.describe('job_duration_seconds', 'histogram', 'Background job run time, by kind')
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_seconds = 0.0
+
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' in g:
+        route = request.endpoint or 'unmatched'
+        metrics.inc('http_requests_total', route=route, method=request.method, status=response.status_code)
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - g.request_started, route=route)
+        metrics.inc('db_queries_total', g.db_queries, route=route)
+        metrics.inc('db_query_seconds_total', g.db_seconds, route=route)
+        metrics.observe('db_queries_per_request', g.db_queries, route=route)
+    return response
+
+
+def negotiate_encoding():
+    """Best content coding the client accepts: br (when available), gzip, or None"""
+    accepted = request.accept_encodings
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_bytes(data, encoding, best=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else app.config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, 9 if best else app.config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+
+@app.after_request
+def compress_response(response):
+    """Compress buffered text responses for clients that accept it"""
+    if (not app.config['COMPRESS_ENABLED']
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in app.config['COMPRESS_MIMETYPES']):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = negotiate_encoding()
+    if encoding is None or len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    response.set_data(compress_bytes(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The bytes differ per coding, so a strong validator would be wrong here
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query_metrics(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_seconds += elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def record_lock_errors(context):
+    conn = context.connection
+    if conn is not None and conn.info.get('query_started'):
+        conn.info['query_started'].pop()
+    if 'database is locked' in str(context.original_exception):
+        metrics.inc('sqlite_lock_errors_total')
+
+
+# Arabic harakat, Quranic marks and tatweel carry no meaning for search
+ARABIC_MARKS = re.compile('[\u0610-\u061a\u0640\u064b-\u065f\u0670\u06d6-\u06ed]')
+ARABIC_LETTER_VARIANTS = str.maketrans({
+    '\u0622': '\u0627',  # alef with madda -> alef
+    '\u0623': '\u0627',  # alef with hamza above -> alef
+    '\u0625': '\u0627',  # alef with hamza below -> alef
+    '\u0671': '\u0627',  # alef wasla -> alef
+    '\u0649': '\u064a',  # alef maksura -> yeh
+    '\u0629': '\u0647',  # teh marbuta -> heh
+})
+
+
+def search_normalize(value):
+    """Fold text for the full-text index: NFKC, case-folded, Arabic variants unified"""
+    if value is None:
+        return None
+    value = unicodedata.normalize('NFKC', value).casefold()
+    return ARABIC_MARKS.sub('', value).translate(ARABIC_LETTER_VARIANTS)
+
+
+PHONE_SEARCH_MIN_DIGITS = 3
+
+
+def phone_search_tokens(value):
+    """Index a phone number as its bare digits plus every suffix of them
+
+    Search terms are prefix matches, so indexing the suffixes lets any run
+    of digits from the middle or the end of the number match, and the local
+    form (without country code or trunk zero) is one of them.
+    """
+    if value is None:
+        return None
+    digits = re.sub(r'\D', '', value)
+    return ' '.join(digits[start:] for start in range(max(len(digits) - PHONE_SEARCH_MIN_DIGITS, 0) + 1))
+
+
+@event.listens_for(Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection according to SQLITE_PRAGMAS.
+
+    Also registers search_normalize() and phone_search_tokens(), used to
+    reindex search_tokens (reindex_search) and to search the cold tier.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    dbapi_connection.create_function('search_normalize', 1, search_normalize, deterministic=True)
+    dbapi_connection.create_function('phone_search_tokens', 1, phone_search_tokens, deterministic=True)
+    cursor = dbapi_connection.cursor()
+    for pragma, value in app.config['SQLITE_PRAGMAS'].items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+# Initialize extensions
+db = SQLAlchemy(app)
+CORS(app)
+
+# Ensure upload folder exists
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+# Thumbnails, normalized copies and picture cleanup run off the request path
+image_executor = ThreadPoolExecutor(max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='images')
+# picture -> monotonic time before which viewing it must not queue renditions
+# again (infinite while a run is pending); per process
+derivative_holds = {}
+derivative_holds_lock = threading.Lock()
+
+IMAGE_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+
+SEARCH_COLUMNS = ['name', 'phone', 'workplace', 'nationality', 'activity', 'notes']
+
+
+def search_values(prefix):
+    """SQL expressions feeding one admission row (new./old.) into the search index
+
+    As released with migration 5 and frozen; migrate_phone_search_tokens
+    replaces the triggers built from it.
+    """
+    values = []
+    for col in SEARCH_COLUMNS:
+        if col == 'phone':
+            # Index phone numbers as bare digits so partial numbers match
+            values.append(f"replace(replace(replace({prefix}phone, ' ', ''), '-', ''), '+', '')")
+        else:
+            values.append(f"search_normalize({prefix}{col})")
+    return ', '.join(values)
+
+
+def create_search_triggers(conn):
+    """Triggers keeping admission_fts in step with the admission table (migrations 5 and 9; frozen)"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    insert_new = f"INSERT INTO admission_fts(rowid, {columns}) VALUES (new.id, {search_values('new.')});"
+    delete_old = (f"INSERT INTO admission_fts(admission_fts, rowid, {columns}) "
+                  f"VALUES ('delete', old.id, {search_values('old.')});")
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS admission_fts_ai AFTER INSERT ON admission BEGIN {insert_new} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS admission_fts_ad AFTER DELETE ON admission BEGIN {delete_old} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS admission_fts_au AFTER UPDATE OF {columns} ON admission "
+        f"BEGIN {delete_old} {insert_new} END"
+    ))
+
+
+def search_document(values):
+    """JSON of one admission's normalized search columns, stored in its search_tokens column
+
+    Phones are indexed as phone_search_tokens, every other column as
+    search_normalize. `values` maps column names to raw values.
+    """
+    return json.dumps({
+        column: phone_search_tokens(values.get(column)) if column == 'phone' else search_normalize(values.get(column))
+        for column in SEARCH_COLUMNS
+    }, ensure_ascii=False)
+
+
+def search_document_sql(prefix):
+    """search_document as an SQL expression, for set-based reindexing from the app"""
+    pairs = [f"'{column}', phone_search_tokens({prefix}{column})" if column == 'phone'
+             else f"'{column}', search_normalize({prefix}{column})"
+             for column in SEARCH_COLUMNS]
+    return f"json_object({', '.join(pairs)})"
+
+
+def search_document_values(prefix):
+    """SQL expressions reading one row's (new./old.) stored search_tokens into the index columns"""
+    return ', '.join(f"json_extract({prefix}search_tokens, '$.{column}')" for column in SEARCH_COLUMNS)
+
+
+def create_search_document_triggers(conn):
+    """Triggers indexing admission.search_tokens in admission_fts
+
+    They use only built-in SQL, so rows written by other tools (the sqlite3
+    shell, scripts) never fail; such rows are searchable once their
+    search_tokens are filled by `flask --app app rebuild-search`.
+    """
+    columns = ', '.join(SEARCH_COLUMNS)
+    insert_new = f"INSERT INTO admission_fts(rowid, {columns}) VALUES (new.id, {search_document_values('new.')});"
+    delete_old = (f"INSERT INTO admission_fts(admission_fts, rowid, {columns}) "
+                  f"VALUES ('delete', old.id, {search_document_values('old.')});")
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS admission_fts_ai AFTER INSERT ON admission BEGIN {insert_new} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS admission_fts_ad AFTER DELETE ON admission BEGIN {delete_old} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS admission_fts_au AFTER UPDATE OF search_tokens ON admission "
+        f"BEGIN {delete_old} {insert_new} END"
+    ))
+
+
+def reindex_search(conn):
+    """Recompute every search_tokens (hot and cold) and rebuild admission_fts from them
+
+    Runs in the caller's transaction with the app's SQL functions; the
+    update trigger is dropped meanwhile so the index is rebuilt once.
+    """
+    columns = ', '.join(SEARCH_COLUMNS)
+    conn.execute(text("DROP TRIGGER IF EXISTS admission_fts_au"))
+    for table in ('admission', 'admission_archive'):
+        conn.execute(text(f"UPDATE {table} SET search_tokens = {search_document_sql('')}"))
+    conn.execute(text("INSERT INTO admission_fts(admission_fts) VALUES ('delete-all')"))
+    conn.execute(text(
+        f"INSERT INTO admission_fts(rowid, {columns}) "
+        f"SELECT id, {search_document_values('')} FROM admission"
+    ))
+    create_search_document_triggers(conn)
+
+
+def create_search_index(conn):
+    """Create the FTS5 index over admissions, its sync triggers, and backfill it"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'admission_fts'"
+    )).first()
+    if exists:
+        return
+
+    # Contentless: the index stores only normalized tokens, not a second copy of the rows
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE admission_fts USING fts5({columns}, content='', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+    create_search_triggers(conn)
+    conn.execute(text(
+        f"INSERT INTO admission_fts(rowid, {columns}) "
+        f"SELECT id, {search_values('')} FROM admission"
+    ))
+
+
+# Summary dimensions and the SQL expression (per row prefix) they group by
+STAT_DIMENSIONS = {
+    'day': "date({p}submission_date)",
+    'status': "{p}status",
+    'nationality': "{p}nationality",
+    'workplace': "{p}workplace",
+    'activity': "{p}activity",
+}
+STAT_TRIGGER_COLUMNS = 'submission_date, status, nationality, workplace, activity, archived'
+
+
+def stat_upserts(prefix, delta):
+    """Trigger statements adding `delta` to every summary bucket of one row"""
+    statements = []
+    for dimension, expr in STAT_DIMENSIONS.items():
+        statements.append(
+            "INSERT INTO admission_stat (dimension, key, archived, count) "
+            f"VALUES ('{dimension}', coalesce({expr.format(p=prefix)}, ''), coalesce({prefix}archived, 0), {delta}) "
+            f"ON CONFLICT (dimension, key, archived) DO UPDATE SET count = count + ({delta});"
+        )
+    return ' '.join(statements)
+
+
+def rebuild_stats(conn):
+    """Recompute the admission_stat summary from the admission and admission_archive tables"""
+    source = 'admission'
+    if conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'admission_archive'")).first():
+        source = (f"(SELECT {STAT_TRIGGER_COLUMNS} FROM admission "
+                  f"UNION ALL SELECT {STAT_TRIGGER_COLUMNS} FROM admission_archive)")
+    conn.execute(text("DELETE FROM admission_stat"))
+    for dimension, expr in STAT_DIMENSIONS.items():
+        conn.execute(text(
+            "INSERT INTO admission_stat (dimension, key, archived, count) "
+            f"SELECT '{dimension}', coalesce({expr.format(p='')}, ''), coalesce(archived, 0), count(*) "
+            f"FROM {source} GROUP BY 2, 3"
+        ))
+
+
+def create_stats_summary(conn):
+    """Create the triggers that keep admission_stat current, and backfill it once"""
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'admission_stat_ai'"
+    )).first()
+    if exists:
+        return
+
+    conn.execute(text(
+        f"CREATE TRIGGER admission_stat_ai AFTER INSERT ON admission BEGIN {stat_upserts('new.', 1)} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER admission_stat_ad AFTER DELETE ON admission BEGIN {stat_upserts('old.', -1)} END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER admission_stat_au AFTER UPDATE OF {STAT_TRIGGER_COLUMNS} ON admission "
+        f"BEGIN {stat_upserts('old.', -1)} {stat_upserts('new.', 1)} END"
+    ))
+    rebuild_stats(conn)
+
+
+def migrate_admission_table(conn):
+    Admission.__table__.create(conn, checkfirst=True)
+
+
+def migrate_admission_columns(conn):
+    """Columns added to admission after the first release"""
+    existing_cols = {row[1] for row in conn.execute(text("PRAGMA table_info(admission)"))}
+    required_cols = {
+        'nationality': "ALTER TABLE admission ADD COLUMN nationality VARCHAR(100) NOT NULL DEFAULT ''",
+        'activity': "ALTER TABLE admission ADD COLUMN activity VARCHAR(200) NOT NULL DEFAULT ''",
+        'picture_hash': "ALTER TABLE admission ADD COLUMN picture_hash VARCHAR(64)",
+        'ip_address': "ALTER TABLE admission ADD COLUMN ip_address VARCHAR(50)",
+        'status': "ALTER TABLE admission ADD COLUMN status VARCHAR(20) DEFAULT 'submitted'",
+        'notes': "ALTER TABLE admission ADD COLUMN notes TEXT",
+        'archived': "ALTER TABLE admission ADD COLUMN archived BOOLEAN DEFAULT 0",
+        'ack_id': "ALTER TABLE admission ADD COLUMN ack_id VARCHAR(32)",
+        'fingerprint': "ALTER TABLE admission ADD COLUMN fingerprint VARCHAR(200)",
+        'duplicate_of': "ALTER TABLE admission ADD COLUMN duplicate_of INTEGER",
+    }
+    for col, ddl in required_cols.items():
+        if col not in existing_cols:
+            conn.execute(text(ddl))
+
+
+def migrate_list_indexes(conn):
+    """Indexes backing the keyset-paginated admissions list"""
+    for ddl in [
+        "CREATE INDEX IF NOT EXISTS ix_admission_date_id ON admission (submission_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_admission_archived_date_id ON admission (archived, submission_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_admission_status_date_id ON admission (status, submission_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_admission_picture ON admission (picture)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_admission_ack_id ON admission (ack_id)",
+    ]:
+        conn.execute(text(ddl))
+
+
+def migrate_change_log(conn):
+    AdmissionChange.__table__.create(conn, checkfirst=True)
+
+
+def migrate_duplicate_indexes(conn):
+    """Duplicate lookups within a time window"""
+    for ddl in [
+        "CREATE INDEX IF NOT EXISTS ix_admission_fingerprint_date ON admission (fingerprint, submission_date)",
+        "CREATE INDEX IF NOT EXISTS ix_admission_picture_hash_date ON admission (picture_hash, submission_date)",
+    ]:
+        conn.execute(text(ddl))
+
+
+def migrate_stats_summary(conn):
+    AdmissionStat.__table__.create(conn, checkfirst=True)
+    create_stats_summary(conn)
+
+
+def migrate_job_table(conn):
+    Job.__table__.create(conn, checkfirst=True)
+
+
+def migrate_admission_autoincrement(conn):
+    """Rebuild admission with AUTOINCREMENT so ids of rows moved to the cold tier are never reused"""
+    ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'admission'")).scalar()
+    if 'AUTOINCREMENT' in ddl.upper():
+        return
+
+    columns = ', '.join(row[1] for row in conn.execute(text("PRAGMA table_info(admission)")))
+    conn.execute(text("ALTER TABLE admission RENAME TO admission_old"))
+    Admission.__table__.create(conn)
+    conn.execute(text(f"INSERT INTO admission ({columns}) SELECT {columns} FROM admission_old"))
+    # Dropping the old table drops its indexes and triggers; recreate them on the new one
+    conn.execute(text("DROP TABLE admission_old"))
+    migrate_list_indexes(conn)
+    migrate_duplicate_indexes(conn)
+    create_search_triggers(conn)
+    create_stats_summary(conn)
+
+
+def migrate_archived_at(conn):
+    """When each admission was archived, backfilled from the change log"""
+    existing_cols = {row[1] for row in conn.execute(text("PRAGMA table_info(admission)"))}
+    if 'archived_at' not in existing_cols:
+        conn.execute(text("ALTER TABLE admission ADD COLUMN archived_at DATETIME"))
+    conn.execute(text(
+        "UPDATE admission SET archived_at = (SELECT max(changed_at) FROM admission_change "
+        "WHERE admission_change.admission_id = admission.id AND action = 'archived') "
+        "WHERE archived = 1 AND archived_at IS NULL"
+    ))
+
+
+def migrate_phone_search_tokens(conn):
+    """Index stored search_tokens, with phones as digit suffixes so partial numbers match
+
+    Replaces the migration 5 triggers, which called the app's Python SQL
+    functions and so failed for writes from any other tool.
+    """
+    for table in ('admission', 'admission_archive'):
+        existing_cols = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+        if 'search_tokens' not in existing_cols:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN search_tokens TEXT"))
+    for trigger in ('admission_fts_ai', 'admission_fts_ad', 'admission_fts_au'):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    reindex_search(conn)
+
+
+def migrate_cold_archive(conn):
+    """Cold-tier table, counted in admission_stat like the hot table"""
+    AdmissionArchive.__table__.create(conn, checkfirst=True)
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS admission_archive_stat_ai AFTER INSERT ON admission_archive "
+        f"BEGIN {stat_upserts('new.', 1)} END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS admission_archive_stat_ad AFTER DELETE ON admission_archive "
+        f"BEGIN {stat_upserts('old.', -1)} END"
+    ))
+
+
+# Ordered schema steps. Append new steps with the next version number and
+# never edit a released one. Steps are idempotent, so databases created
+# before schema_version existed (version 0) replay them all safely.
+MIGRATIONS = [
+    (1, 'admission table', migrate_admission_table),
+    (2, 'admission columns added after the first release', migrate_admission_columns),
+    (3, 'keyset pagination indexes', migrate_list_indexes),
+    (4, 'change log', migrate_change_log),
+    (5, 'full-text search index', create_search_index),
+    (6, 'duplicate detection indexes', migrate_duplicate_indexes),
+    (7, 'statistics summary', migrate_stats_summary),
+    (8, 'background job table', migrate_job_table),
+    (9, 'never reuse admission ids', migrate_admission_autoincrement),
+    (10, 'admission archived_at', migrate_archived_at),
+    (11, 'cold archive table', migrate_cold_archive),
+    (12, 'phone search by partial number', migrate_phone_search_tokens),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version():
+    """Version recorded in schema_version, or 0 for a new or pre-migration database"""
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(text("SELECT max(version) FROM schema_version")).scalar() or 0
+    except OperationalError:
+        return 0
+
+
+def database_is_new():
+    """Whether the database has no admission table yet, so creating the schema is quick"""
+    with db.engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'admission'"
+        )).first() is None
+
+
+def require_current_schema():
+    """Raise unless the database schema is at SCHEMA_VERSION"""
+    current = schema_version()
+    if current < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {current} but this code needs {SCHEMA_VERSION}; "
+            "run `flask --app app migrate` before starting the app"
+        )
+
+
+def migrate():
+    """Bring the database schema up to SCHEMA_VERSION.
+
+    The fast path is a single query. Otherwise an exclusive lock on
+    MIGRATION_LOCK makes one process migrate while the others wait, then
+    each step runs in its own transaction together with its version row.
+    """
+    if schema_version() >= SCHEMA_VERSION:
+        return
+
+    lock_path = app.config['MIGRATION_LOCK']
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        current = schema_version()  # another process may have migrated while we waited
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_version "
+                "(version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at DATETIME NOT NULL)"
+            ))
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            with db.engine.begin() as conn:
+                step(conn)
+                conn.execute(
+                    text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                    {'v': version, 'd': description, 't': datetime.utcnow()},
+                )
+            app.logger.info(f"Applied schema migration {version}: {description}")
+
+
+# Digits with the separators people type inside phone numbers: "+20 100-123"
+PHONE_QUERY_PATTERN = re.compile(r'\+?\d[\d\s().-]*\d|\d')
+
+
+def build_search_query(q):
+    """Turn free text into an FTS5 query: every word must match, as a prefix
+
+    A run of digits and phone separators becomes one digit token, without
+    leading zeros, so "+20 100 123" and "0100 123" match the indexed
+    phone_search_tokens of 201001234567.
+    """
+    return ' '.join(f'"{token}"*' for token in search_tokens(q))
+
+
+def search_tokens(q):
+    """Normalized words of a search, with phone-like runs joined into one digit token"""
+    def join_digits(match):
+        digits = re.sub(r'\D', '', match.group(0))
+        return f" {digits.lstrip('0') or digits} "
+
+    tokens = re.findall(r'\w+', PHONE_QUERY_PATTERN.sub(join_digits, search_normalize(q)))
+    if not tokens:
+        raise ValueError('q must contain at least one word')
+    return tokens
+
+
+def cold_search_clause(q):
+    """Match `q` against admission_archive rows, which have no full-text index.
+
+    Every token must occur in one of the searched columns (or in the
+    phone's digits), so this is a scan of the cold table; it only runs for
+    lists that include archived admissions.
+    """
+    digits = AdmissionArchive.phone
+    for separator in ' -+().':
+        digits = db.func.replace(digits, separator, '')
+    clauses = []
+    for token in search_tokens(q):
+        pattern = '%' + token.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        columns = [db.func.search_normalize(getattr(AdmissionArchive, column)) for column in SEARCH_COLUMNS]
+        clauses.append(or_(*[column.like(pattern, escape='\\') for column in columns + [digits]]))
+    return and_(*clauses)
+
+
+def search_subquery(q):
+    """Admission ids matching `q` with their bm25 rank (lower is better)"""
+    return (text("SELECT rowid AS id, bm25(admission_fts) AS rank FROM admission_fts WHERE admission_fts MATCH :match")
+            .bindparams(match=build_search_query(q))
+            .columns(id=db.Integer, rank=db.Float)
+            .subquery('search'))
+
+
+# Database Model
+class Admission(db.Model):
+    # AUTOINCREMENT: ids of rows moved to admission_archive must not be handed out again
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    workplace = db.Column(db.String(200), nullable=False)
+    nationality = db.Column(db.String(100), nullable=False)
+    activity = db.Column(db.String(200), nullable=False)
+    picture = db.Column(db.String(300), nullable=True)
+    picture_hash = db.Column(db.String(64), nullable=True)
+    submission_date = db.Column(db.DateTime, default=datetime.utcnow)
+    ip_address = db.Column(db.String(50), nullable=True)
+    status = db.Column(db.String(20), default='submitted')  # submitted, verified, approved
+    notes = db.Column(db.Text, nullable=True)
+    archived = db.Column(db.Boolean, default=False)
+    archived_at = db.Column(db.DateTime, nullable=True)
+    ack_id = db.Column(db.String(32), nullable=True, unique=True)  # set when ingested via SubmissionQueue
+    fingerprint = db.Column(db.String(200), nullable=True)  # normalized phone|name, see admission_fingerprint
+    duplicate_of = db.Column(db.Integer, nullable=True)
+    search_tokens = db.Column(db.Text, nullable=True)  # JSON indexed by admission_fts, see search_document
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'phone': self.phone,
+            'workplace': self.workplace,
+            'nationality': self.nationality,
+            'activity': self.activity,
+            'picture': self.picture,
+            'picture_hash': self.picture_hash,
+            'submission_date': self.submission_date.isoformat(),
+            'status': self.status,
+            'archived': self.archived,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
+            'duplicate_of': self.duplicate_of
+        }
+
+
+@event.listens_for(Admission, 'before_insert')
+@event.listens_for(Admission, 'before_update')
+def set_search_tokens(mapper, connection, target):
+    """Keep search_tokens, and so the search index, in step with ORM writes"""
+    target.search_tokens = search_document({column: getattr(target, column) for column in SEARCH_COLUMNS})
+
+
+class AdmissionArchive(db.Model):
+    """Cold tier: admissions archived for ARCHIVE_COLD_AFTER_DAYS, moved here by move_to_cold.
+
+    Same columns as admission plus cold_at, but no secondary indexes and no
+    search entries; rows are read by id and moved back by restore_from_cold.
+    """
+    __tablename__ = 'admission_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    workplace = db.Column(db.String(200), nullable=False)
+    nationality = db.Column(db.String(100), nullable=False)
+    activity = db.Column(db.String(200), nullable=False)
+    picture = db.Column(db.String(300), nullable=True)
+    picture_hash = db.Column(db.String(64), nullable=True)
+    submission_date = db.Column(db.DateTime)
+    ip_address = db.Column(db.String(50), nullable=True)
+    status = db.Column(db.String(20))
+    notes = db.Column(db.Text, nullable=True)
+    archived = db.Column(db.Boolean, default=True)
+    archived_at = db.Column(db.DateTime, nullable=True)
+    ack_id = db.Column(db.String(32), nullable=True)
+    fingerprint = db.Column(db.String(200), nullable=True)
+    duplicate_of = db.Column(db.Integer, nullable=True)
+    search_tokens = db.Column(db.Text, nullable=True)
+    cold_at = db.Column(db.DateTime, nullable=False)
+
+    to_dict = Admission.to_dict
+
+
+# Columns copied between admission and admission_archive
+ARCHIVE_COLUMNS = [column.name for column in Admission.__table__.columns]
+
+
+class AdmissionChange(db.Model):
+    """Append-only change log; the autoincrement id is the change sequence."""
+    __tablename__ = 'admission_change'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    admission_id = db.Column(db.Integer, nullable=False, index=True)
+    action = db.Column(db.String(20), nullable=False)  # created, merged, flagged, archived, unarchived, status, cold, deleted
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class AdmissionStat(db.Model):
+    """Pre-aggregated admission counts, maintained by triggers on admission."""
+    __tablename__ = 'admission_stat'
+
+    dimension = db.Column(db.String(20), primary_key=True)  # day, status, nationality, workplace, activity
+    key = db.Column(db.String(200), primary_key=True)
+    archived = db.Column(db.Boolean, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Job(db.Model):
+    """Background job queued by an admin endpoint and run by JobRunner."""
+    __tablename__ = 'job'
+    __table_args__ = (db.Index('ix_job_status_created', 'status', 'created_at'),)
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # export, bulk, derivatives, duplicates, archive, backup
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON returned by the handler
+    result_file = db.Column(db.String(300), nullable=True)  # relative to JOB_RESULT_DIR
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'result': json.loads(self.result) if self.result else None,
+            'download_url': url_for('download_job_result', job_id=self.id) if self.result_file else None,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+def record_change(admission_id, action):
+    """Add a change-log entry to the current session (committed by the caller)"""
+    db.session.add(AdmissionChange(admission_id=admission_id, action=action))
+
+
+def current_change_seq():
+    """Return the latest change sequence number, or 0 if nothing changed yet"""
+    return db.session.query(db.func.max(AdmissionChange.id)).scalar() or 0
+
+
+def collect_changes(since, limit):
+    """Read up to `limit` change-log entries after `since`.
+
+    Several changes to one admission are coalesced into its latest state.
+    Returns (changes, cursor, has_more) where cursor is the last sequence read.
+    """
+    entries = (AdmissionChange.query
+               .filter(AdmissionChange.id > since)
+               .order_by(AdmissionChange.id.asc())
+               .limit(limit + 1)
+               .all())
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    cursor = entries[-1].id if entries else since
+
+    latest = {}
+    for entry in entries:
+        latest[entry.admission_id] = entry
+    admissions = {adm.id: adm for adm in Admission.query.filter(Admission.id.in_(latest.keys()))}
+    missing = latest.keys() - admissions.keys()
+    if missing:
+        admissions.update((adm.id, adm) for adm in AdmissionArchive.query.filter(AdmissionArchive.id.in_(missing)))
+
+    changes = []
+    for admission_id, entry in sorted(latest.items(), key=lambda item: item[1].id):
+        admission = admissions.get(admission_id)
+        changes.append({
+            'seq': entry.id,
+            'id': admission_id,
+            'action': entry.action if admission else 'deleted',
+            'data': admission.to_dict() if admission else None,
+        })
+    return changes, cursor, has_more
+
+
+class SubmissionQueue:
+    """Durable write-behind queue for form submissions.
+
+    Each process appends validated submissions to its own journal file,
+    held under an exclusive flock, and acknowledges them immediately. A
+    writer thread inserts queued submissions in batches with one commit per
+    batch and truncates the journal once everything in it is committed.
+    Journals whose owner died are replayed on start; ack_id is unique in
+    the admission table, so replaying an entry twice is harmless.
+    """
+
+    JOURNAL_FIELDS = [
+        'name', 'phone', 'workplace', 'nationality', 'activity', 'picture',
+        'picture_hash', 'ip_address', 'submission_date', 'fingerprint', 'duplicate_of',
+    ]
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = []
+        self.journal = None
+        self.thread = None
+
+    def start(self):
+        """Recover orphaned journals, open this process's journal and start the writer (idempotent)"""
+        if fcntl is None:
+            raise RuntimeError('The submission queue requires fcntl (POSIX)')
+        with self.condition:
+            if self.thread is not None:
+                return
+            journal_dir = app.config['SUBMISSION_JOURNAL_DIR']
+            os.makedirs(journal_dir, exist_ok=True)
+            with app.app_context():
+                self.recover(journal_dir)
+
+            path = os.path.join(journal_dir, f"journal-{os.getpid()}-{secrets.token_hex(4)}.jsonl")
+            self.journal = open(path, 'ab')
+            fcntl.flock(self.journal.fileno(), fcntl.LOCK_EX)
+            self.thread = threading.Thread(target=self.run, name='submission-writer', daemon=True)
+            self.thread.start()
+
+    def enqueue(self, record, ack_id=None):
+        """Journal a submission and return its acknowledgment id (the client's submission_id if given)"""
+        entry = {field: record.get(field) for field in self.JOURNAL_FIELDS}
+        entry['ack_id'] = ack_id or uuid.uuid4().hex
+        entry['submission_date'] = (entry['submission_date'] or datetime.utcnow()).isoformat()
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+        with self.condition:
+            if self.thread is None:
+                self.start()
+            self.journal.write(line)
+            self.journal.flush()
+            self.pending.append(entry)
+            self.condition.notify()
+        # fsync outside the lock so concurrent submitters share one disk flush
+        if app.config['SUBMISSION_JOURNAL_FSYNC']:
+            os.fsync(self.journal.fileno())
+        return entry['ack_id']
+
+    def is_pending(self, ack_id):
+        """Whether this process has journaled, but not yet committed, a submission"""
+        with self.condition:
+            return any(entry['ack_id'] == ack_id for entry in self.pending)
+
+    def references(self, picture):
+        """Whether a journal on disk, from any process, holds a submission with this picture"""
+        journal_dir = app.config['SUBMISSION_JOURNAL_DIR']
+        if not os.path.isdir(journal_dir):
+            return False
+        needle = json.dumps(picture).encode('utf-8')
+        for filename in os.listdir(journal_dir):
+            if not (filename.startswith('journal-') and filename.endswith('.jsonl')):
+                continue
+            try:
+                with open(os.path.join(journal_dir, filename), 'rb') as journal:
+                    for line in journal:
+                        if needle in line:
+                            try:
+                                if json.loads(line).get('picture') == picture:
+                                    return True
+                            except ValueError:
+                                continue  # torn write
+            except FileNotFoundError:
+                continue  # replayed and removed meanwhile
+        return False
+
+    def run(self):
+        """Writer loop: commit pending submissions in batches"""
+        with app.app_context():
+            while True:
+                with self.condition:
+                    while not self.pending:
+                        self.condition.wait()
+                time.sleep(app.config['SUBMISSION_BATCH_DELAY'])
+                with self.condition:
+                    batch = self.pending[:app.config['SUBMISSION_BATCH_SIZE']]
+
+                try:
+                    self.write_batch(batch)
+                except Exception as exc:
+                    # Entries stay pending and journaled; retry after a pause
+                    db.session.rollback()
+                    metrics.inc('submission_batch_retries_total')
+                    app.logger.error(f"Submission batch commit failed: {exc}")
+                    time.sleep(1)
+                    continue
+                finally:
+                    db.session.remove()
+
+                with self.condition:
+                    del self.pending[:len(batch)]
+                    if not self.pending:
+                        self.journal.truncate(0)
+
+    def write_batch(self, entries):
+        """Insert journal entries not yet in the database, in one transaction"""
+        ack_ids = [entry['ack_id'] for entry in entries]
+        existing = {ack_id for (ack_id,) in db.session.query(Admission.ack_id).filter(Admission.ack_id.in_(ack_ids))}
+        admissions = []
+        for entry in entries:
+            if entry['ack_id'] in existing:
+                continue
+            fields = dict(entry, submission_date=datetime.fromisoformat(entry['submission_date']))
+            admissions.append(Admission(**fields))
+            existing.add(entry['ack_id'])
+
+        db.session.add_all(admissions)
+        db.session.flush()
+        for admission in admissions:
+            record_change(admission.id, 'created')
+        db.session.commit()
+
+    def recover(self, journal_dir):
+        """Replay journals left behind by processes that exited uncleanly"""
+        for filename in sorted(os.listdir(journal_dir)):
+            if not (filename.startswith('journal-') and filename.endswith('.jsonl')):
+                continue
+            path = os.path.join(journal_dir, filename)
+            with open(path, 'rb') as journal:
+                try:
+                    fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # owned by a live process
+
+                entries = []
+                for line in journal:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break  # torn final write from the crash
+                batch_size = app.config['SUBMISSION_BATCH_SIZE']
+                try:
+                    for start in range(0, len(entries), batch_size):
+                        self.write_batch(entries[start:start + batch_size])
+                except Exception as exc:
+                    # Keep the journal for the next start; committed entries are skipped then
+                    db.session.rollback()
+                    app.logger.error(f"Replaying {filename} failed: {exc}")
+                    continue
+                os.remove(path)
+            if entries:
+                app.logger.info(f"Replayed {len(entries)} journaled submissions from {filename}")
+
+
+submission_queue = SubmissionQueue()
+
+
+@app.before_request
+def start_submission_queue():
+    """Start the queue in serving processes only, on their first request.
+
+    CLI commands (migrate, backup, restore-backup...) never start it, so
+    they never replay journals into the database they are working on.
+    """
+    if app.config['SUBMISSION_QUEUE_ENABLED'] and submission_queue.thread is None:
+        submission_queue.start()
+
+
+def admission_fingerprint(name, phone):
+    """Normalized phone|name key identifying the same person across submissions"""
+    digits = re.sub(r'\D', '', phone or '')
+    phone_key = digits[-app.config['DUPLICATE_PHONE_DIGITS']:]
+    name_key = ' '.join((search_normalize(name) or '').split())
+    return f"{phone_key}|{name_key}"
+
+
+def find_duplicate(fingerprint):
+    """Earliest admission in the duplicate window from the same person (same fingerprint)"""
+    since = datetime.utcnow() - timedelta(hours=app.config['DUPLICATE_WINDOW_HOURS'])
+    return (Admission.query
+            .filter(Admission.fingerprint == fingerprint, Admission.submission_date >= since)
+            .order_by(Admission.submission_date.asc(), Admission.id.asc())
+            .first())
+
+
+def find_shared_picture(picture_hash, fingerprint):
+    """Earliest admission in the duplicate window with the same picture but another fingerprint
+
+    Different people can send the same photo (a shared group picture, a
+    venue's sample image), so this is only ever reported for review.
+    """
+    since = datetime.utcnow() - timedelta(hours=app.config['DUPLICATE_WINDOW_HOURS'])
+    return (Admission.query
+            .filter(Admission.picture_hash == picture_hash,
+                    or_(Admission.fingerprint != fingerprint, Admission.fingerprint.is_(None)),
+                    Admission.submission_date >= since)
+            .order_by(Admission.submission_date.asc(), Admission.id.asc())
+            .first())
+
+
+def backfill_fingerprints(batch_size=1000, progress=None):
+    """Compute fingerprints for admissions stored before they existed"""
+    updated = 0
+    while True:
+        rows = (db.session.query(Admission.id, Admission.name, Admission.phone)
+                .filter(Admission.fingerprint.is_(None))
+                .limit(batch_size)
+                .all())
+        if not rows:
+            return updated
+        db.session.execute(
+            Admission.__table__.update().where(Admission.id == db.bindparam('row_id')),
+            [{'row_id': row.id, 'fingerprint': admission_fingerprint(row.name, row.phone)} for row in rows],
+        )
+        db.session.commit()
+        updated += len(rows)
+        if progress:
+            progress(updated)
+
+
+def find_duplicate_clusters(columns=(Admission.fingerprint,)):
+    """Group all admissions sharing a value in any of `columns`, transitively.
+
+    Uses indexed GROUP BY ... HAVING count > 1 per key plus union-find,
+    so the cost is an index scan per column rather than pairwise
+    comparisons. Returns lists of admission ids, each sorted with the
+    earliest id first. Only fingerprint clusters are duplicates; see
+    find_shared_picture_clusters for pictures.
+    """
+    parent = {}
+
+    def find(item):
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for column in columns:
+        shared = (select(column)
+                  .where(column.isnot(None))
+                  .group_by(column)
+                  .having(db.func.count() > 1))
+        rows = (db.session.query(column, Admission.id)
+                .filter(column.in_(shared))
+                .order_by(column, Admission.id))
+        previous_key = previous_id = None
+        for key, admission_id in rows:
+            if key == previous_key:
+                parent[find(admission_id)] = find(previous_id)
+            previous_key, previous_id = key, admission_id
+
+    clusters = {}
+    for admission_id in parent:
+        clusters.setdefault(find(admission_id), []).append(admission_id)
+    return sorted(sorted(ids) for ids in clusters.values() if len(ids) > 1)
+
+
+def find_shared_picture_clusters(duplicate_clusters):
+    """Admissions sharing a picture across different people, for manual review
+
+    Picture clusters wholly inside one duplicate (fingerprint) cluster are
+    left out: they are the same person resubmitting.
+    """
+    cluster_of = {admission_id: index
+                  for index, ids in enumerate(duplicate_clusters) for admission_id in ids}
+    return [ids for ids in find_duplicate_clusters((Admission.picture_hash,))
+            if len({cluster_of.get(admission_id, -admission_id) for admission_id in ids}) > 1]
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+
+
+def open_picture_lock():
+    """Open UPLOAD_FOLDER/.pictures.lock and flock it shared; closing the file unlocks it.
+
+    Without fcntl the file is returned unlocked.
+    """
+    lock_file = open(os.path.join(app.config['UPLOAD_FOLDER'], '.pictures.lock'), 'a')
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+    return lock_file
+
+
+def try_exclusive_picture_lock():
+    """Take the picture lock exclusively without blocking; returns the locked file or None
+
+    Submissions hold the lock shared while they place pictures, and under a
+    steady stream of them there may be no gap long enough for a blocking
+    exclusive lock, so it is tried PICTURE_LOCK_RETRIES more times and then
+    given up on.
+    """
+    lock_file = open(os.path.join(app.config['UPLOAD_FOLDER'], '.pictures.lock'), 'a')
+    if fcntl is None:
+        return lock_file
+    for attempt in range(app.config['PICTURE_LOCK_RETRIES'] + 1):
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except BlockingIOError:
+            if attempt < app.config['PICTURE_LOCK_RETRIES']:
+                time.sleep(app.config['PICTURE_LOCK_RETRY_DELAY'])
+    lock_file.close()
+    return None
+
+
+def pending_releases_dir():
+    return os.path.join(app.config['UPLOAD_FOLDER'], '.release-pending')
+
+
+def defer_picture_release(entry):
+    """Record a release the picture lock was too busy for; sweep_picture_releases retries it
+
+    entry is {'picture': ...}, plus 'upload_token' when the upload should go
+    back to its session rather than be removed.
+    """
+    directory = pending_releases_dir()
+    os.makedirs(directory, exist_ok=True)
+    key = hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.entry-')
+    with os.fdopen(fd, 'w') as out:
+        json.dump(entry, out)
+    os.replace(temp_path, os.path.join(directory, f'{key}.json'))
+    metrics.inc('picture_releases_deferred_total')
+    if app.config['JOB_RUNNER'] == 'thread':
+        job_runner.start()
+
+
+def sweep_picture_releases():
+    """Retry deferred picture releases; returns how many were attempted
+
+    Each entry is removed before it is retried, so concurrent sweeps never
+    retry one twice; a release that finds the lock busy again records it anew.
+    """
+    directory = pending_releases_dir()
+    if not os.path.isdir(directory):
+        return 0
+    attempted = 0
+    for dir_entry in os.scandir(directory):
+        if not dir_entry.name.endswith('.json'):
+            continue
+        try:
+            with open(dir_entry.path) as f:
+                entry = json.load(f)
+            os.remove(dir_entry.path)
+        except FileNotFoundError:
+            continue  # another sweep took it
+        attempted += 1
+        try:
+            if entry.get('upload_token'):
+                try:
+                    unclaim_upload(entry['upload_token'])
+                    continue
+                except ValueError:
+                    pass  # the session expired; nobody can claim the picture again
+            release_picture(entry['picture'])
+        except OSError as exc:
+            app.logger.error(f"Deferred picture release failed for {entry.get('picture')}: {exc}")
+    return attempted
+
+
+def pin_pictures():
+    """Hold the picture lock shared until this request ends.
+
+    Taken before a picture is placed in storage, so release_picture, which
+    needs the lock exclusively, cannot remove it before the admission
+    referencing it is committed or journaled.
+    """
+    if g.get('picture_pin') is None:
+        g.picture_pin = open_picture_lock()
+
+
+@app.teardown_request
+def unpin_pictures(exc=None):
+    pin = g.pop('picture_pin', None)
+    if pin is not None:
+        pin.close()
+
+
+def picture_referenced(picture):
+    """Whether any admission, hot or cold, or a queued submission references a picture
+
+    Reads through a fresh connection so the caller's session snapshot
+    cannot hide a submission committed since it began.
+    """
+    with db.engine.connect() as conn:
+        for model in (Admission, AdmissionArchive):
+            if conn.execute(select(model.id).where(model.picture == picture).limit(1)).first() is not None:
+                return True
+    return submission_queue.references(picture)
+
+
+def store_upload(file):
+    """Stream an upload to content-addressed storage, hashing it in one pass.
+
+    The file is written in chunks to a temp file while its SHA-256 is
+    computed, then atomically renamed to uploads/ab/cd/<sha256>.<ext>.
+    Identical pictures therefore share one file. Returns (picture, sha256)
+    where picture is the path relative to UPLOAD_FOLDER.
+    """
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    if ext == 'jpeg':
+        ext = 'jpg'
+
+    upload_folder = app.config['UPLOAD_FOLDER']
+    hasher = hashlib.sha256()
+    hash_seconds = 0.0
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(app.config['UPLOAD_CHUNK_SIZE'])
+                if not chunk:
+                    break
+                started = time.perf_counter()
+                hasher.update(chunk)
+                hash_seconds += time.perf_counter() - started
+                size += len(chunk)
+                out.write(chunk)
+        metrics.inc('upload_bytes_total', size)
+        metrics.observe('upload_hash_seconds', hash_seconds)
+
+        validate_image(temp_path)
+
+        picture_hash = hasher.hexdigest()
+        picture = picture_path(picture_hash, ext)
+        filepath = os.path.join(upload_folder, picture)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        # Replacing an existing copy is harmless (same bytes). The pin keeps
+        # a concurrent release_picture from removing the file until this
+        # request has committed or journaled the admission referencing it.
+        pin_pictures()
+        os.replace(temp_path, filepath)
+        return picture, picture_hash
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def picture_path(picture_hash, ext):
+    """Content-addressed location of a picture, relative to UPLOAD_FOLDER"""
+    return os.path.join(picture_hash[:2], picture_hash[2:4], f"{picture_hash}.{ext}")
+
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+SUBMISSION_ID_PATTERN = UPLOAD_ID_PATTERN  # client-generated idempotency key, stored as ack_id
+
+
+def upload_session_paths(upload_id):
+    """(data, metadata) paths of a resumable upload session"""
+    if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+        raise ValueError('Unknown or expired upload')
+    directory = os.path.join(app.config['UPLOAD_FOLDER'], '.sessions')
+    return os.path.join(directory, f'{upload_id}.part'), os.path.join(directory, f'{upload_id}.json')
+
+
+def load_upload_session(upload_id):
+    """Return (data_path, meta_path, meta) of an existing upload session"""
+    data_path, meta_path = upload_session_paths(upload_id)
+    try:
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+    except (FileNotFoundError, ValueError):
+        raise ValueError('Unknown or expired upload')
+    return data_path, meta_path, meta
+
+
+def save_upload_session(meta_path, meta):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(meta_path), prefix='.meta-')
+    with os.fdopen(fd, 'w') as out:
+        json.dump(meta, out)
+    os.replace(temp_path, meta_path)
+
+
+def expire_upload_sessions():
+    """Delete upload sessions untouched for UPLOAD_SESSION_TTL"""
+    directory = os.path.join(app.config['UPLOAD_FOLDER'], '.sessions')
+    cutoff = time.time() - app.config['UPLOAD_SESSION_TTL']
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def claim_upload(upload_token):
+    """Move a finalized upload into content-addressed storage; returns (picture, sha256)
+
+    Claiming is idempotent so a retried submission can present the same
+    token again: the session is kept, marked claimed, until it expires.
+    """
+    data_path, meta_path, meta = load_upload_session(upload_token)
+    picture_hash = meta.get('picture_hash')
+    if not picture_hash:
+        raise ValueError('Upload is not finalized')
+    picture = picture_path(picture_hash, meta['ext'])
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], picture)
+    pin_pictures()
+    if not meta.get('claimed'):
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        try:
+            os.replace(data_path, filepath)
+        except FileNotFoundError:
+            pass  # a concurrent retry claimed it first; the file check below decides
+        else:
+            meta['claimed'] = True
+            save_upload_session(meta_path, meta)
+    if not os.path.exists(filepath):
+        raise ValueError('Upload expired, please upload the picture again')
+    return picture, picture_hash
+
+
+def unclaim_upload(upload_token):
+    """Undo claim_upload after a failed submission, so a retry can claim the picture again
+
+    The picture goes back into the session unless something else references
+    it (identical uploads share one file); then it simply stays in place.
+    While the picture lock is busy the upload stays claimed, which a retry
+    accepts, and the job runner's sweep moves it back later.
+    """
+    data_path, meta_path, meta = load_upload_session(upload_token)
+    if not meta.get('claimed'):
+        return
+    picture = picture_path(meta['picture_hash'], meta['ext'])
+    unpin_pictures()  # this request's submission failed, so its pin protects nothing
+    lock_file = try_exclusive_picture_lock()
+    if lock_file is None:
+        defer_picture_release({'picture': picture, 'upload_token': upload_token})
+        return
+    with lock_file:
+        if picture_referenced(picture):
+            return
+        try:
+            os.replace(os.path.join(app.config['UPLOAD_FOLDER'], picture), data_path)
+        except FileNotFoundError:
+            return
+    meta['claimed'] = False
+    save_upload_session(meta_path, meta)
+
+
+def validate_image(filepath):
+    """Check that an upload is a decodable image in an allowed format"""
+    try:
+        with Image.open(filepath) as img:
+            image_format = img.format
+            img.verify()
+    except (Image.DecompressionBombError, OSError, SyntaxError) as exc:
+        raise ValueError('Uploaded file is not a valid image') from exc
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError('Invalid file format. Allowed: PNG, JPG, JPEG, GIF, WEBP')
+
+
+def derivative_path(picture, size):
+    """Relative path of a resized JPEG rendition of a stored picture"""
+    root, _ = os.path.splitext(picture)
+    return f"{root}_{size}.jpg"
+
+
+def generate_derivatives(upload_folder, picture, sizes, quality):
+    """Write EXIF-rotated, bounded JPEG renditions of a picture for each size.
+
+    Runs on image_executor; existing renditions are left alone so shared
+    pictures are only processed once.
+    """
+    source = os.path.join(upload_folder, picture)
+    pending = {size: os.path.join(upload_folder, derivative_path(picture, size))
+               for size in sizes}
+    pending = {size: path for size, path in pending.items() if not os.path.exists(path)}
+    if not pending:
+        return
+
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, 'white')
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        else:
+            img = img.convert('RGB')
+
+        # Largest rendition first so smaller ones are resized from it
+        for size, path in sorted(pending.items(), key=lambda item: -sizes[item[0]]):
+            img.thumbnail((sizes[size], sizes[size]), Image.LANCZOS)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.derived-')
+            with os.fdopen(fd, 'wb') as out:
+                img.save(out, format='JPEG', quality=quality, optimize=True)
+            os.replace(temp_path, path)
+
+
+def schedule_derivatives(picture):
+    """Queue thumbnail and normalized-copy generation for a stored picture"""
+    with derivative_holds_lock:
+        derivative_holds[picture] = float('inf')
+    future = image_executor.submit(
+        generate_derivatives,
+        app.config['UPLOAD_FOLDER'],
+        picture,
+        dict(app.config['IMAGE_SIZES']),
+        app.config['IMAGE_QUALITY'],
+    )
+    retry_after = app.config['DERIVATIVE_RETRY_AFTER']
+
+    def log_failure(done):
+        with derivative_holds_lock:
+            if done.exception():
+                derivative_holds[picture] = time.monotonic() + retry_after
+            else:
+                derivative_holds.pop(picture, None)
+        if done.exception():
+            app.logger.error(f"Thumbnail generation failed for {picture}: {done.exception()}")
+
+    future.add_done_callback(log_failure)
+
+
+def request_derivatives(picture):
+    """Queue renditions for a picture viewed without them, unless already queued or recently failed"""
+    now = time.monotonic()
+    with derivative_holds_lock:
+        if derivative_holds.get(picture, 0) > now:
+            return
+        for held, until in list(derivative_holds.items()):
+            if until <= now:
+                del derivative_holds[held]
+    schedule_derivatives(picture)
+
+
+def release_picture(picture):
+    """Remove a stored picture and its renditions once nothing references it
+
+    The check and the removal run under the exclusive picture lock, so a
+    submission placing the same picture either has its admission visible
+    to the check or places the file again afterwards. Callers release
+    only after committing, or abandoning, their own submission. When the
+    lock stays busy the release is deferred to the job runner's sweep
+    rather than holding up the caller.
+    """
+    if not picture:
+        return
+    if has_request_context():
+        unpin_pictures()  # a pin held by this request would block the lock below
+    lock_file = try_exclusive_picture_lock()
+    if lock_file is None:
+        defer_picture_release({'picture': picture})
+        return
+    with lock_file:
+        if picture_referenced(picture):
+            return
+        upload_folder = app.config['UPLOAD_FOLDER']
+        paths = [picture] + [derivative_path(picture, size) for size in app.config['IMAGE_SIZES']]
+        filepaths = [os.path.join(upload_folder, path) for path in paths] + [cold_picture_path(picture)]
+        for filepath in filepaths:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+
+def cold_picture_path(picture):
+    """Absolute location of a picture moved to cold storage"""
+    return os.path.join(app.config['COLD_FOLDER'], picture)
+
+
+def locate_picture(picture):
+    """Absolute path of a stored original, hot or cold, or None if it is missing"""
+    for filepath in (os.path.join(app.config['UPLOAD_FOLDER'], picture), cold_picture_path(picture)):
+        if os.path.exists(filepath):
+            return filepath
+    return None
+
+
+def move_picture_to_cold(picture):
+    """Move an original only cold admissions reference to COLD_FOLDER and drop its renditions
+
+    Renditions are regenerated from the original when it is restored.
+    Returns whether the picture was moved.
+    """
+    if Admission.query.filter_by(picture=picture).first() is not None:
+        return False
+    upload_folder = app.config['UPLOAD_FOLDER']
+    source = os.path.join(upload_folder, picture)
+    if not os.path.exists(source):
+        return False
+    target = cold_picture_path(picture)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+    for size in app.config['IMAGE_SIZES']:
+        rendition = os.path.join(upload_folder, derivative_path(picture, size))
+        if os.path.exists(rendition):
+            os.remove(rendition)
+    if Admission.query.filter_by(picture=picture).first() is not None:
+        # A new submission shared the picture while it was being moved
+        move_picture_to_hot(picture)
+        return False
+    return True
+
+
+def move_picture_to_hot(picture):
+    """Bring a cold original back to UPLOAD_FOLDER and queue its renditions"""
+    target = os.path.join(app.config['UPLOAD_FOLDER'], picture)
+    source = cold_picture_path(picture)
+    if os.path.exists(source):
+        if os.path.exists(target):
+            os.remove(source)  # an identical upload already brought it back
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(source, target)
+    if os.path.exists(target):
+        schedule_derivatives(picture)
+
+
+def cleanup_pictures(pictures):
+    """Release pictures left unreferenced by a bulk delete (runs on image_executor)"""
+    with app.app_context():
+        for picture in pictures:
+            try:
+                release_picture(picture)
+            except OSError as exc:
+                app.logger.error(f"Picture cleanup failed for {picture}: {exc}")
+
+
+def get_client_ip():
+    """Get client IP address
+
+    Only the last TRUSTED_PROXY_COUNT X-Forwarded-For entries were added by
+    our own proxies; anything further left is client-supplied and ignored.
+    """
+    trusted = app.config['TRUSTED_PROXY_COUNT']
+    if trusted:
+        chain = [ip.strip()
+                 for header in request.headers.getlist('X-Forwarded-For')
+                 for ip in header.split(',') if ip.strip()]
+        if len(chain) >= trusted:
+            return chain[-trusted]
+    return request.remote_addr
+
+
+def parse_bool_param(value):
+    """Parse a true/false query parameter, returning None when absent or 'all'"""
+    if value is None or value == '' or value.lower() == 'all':
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean value: {value}")
+
+
+def parse_date_param(value, end_of_day=False):
+    """Parse a YYYY-MM-DD or ISO datetime query parameter.
+
+    Plain dates used as an upper bound are shifted to the following day,
+    so the exclusive bound date_to=2026-01-26 includes all of the 26th.
+    """
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            parsed = datetime.strptime(value, '%Y-%m-%d')
+            return parsed + timedelta(days=1) if end_of_day else parsed
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+
+
+def encode_cursor(sort_key, admission_id):
+    """Encode the (sort key, id) keyset position of a row"""
+    key = sort_key.isoformat() if isinstance(sort_key, datetime) else repr(sort_key)
+    raw = f"{key}|{admission_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, key_type=datetime):
+    """Decode a cursor produced by encode_cursor into (sort key, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        key_part, id_part = raw.rsplit('|', 1)
+        key = datetime.fromisoformat(key_part) if key_type is datetime else key_type(key_part)
+        return key, int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def filter_admissions(query, args, model=Admission):
+    """Apply the list-view filters (dates, name, q, archived, status) to a query on `model`
+
+    `model` is Admission or, for the cold tier, AdmissionArchive.
+    """
+    date_from = parse_date_param(args.get('date_from'))
+    date_to = parse_date_param(args.get('date_to'), end_of_day=True)
+    archived = parse_bool_param(args.get('archived'))
+    status = args.get('status', '').strip()
+    name = args.get('name', '').strip()
+    q = args.get('q', '').strip()
+
+    if date_from:
+        query = query.filter(model.submission_date >= date_from)
+    if date_to:
+        query = query.filter(model.submission_date < date_to)
+    if archived is not None:
+        query = query.filter(model.archived == archived)
+    if status:
+        query = query.filter(model.status == status)
+    if name:
+        escaped = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(model.name.ilike(f"%{escaped}%", escape='\\'))
+    if q:
+        if model is Admission:
+            query = query.filter(Admission.id.in_(select(search_subquery(q).c.id)))
+        else:
+            query = query.filter(cold_search_clause(q))
+    return query
+
+
+def admission_source(args, fields):
+    """Subquery of `fields` (plus id and submission_date) for admissions matching the list filters
+
+    Cold admissions in admission_archive are all archived, so they are read
+    through with UNION ALL unless the filter is archived=false; lists,
+    search and exports then see the same rows the stats count.
+    """
+    columns = list(dict.fromkeys(['id', 'submission_date'] + list(fields)))
+    hot = filter_admissions(db.session.query(*[getattr(Admission, column).label(column) for column in columns]), args)
+    if parse_bool_param(args.get('archived')) is False:
+        return hot.subquery('admissions')
+    cold = filter_admissions(db.session.query(*[getattr(AdmissionArchive, column).label(column) for column in columns]),
+                             args, AdmissionArchive)
+    return hot.union_all(cold).subquery('admissions')
+
+
+def paginate_admissions(source, fields, args):
+    """Order an admission_source subquery and fetch one keyset page of `fields`.
+
+    Rows are ordered by (submission_date, id), or by (search rank, id) for
+    order=relevance; cold rows have no rank and come last. Returns (rows,
+    next_cursor), where each row is a tuple of `fields`; next_cursor is None
+    on the last page.
+    """
+    order = args.get('order', 'desc').lower()
+    if order not in ('asc', 'desc', 'relevance'):
+        raise ValueError("order must be 'asc', 'desc' or 'relevance'")
+
+    try:
+        limit = int(args.get('limit', app.config['ADMISSIONS_PAGE_SIZE']))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    limit = max(1, min(limit, app.config['ADMISSIONS_MAX_PAGE_SIZE']))
+
+    query = db.session.query(*[source.c[field] for field in fields])
+    if order == 'relevance':
+        q = args.get('q', '').strip()
+        if not q:
+            raise ValueError("order=relevance requires q")
+        search = search_subquery(q)
+        query = query.outerjoin(search, search.c.id == source.c.id)
+        # bm25 ranks are negative, so 0 sorts unranked cold rows last
+        sort_column, key_type = db.func.coalesce(search.c.rank, 0.0), float
+    else:
+        sort_column, key_type = source.c.submission_date, datetime
+    row_id = source.c.id
+    query = query.add_columns(row_id, sort_column)
+
+    cursor = args.get('cursor')
+    if cursor:
+        cursor_key, cursor_id = decode_cursor(cursor, key_type)
+        if order == 'desc':
+            query = query.filter(or_(
+                sort_column < cursor_key,
+                and_(sort_column == cursor_key, row_id < cursor_id),
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > cursor_key,
+                and_(sort_column == cursor_key, row_id > cursor_id),
+            ))
+
+    if order == 'desc':
+        query = query.order_by(sort_column.desc(), row_id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), row_id.asc())
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        *_, last_id, last_key = rows[limit - 1]
+        next_cursor = encode_cursor(last_key, last_id)
+    return [tuple(row[:-2]) for row in rows[:limit]], next_cursor
+
+
+# Columns served by the list endpoint; the same keys as Admission.to_dict()
+LIST_FIELDS = [
+    'id', 'name', 'phone', 'workplace', 'nationality', 'activity', 'picture',
+    'picture_hash', 'submission_date', 'status', 'archived', 'duplicate_of',
+]
+
+
+def parse_fields_param(value, allowed):
+    """Parse a comma-separated `fields` parameter; defaults to every allowed field"""
+    if not value:
+        return list(allowed)
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise ValueError('fields must be a comma-separated subset of: ' + ', '.join(allowed))
+    return fields
+
+
+def row_dicts(fields, rows):
+    """Map column tuples to dicts, with datetimes as ISO strings"""
+    for row in rows:
+        yield {field: value.isoformat() if isinstance(value, datetime) else value
+               for field, value in zip(fields, row)}
+
+
+if orjson is not None:
+    def dump_json(value):
+        """Encode a value as compact UTF-8 JSON bytes"""
+        return orjson.dumps(value)
+else:
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def dump_json(value):
+        """Encode a value as compact UTF-8 JSON bytes"""
+        return _json_encoder.encode(value).encode('utf-8')
+
+
+EXPORT_FIELDS = [
+    'id', 'name', 'phone', 'workplace', 'nationality', 'activity', 'picture',
+    'picture_hash', 'submission_date', 'ip_address', 'status', 'notes', 'archived',
+]
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class StreamBuffer:
+    """Write-only file object whose contents are drained by a generator.
+
+    zipfile writes to it as an unseekable stream (using data descriptors),
+    so zip archives can be produced chunk by chunk.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_export_rows(source, fields, progress=None):
+    """Yield the given columns of each admission in an admission_source, as a list, batch by batch
+
+    `progress`, if given, is called with the running row count after each batch.
+    """
+    query = (db.session.query(*[source.c[field] for field in fields])
+             .order_by(source.c.submission_date.asc(), source.c.id.asc()))
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+    for count, row in enumerate(query.yield_per(batch_size), 1):
+        yield [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        if progress and count % batch_size == 0:
+            progress(count)
+
+
+def export_csv(rows, fields):
+    """Encode rows as CSV, yielding one chunk per batch"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % app.config['EXPORT_BATCH_SIZE'] == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def export_jsonl(rows, fields):
+    """Encode rows as JSON Lines"""
+    for row in rows:
+        yield dump_json(dict(zip(fields, row))) + b'\n'
+
+
+def xlsx_cell(value):
+    """Render a single inline XLSX cell"""
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    # Drop control characters that are not allowed in XML
+    text_value = ''.join(ch for ch in str(value) if ch >= ' ' or ch in '\t\n\r')
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{xml_escape(text_value)}</t></is></c>'
+
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Admissions" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def export_xlsx(rows, fields):
+    """Encode rows as a minimal XLSX workbook, streamed as a zip archive"""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(('<row>' + ''.join(xlsx_cell(v) for v in fields) + '</row>').encode('utf-8'))
+            for count, row in enumerate(rows, 1):
+                sheet.write(('<row>' + ''.join(xlsx_cell(v) for v in row) + '</row>').encode('utf-8'))
+                if count % app.config['EXPORT_BATCH_SIZE'] == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+EXPORT_ENCODERS = {'csv': export_csv, 'jsonl': export_jsonl, 'xlsx': export_xlsx}
+
+
+def export_zip(source, export_format, fields, size, progress=None):
+    """Stream a zip holding the export file plus one picture rendition per admission
+
+    `source` is an admission_source including the picture column. Cold
+    admissions have no renditions, so their original is bundled.
+    """
+    buffer = StreamBuffer()
+    upload_folder = app.config['UPLOAD_FOLDER']
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(f'admissions.{export_format}', 'w') as data_file:
+            for chunk in EXPORT_ENCODERS[export_format](iter_export_rows(source, fields, progress), fields):
+                data_file.write(chunk)
+                yield buffer.drain()
+
+        pictures = (db.session.query(source.c.id, source.c.picture)
+                    .filter(source.c.picture.isnot(None))
+                    .order_by(source.c.id.asc())
+                    .yield_per(app.config['EXPORT_BATCH_SIZE']))
+        for admission_id, picture in pictures:
+            if progress:
+                progress(None)  # rows are all counted; this only keeps the heartbeat fresh
+            filepath = os.path.join(upload_folder, derivative_path(picture, size))
+            if not os.path.exists(filepath):
+                filepath = locate_picture(picture)
+                if filepath is None:
+                    continue
+            ext = os.path.splitext(filepath)[1]
+            # Images are already compressed; store them as-is
+            archive.write(filepath, f'pictures/{admission_id}{ext}', compress_type=zipfile.ZIP_STORED)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+# Target status -> statuses it may be reached from
+STATUS_TRANSITIONS = {
+    'verified': ['submitted'],
+    'approved': ['verified'],
+}
+
+
+def bulk_selection(payload):
+    """Build the WHERE clause for a bulk operation from `ids` or a `filter` object"""
+    ids = payload.get('ids')
+    filters = payload.get('filter')
+    if ids:
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            raise ValueError('ids must be a list of integers')
+        if len(ids) > app.config['BULK_MAX_IDS']:
+            raise ValueError(f"At most {app.config['BULK_MAX_IDS']} ids per request")
+        return Admission.id.in_(ids)
+    if filters:
+        if not isinstance(filters, dict):
+            raise ValueError('filter must be an object')
+        filters = {key: str(value) for key, value in filters.items()}
+        clause = filter_admissions(db.session.query(Admission.id), filters).whereclause
+        if clause is None:
+            raise ValueError('filter does not match any supported field')
+        return clause
+    raise ValueError('Either ids or a non-empty filter is required')
+
+
+def cold_selection(payload):
+    """Cold admissions a bulk payload selects: its `ids`, or a SELECT of ids for a `filter`
+
+    Expects a payload already validated by bulk_selection.
+    """
+    if payload.get('ids'):
+        return payload['ids']
+    filters = {key: str(value) for key, value in payload.get('filter', {}).items()}
+    return filter_admissions(db.session.query(AdmissionArchive.id), filters, AdmissionArchive).statement
+
+
+def plan_bulk_action(payload):
+    """Validate a bulk payload into (criteria, values, change_action)
+
+    criteria only matches rows whose state the action actually changes;
+    values is None for deletes.
+    """
+    action = payload.get('action')
+    selection = bulk_selection(payload)
+    if action == 'archive':
+        criteria = and_(selection, or_(Admission.archived.is_(False), Admission.archived.is_(None)))
+        return criteria, {'archived': True, 'archived_at': datetime.utcnow()}, 'archived'
+    if action == 'unarchive':
+        return and_(selection, Admission.archived.is_(True)), {'archived': False, 'archived_at': None}, 'unarchived'
+    if action == 'set_status':
+        status = payload.get('status')
+        if status not in STATUS_TRANSITIONS:
+            raise ValueError('status must be one of: ' + ', '.join(STATUS_TRANSITIONS))
+        return and_(selection, Admission.status.in_(STATUS_TRANSITIONS[status])), {'status': status}, 'status'
+    if action == 'delete':
+        return selection, None, 'deleted'
+    raise ValueError('action must be one of: archive, unarchive, set_status, delete')
+
+
+def apply_bulk_action(criteria, values, change_action):
+    """Run a planned bulk action in one transaction.
+
+    Returns (affected, pictures), where pictures are those referenced by
+    deleted rows; the caller releases them once the commit succeeded.
+    """
+    try:
+        # Log the affected rows before the statement changes what criteria matches
+        db.session.execute(insert(AdmissionChange).from_select(
+            ['admission_id', 'action', 'changed_at'],
+            select(Admission.id, literal(change_action), literal(datetime.utcnow(), db.DateTime)).where(criteria),
+        ))
+
+        pictures = []
+        if values is None:
+            pictures = [picture for (picture,) in db.session.query(Admission.picture)
+                        .filter(criteria, Admission.picture.isnot(None))
+                        .distinct()]
+            affected = db.session.query(Admission).filter(criteria).delete(synchronize_session=False)
+        else:
+            affected = db.session.query(Admission).filter(criteria).update(values, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return affected, pictures
+
+
+def flag_duplicate_clusters(clusters, progress=None):
+    """Point later members of each cluster at its earliest admission; returns rows flagged"""
+    flagged = 0
+    for done, ids in enumerate(clusters, 1):
+        criteria = and_(Admission.id.in_(ids[1:]), Admission.duplicate_of.is_(None))
+        db.session.execute(insert(AdmissionChange).from_select(
+            ['admission_id', 'action', 'changed_at'],
+            select(Admission.id, literal('flagged'), literal(datetime.utcnow(), db.DateTime)).where(criteria),
+        ))
+        flagged += (db.session.query(Admission)
+                    .filter(criteria)
+                    .update({'duplicate_of': ids[0]}, synchronize_session=False))
+        if progress:
+            progress(done)
+    db.session.commit()
+    return flagged
+
+
+def cold_candidates(days):
+    """Archived admissions eligible for the cold tier: archived more than `days` ago"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return Admission.query.filter(
+        Admission.archived.is_(True),
+        # Rows archived before archived_at existed fall back to their submission date
+        db.func.coalesce(Admission.archived_at, Admission.submission_date) < cutoff,
+    )
+
+
+def move_to_cold(days=None, progress=None):
+    """Move long-archived admissions to admission_archive, one batch per transaction
+
+    Each batch copies the rows, logs a 'cold' change and deletes them from
+    admission, so writers wait for at most one batch. Pictures no hot
+    admission references are then moved to COLD_FOLDER. Returns
+    (rows moved, pictures moved).
+    """
+    days = app.config['ARCHIVE_COLD_AFTER_DAYS'] if days is None else days
+    batch_size = app.config['ARCHIVE_BATCH_SIZE']
+    total = cold_candidates(days).count()
+    if progress:
+        progress(0, total, force=True)
+
+    moved = pictures_moved = 0
+    while True:
+        ids = [admission_id for (admission_id,) in cold_candidates(days)
+               .with_entities(Admission.id)
+               .order_by(Admission.id)
+               .limit(batch_size)]
+        if not ids:
+            break
+        # Re-checked inside the write transaction in case a row was unarchived meanwhile
+        criteria = and_(Admission.id.in_(ids), Admission.archived.is_(True))
+        now = datetime.utcnow()
+        try:
+            db.session.execute(insert(AdmissionArchive).from_select(
+                ARCHIVE_COLUMNS + ['cold_at'],
+                select(*Admission.__table__.columns, literal(now, db.DateTime)).where(criteria),
+            ))
+            db.session.execute(insert(AdmissionChange).from_select(
+                ['admission_id', 'action', 'changed_at'],
+                select(Admission.id, literal('cold'), literal(now, db.DateTime)).where(criteria),
+            ))
+            pictures = [picture for (picture,) in db.session.query(Admission.picture)
+                        .filter(criteria, Admission.picture.isnot(None))
+                        .distinct()]
+            moved += db.session.query(Admission).filter(criteria).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for picture in pictures:
+            try:
+                pictures_moved += move_picture_to_cold(picture)
+            except OSError as exc:
+                app.logger.error(f"Moving picture {picture} to cold storage failed: {exc}")
+        if progress:
+            progress(moved)
+    return moved, pictures_moved
+
+
+def restore_from_cold(ids):
+    """Move cold admissions back into admission, unarchived; returns how many were restored
+
+    `ids` is a list of ids or a SELECT of them.
+    """
+    archive = AdmissionArchive.__table__
+    criteria = archive.c.id.in_(ids)
+    values = [literal(False, db.Boolean) if column == 'archived'
+              else db.null() if column == 'archived_at'
+              else archive.c[column]
+              for column in ARCHIVE_COLUMNS]
+    try:
+        pictures = [picture for (picture,) in db.session.query(AdmissionArchive.picture)
+                    .filter(criteria, AdmissionArchive.picture.isnot(None))
+                    .distinct()]
+        restored = db.session.execute(insert(Admission).from_select(
+            ARCHIVE_COLUMNS, select(*values).where(criteria))).rowcount
+        if not restored:
+            db.session.rollback()
+            return 0
+        db.session.execute(insert(AdmissionChange).from_select(
+            ['admission_id', 'action', 'changed_at'],
+            select(archive.c.id, literal('unarchived'), literal(datetime.utcnow(), db.DateTime)).where(criteria),
+        ))
+        db.session.execute(archive.delete().where(criteria))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for picture in pictures:
+        try:
+            move_picture_to_hot(picture)
+        except OSError as exc:
+            app.logger.error(f"Restoring picture {picture} from cold storage failed: {exc}")
+    return restored
+
+
+class BackupRestarted(Exception):
+    """Raised from the backup progress callback when writes keep restarting a paged copy"""
+
+
+def backup_database(target_path, progress=None):
+    """Copy the live database to target_path with the SQLite online backup API
+
+    Pages are copied BACKUP_PAGES_PER_STEP at a time and locks are released
+    between steps, so writers never wait for more than one step (in WAL mode
+    they are not blocked at all). A write from another connection restarts
+    the copy; after BACKUP_MAX_RESTARTS restarts the rest is copied in a
+    single step from one read snapshot. The copy is verified with
+    quick_check and switched to a rollback journal so it is a single file.
+    """
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > app.config['BACKUP_MAX_RESTARTS']:
+                raise BackupRestarted()
+        state['remaining'] = remaining
+        if progress:
+            progress(total - remaining, total)
+
+    raw = db.engine.raw_connection()
+    target = sqlite3.connect(target_path)
+    try:
+        source = raw.driver_connection
+        try:
+            source.backup(target, pages=app.config['BACKUP_PAGES_PER_STEP'], progress=step)
+        except BackupRestarted:
+            app.logger.warning(f"Backup restarted {state['restarts']} times by concurrent writes; copying in one step")
+            source.backup(target, pages=-1)
+        target.execute("PRAGMA journal_mode=DELETE")
+        check = target.execute("PRAGMA quick_check").fetchone()[0]
+        if check != 'ok':
+            raise ValueError(f'Backup copy failed its integrity check: {check}')
+    finally:
+        target.close()
+        raw.close()
+    return state['restarts']
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def copy_verified(source, target, expected_hash=None):
+    """Copy a file atomically, checking its SHA-256 against expected_hash on the way
+
+    Raises ValueError (and leaves target untouched) on a mismatch.
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    hasher = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.copy-')
+    try:
+        with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+            for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                hasher.update(chunk)
+                out.write(chunk)
+        if expected_hash and hasher.hexdigest() != expected_hash:
+            raise ValueError(f'{source} does not match its picture_hash')
+        os.replace(temp_path, target)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def snapshot_pictures(snapshot_db):
+    """Distinct (picture, picture_hash, hot) referenced by a database file"""
+    conn = sqlite3.connect(snapshot_db)
+    try:
+        return conn.execute(
+            "SELECT picture, max(picture_hash), max(hot) FROM ("
+            "SELECT picture, picture_hash, 1 AS hot FROM admission WHERE picture IS NOT NULL "
+            "UNION ALL SELECT picture, picture_hash, 0 FROM admission_archive WHERE picture IS NOT NULL"
+            ") GROUP BY picture"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def backup_pictures(snapshot_db, progress=None):
+    """Copy the pictures a snapshot references into the shared pool
+
+    The pool mirrors UPLOAD_FOLDER, whose paths are derived from
+    picture_hash, so a picture already in the pool is unchanged and is not
+    copied again. New copies are checked against picture_hash. Returns
+    (stored, copied, missing, corrupt) where stored lists pool paths.
+    """
+    pool = os.path.join(app.config['BACKUP_DIR'], 'pictures')
+    rows = snapshot_pictures(snapshot_db)
+    if progress:
+        progress(0, len(rows), force=True)
+    stored, missing, corrupt = [], [], []
+    copied = 0
+    for done, (picture, picture_hash, _) in enumerate(rows, 1):
+        target = os.path.join(pool, picture)
+        if not os.path.exists(target):
+            source = locate_picture(picture)
+            if source is None:
+                missing.append(picture)
+                continue
+            try:
+                copy_verified(source, target, picture_hash)
+            except ValueError:
+                corrupt.append(picture)
+                continue
+            copied += 1
+        stored.append(picture)
+        if progress:
+            progress(done)
+    return stored, copied, missing, corrupt
+
+
+def store_db_blocks(db_path):
+    """Split a database copy into BACKUP_DB_BLOCK_SIZE blocks in the shared block pool
+
+    Blocks are named by their SHA-256, so a block whose pages did not change
+    since an earlier snapshot is already in the pool and is not written
+    again. Returns (block hashes in file order, blocks written).
+    """
+    pool = os.path.join(app.config['BACKUP_DIR'], 'db-blocks')
+    size = app.config['BACKUP_DB_BLOCK_SIZE']
+    blocks = []
+    written = 0
+    with open(db_path, 'rb') as source:
+        for block in iter(lambda: source.read(size), b''):
+            digest = hashlib.sha256(block).hexdigest()
+            target = os.path.join(pool, digest[:2], digest)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.block-')
+                with os.fdopen(fd, 'wb') as out:
+                    out.write(block)
+                os.replace(temp_path, target)
+                written += 1
+            blocks.append(digest)
+    return blocks, written
+
+
+def assemble_db_blocks(manifest, target_path):
+    """Rebuild a snapshot's database file from the block pool
+
+    Raises ValueError when a block is missing or the result does not match
+    the manifest checksum.
+    """
+    pool = os.path.join(app.config['BACKUP_DIR'], 'db-blocks')
+    hasher = hashlib.sha256()
+    with open(target_path, 'wb') as out:
+        for digest in manifest['db_blocks']:
+            try:
+                with open(os.path.join(pool, digest[:2], digest), 'rb') as block:
+                    data = block.read()
+            except FileNotFoundError:
+                raise ValueError(f"Backup {manifest['name']} is damaged: database block {digest} is missing")
+            hasher.update(data)
+            out.write(data)
+    if hasher.hexdigest() != manifest['db_sha256']:
+        raise ValueError(f"Backup {manifest['name']} is damaged: database checksum mismatch")
+
+
+def read_backup_manifest(name):
+    """Manifest of a snapshot; raises ValueError for unknown names"""
+    if not re.match(r'^\d{8}T\d{6}Z$', name or ''):
+        raise ValueError('Unknown backup')
+    try:
+        with open(os.path.join(app.config['BACKUP_DIR'], 'snapshots', name, 'manifest.json')) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        raise ValueError('Unknown backup')
+
+
+def list_backups():
+    """Manifests of every complete snapshot, newest first"""
+    directory = os.path.join(app.config['BACKUP_DIR'], 'snapshots')
+    if not os.path.isdir(directory):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        try:
+            manifests.append(read_backup_manifest(name))
+        except ValueError:
+            continue  # partial snapshot or stray file
+    return manifests
+
+
+def prune_backups():
+    """Keep the newest BACKUP_KEEP snapshots and drop pool pictures and database blocks none of them reference"""
+    backup_dir = app.config['BACKUP_DIR']
+    manifests = list_backups()
+    for manifest in manifests[app.config['BACKUP_KEEP']:]:
+        shutil.rmtree(os.path.join(backup_dir, 'snapshots', manifest['name']))
+    kept = manifests[:app.config['BACKUP_KEEP']]
+    referenced = {os.path.normpath(picture) for manifest in kept for picture in manifest['pictures']}
+    referenced_blocks = {os.path.join(digest[:2], digest)
+                         for manifest in kept for digest in manifest.get('db_blocks', ())}
+    removed = 0
+    for pool, keep in ((os.path.join(backup_dir, 'pictures'), referenced),
+                       (os.path.join(backup_dir, 'db-blocks'), referenced_blocks)):
+        for root, _, files in os.walk(pool):
+            for filename in files:
+                path = os.path.join(root, filename)
+                if os.path.relpath(path, pool) not in keep:
+                    os.remove(path)
+                    removed += 1
+    return removed
+
+
+def create_backup(progress=None):
+    """Take a snapshot: database copy, then any pictures not yet in the pool
+
+    The database is copied in full, then kept only as blocks in the block
+    pool, so each snapshot stores just the blocks that changed. Written to a
+    hidden directory and renamed into snapshots/ once complete, so an
+    interrupted backup never looks like a usable one. Returns the snapshot
+    manifest.
+    """
+    started = time.monotonic()
+    created_at = datetime.utcnow()
+    name = created_at.strftime('%Y%m%dT%H%M%SZ')
+    snapshots = os.path.join(app.config['BACKUP_DIR'], 'snapshots')
+    final_dir = os.path.join(snapshots, name)
+    if os.path.exists(final_dir):
+        raise ValueError('A backup was taken less than a second ago')
+    os.makedirs(snapshots, exist_ok=True)
+    partial_dir = tempfile.mkdtemp(dir=snapshots, prefix=f'.{name}-')
+    try:
+        db_path = os.path.join(partial_dir, 'admissions.db')
+        restarts = backup_database(db_path, progress)
+        stored, copied, missing, corrupt = backup_pictures(db_path, progress)
+
+        conn = sqlite3.connect(db_path)
+        try:
+            change_seq = conn.execute("SELECT coalesce(max(id), 0) FROM admission_change").fetchone()[0]
+            admissions = conn.execute("SELECT count(*) FROM admission").fetchone()[0]
+            cold = conn.execute("SELECT count(*) FROM admission_archive").fetchone()[0]
+        finally:
+            conn.close()
+        db_blocks, blocks_written = store_db_blocks(db_path)
+
+        manifest = {
+            'name': name,
+            'created_at': created_at.isoformat(),
+            'schema_version': SCHEMA_VERSION,
+            'change_seq': change_seq,
+            'admissions': admissions,
+            'cold_admissions': cold,
+            'db_bytes': os.path.getsize(db_path),
+            'db_sha256': file_sha256(db_path),
+            'db_blocks': db_blocks,
+            'db_blocks_written': blocks_written,
+            'restarts': restarts,
+            'pictures': stored,
+            'pictures_copied': copied,
+            'pictures_missing': missing,
+            'pictures_corrupt': corrupt,
+            'seconds': round(time.monotonic() - started, 3),
+        }
+        with open(os.path.join(partial_dir, 'manifest.json'), 'w') as out:
+            json.dump(manifest, out, indent=2)
+        os.remove(db_path)
+        os.rename(partial_dir, final_dir)
+    except Exception:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+
+    prune_backups()
+    return manifest
+
+
+def place_file(source, target):
+    """Hard-link a pool file into place (pictures are immutable), copying across filesystems"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.restore-{secrets.token_hex(4)}"
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copy2(source, temp_path)
+    os.replace(temp_path, target)
+
+
+def restore_backup(name):
+    """Replace the database and pictures with a snapshot; the app must be stopped
+
+    The database file is rebuilt from the block pool (snapshots taken
+    before block storage hold it whole), checked against the manifest
+    checksum, then written over the live one with the backup API. Pictures that are
+    missing or differ in size are linked back from the pool, into
+    COLD_FOLDER when only cold admissions reference them. Finally pending
+    migrations run, in case the snapshot predates the current schema.
+    Submission journals are left alone: the first request after the app
+    restarts replays them into the restored database.
+    """
+    manifest = read_backup_manifest(name)
+    if 'db_blocks' not in manifest:
+        snapshot_db = os.path.join(app.config['BACKUP_DIR'], 'snapshots', name, 'admissions.db')
+        if file_sha256(snapshot_db) != manifest['db_sha256']:
+            raise ValueError(f'Backup {name} is damaged: database checksum mismatch')
+        return restore_snapshot_db(manifest, snapshot_db)
+
+    fd, snapshot_db = tempfile.mkstemp(dir=app.config['BACKUP_DIR'], prefix='.restore-', suffix='.db')
+    os.close(fd)
+    try:
+        assemble_db_blocks(manifest, snapshot_db)
+        return restore_snapshot_db(manifest, snapshot_db)
+    finally:
+        os.remove(snapshot_db)
+
+
+def restore_snapshot_db(manifest, snapshot_db):
+    """Write a verified snapshot database over the live one and put its pictures back"""
+    db.engine.dispose()
+    source = sqlite3.connect(snapshot_db)
+    target = sqlite3.connect(db.engine.url.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+    pool = os.path.join(app.config['BACKUP_DIR'], 'pictures')
+    placed = 0
+    for picture, _, hot in snapshot_pictures(snapshot_db):
+        pooled = os.path.join(pool, picture)
+        if not os.path.exists(pooled):
+            continue  # was missing or corrupt when the snapshot was taken
+        target_path = os.path.join(app.config['UPLOAD_FOLDER'], picture) if hot else cold_picture_path(picture)
+        if os.path.exists(target_path) and os.path.getsize(target_path) == os.path.getsize(pooled):
+            continue
+        place_file(pooled, target_path)
+        placed += 1
+
+    # The change sequence went back, so cached responses keyed on it are stale
+    response_cache.clear()
+    migrate()
+    return manifest, placed
+
+
+class JobContext:
+    """Handed to job handlers to report progress and write a downloadable result"""
+
+    REPORT_INTERVAL = 1.0  # seconds between progress writes
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.result_file = None
+        self.last_report = 0.0
+
+    def progress(self, done, total=None, force=False):
+        """Record progress (None: heartbeat only) on the job row"""
+        now = time.monotonic()
+        if not force and now - self.last_report < self.REPORT_INTERVAL:
+            return
+        self.last_report = now
+        values = {'heartbeat_at': datetime.utcnow()}
+        if done is not None:
+            values['progress'] = done
+        if total is not None:
+            values['total'] = total
+        # Own connection, so reporting never commits the handler's session
+        with db.engine.begin() as conn:
+            conn.execute(Job.__table__.update().where(Job.__table__.c.id == self.job_id).values(**values))
+
+    def output_path(self, filename):
+        """Absolute path for the job's downloadable result file"""
+        self.result_file = os.path.join(self.job_id, filename)
+        path = os.path.join(app.config['JOB_RESULT_DIR'], self.result_file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+
+def run_export_job(context, params):
+    """Write an export (same parameters as /api/admissions/export) to a result file"""
+    export_format = params.get('format', 'csv').lower()
+    if export_format not in EXPORT_ENCODERS:
+        raise ValueError('format must be one of: ' + ', '.join(EXPORT_ENCODERS))
+    fields = parse_fields_param(params.get('fields'), EXPORT_FIELDS)
+    pictures = params.get('pictures')
+    source = admission_source(params, fields + ['picture'] if pictures else fields)
+    total = db.session.query(db.func.count()).select_from(source).scalar()
+    context.progress(0, total, force=True)
+
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    if pictures:
+        body = export_zip(source, export_format, fields, pictures, context.progress)
+        filename = f'admissions_{timestamp}.zip'
+    else:
+        body = EXPORT_ENCODERS[export_format](iter_export_rows(source, fields, context.progress), fields)
+        filename = f'admissions_{timestamp}.{export_format}'
+
+    size = 0
+    with open(context.output_path(filename), 'wb') as out:
+        for chunk in body:
+            out.write(chunk)
+            size += len(chunk)
+    return {'rows': total, 'bytes': size}
+
+
+def run_bulk_job(context, params):
+    """Apply a bulk action (same body as /api/admissions/bulk) and release deleted pictures"""
+    plan = plan_bulk_action(params)
+    restored = restore_from_cold(cold_selection(params)) if params.get('action') == 'unarchive' else 0
+    affected, pictures = apply_bulk_action(*plan)
+    affected += restored
+    context.progress(0, len(pictures), force=True)
+    for done, picture in enumerate(pictures, 1):
+        try:
+            release_picture(picture)
+        except OSError as exc:
+            app.logger.error(f"Picture cleanup failed for {picture}: {exc}")
+        context.progress(done)
+    return {'action': params.get('action'), 'affected': affected, 'pictures_checked': len(pictures)}
+
+
+def run_derivatives_job(context, params):
+    """Generate any missing picture renditions, e.g. after IMAGE_SIZES changed"""
+    upload_folder = app.config['UPLOAD_FOLDER']
+    pictures = [picture for (picture,) in db.session.query(Admission.picture)
+                .filter(Admission.picture.isnot(None))
+                .distinct()]
+    db.session.remove()
+    context.progress(0, len(pictures), force=True)
+    missing = 0
+    for done, picture in enumerate(pictures, 1):
+        if os.path.exists(os.path.join(upload_folder, picture)):
+            generate_derivatives(upload_folder, picture, dict(app.config['IMAGE_SIZES']), app.config['IMAGE_QUALITY'])
+        else:
+            missing += 1
+        context.progress(done)
+    return {'pictures': len(pictures), 'missing_sources': missing}
+
+
+def run_duplicates_job(context, params):
+    """Full-table duplicate scan, optionally flagging later members of each cluster"""
+    backfilled = backfill_fingerprints(progress=context.progress)
+    clusters = find_duplicate_clusters()
+    shared_pictures = find_shared_picture_clusters(clusters)
+    context.progress(0, len(clusters), force=True)
+    flagged = flag_duplicate_clusters(clusters, context.progress) if params.get('flag') else 0
+    return {'fingerprints_computed': backfilled, 'clusters': clusters, 'flagged': flagged,
+            'shared_pictures': shared_pictures}
+
+
+def run_archive_job(context, params):
+    """Move admissions archived more than `days` (default ARCHIVE_COLD_AFTER_DAYS) ago to the cold tier"""
+    days = params.get('days')
+    if days is not None and (not isinstance(days, int) or days < 0):
+        raise ValueError('days must be a non-negative integer')
+    moved, pictures = move_to_cold(days, context.progress)
+    return {'moved': moved, 'pictures_moved': pictures}
+
+
+def run_backup_job(context, params):
+    """Take an online backup snapshot (see create_backup)"""
+    manifest = create_backup(context.progress)
+    return {key: value for key, value in manifest.items() if key != 'pictures'}
+
+
+JOB_HANDLERS = {
+    'export': run_export_job,
+    'bulk': run_bulk_job,
+    'derivatives': run_derivatives_job,
+    'duplicates': run_duplicates_job,
+    'archive': run_archive_job,
+    'backup': run_backup_job,
+}
+
+
+class JobRunner:
+    """Claims queued jobs from the job table and runs them on a thread pool.
+
+    Any process may enqueue and any runner may claim: a claim is a single
+    conditional UPDATE, so a job is started once. A heartbeat thread
+    refreshes heartbeat_at of every job this runner is executing, however
+    long a handler goes without reporting progress, so a stale job means
+    its runner died; those are requeued, up to JOB_MAX_ATTEMPTS, then
+    marked failed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.executor = None
+        self.slots = None
+        self.running = set()
+
+    def start(self):
+        """Start the claim loop and its pool (idempotent)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            os.makedirs(app.config['JOB_RESULT_DIR'], exist_ok=True)
+            workers = app.config['JOB_WORKERS']
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs')
+            self.slots = threading.Semaphore(workers)
+            self.thread = threading.Thread(target=self.run, name='job-runner', daemon=True)
+            self.thread.start()
+            threading.Thread(target=self.heartbeat, name='job-heartbeat', daemon=True).start()
+
+    def enqueue(self, kind, params):
+        """Queue a job and return it; starts the in-process runner in thread mode"""
+        job = Job(id=uuid.uuid4().hex, kind=kind, params=json.dumps(params))
+        db.session.add(job)
+        db.session.commit()
+        if app.config['JOB_RUNNER'] == 'thread':
+            self.start()
+            self.wakeup.set()
+        return job
+
+    def run(self):
+        """Claim loop: hand jobs to the pool while it has a free slot"""
+        with app.app_context():
+            last_sweep = 0.0
+            while True:
+                self.slots.acquire()
+                job_id = None
+                try:
+                    if time.monotonic() - last_sweep > 60:
+                        self.sweep()
+                        last_sweep = time.monotonic()
+                    job_id = self.claim()
+                except Exception as exc:
+                    db.session.rollback()
+                    app.logger.error(f"Job claim failed: {exc}")
+                finally:
+                    db.session.remove()
+
+                if job_id is None:
+                    self.slots.release()
+                    self.wakeup.wait(app.config['JOB_POLL_INTERVAL'])
+                    self.wakeup.clear()
+                    continue
+                self.executor.submit(self.execute, job_id)
+
+    def claim(self):
+        """Mark the oldest queued job as running; returns its id, or None"""
+        while True:
+            candidate = (db.session.query(Job.id)
+                         .filter(Job.status == 'queued')
+                         .order_by(Job.created_at.asc())
+                         .first())
+            if candidate is None:
+                return None
+            now = datetime.utcnow()
+            claimed = (Job.query
+                       .filter(Job.id == candidate.id, Job.status == 'queued')
+                       .update({'status': 'running', 'started_at': now, 'heartbeat_at': now,
+                                'attempts': Job.attempts + 1}, synchronize_session=False))
+            db.session.commit()
+            if claimed:
+                return candidate.id
+
+    def heartbeat(self):
+        """Refresh heartbeat_at of the jobs this runner is executing"""
+        with app.app_context():
+            while True:
+                time.sleep(app.config['JOB_HEARTBEAT_INTERVAL'])
+                with self.lock:
+                    job_ids = list(self.running)
+                if not job_ids:
+                    continue
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(Job.__table__.update()
+                                     .where(Job.__table__.c.id.in_(job_ids), Job.__table__.c.status == 'running')
+                                     .values(heartbeat_at=datetime.utcnow()))
+                except Exception as exc:
+                    app.logger.error(f"Job heartbeat failed: {exc}")
+
+    def execute(self, job_id):
+        """Run one claimed job and record its outcome"""
+        started = time.perf_counter()
+        with self.lock:
+            self.running.add(job_id)
+        try:
+            with app.app_context():
+                job = db.session.get(Job, job_id)
+                kind, params = job.kind, json.loads(job.params)
+                db.session.remove()
+                context = JobContext(job_id)
+                try:
+                    result = JOB_HANDLERS[kind](context, params)
+                    values = {'status': 'done', 'result': json.dumps(result), 'result_file': context.result_file,
+                              'progress': db.func.coalesce(Job.total, Job.progress)}
+                except Exception as exc:
+                    db.session.rollback()
+                    app.logger.error(f"Job {job_id} ({kind}) failed: {exc}")
+                    values = {'status': 'failed', 'error': str(exc)}
+                finally:
+                    db.session.remove()
+
+                values['finished_at'] = datetime.utcnow()
+                Job.query.filter(Job.id == job_id).update(values, synchronize_session=False)
+                db.session.commit()
+                db.session.remove()
+                metrics.inc('jobs_total', kind=kind, status=values['status'])
+                metrics.observe('job_duration_seconds', time.perf_counter() - started, kind=kind)
+        except Exception as exc:
+            app.logger.error(f"Recording the outcome of job {job_id} failed: {exc}")
+        finally:
+            with self.lock:
+                self.running.discard(job_id)
+            self.slots.release()
+            self.wakeup.set()
+
+    def sweep(self):
+        """Requeue or fail jobs whose runner went silent, purge expired results and retry deferred picture releases"""
+        sweep_picture_releases()
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=app.config['JOB_STALE_AFTER'])
+        running = Job.query.filter(Job.status == 'running', Job.heartbeat_at < stale)
+        running.filter(Job.attempts < app.config['JOB_MAX_ATTEMPTS']).update(
+            {'status': 'queued'}, synchronize_session=False)
+        running.update({'status': 'failed', 'error': 'Job runner stopped responding', 'finished_at': now},
+                       synchronize_session=False)
+
+        expired = (Job.query
+                   .filter(Job.status.in_(['done', 'failed']),
+                           Job.finished_at < now - timedelta(seconds=app.config['JOB_RESULT_TTL']))
+                   .all())
+        for job in expired:
+            shutil.rmtree(os.path.join(app.config['JOB_RESULT_DIR'], job.id), ignore_errors=True)
+            db.session.delete(job)
+        db.session.commit()
+
+
+job_runner = JobRunner()
+
+
+def job_accepted(job):
+    """202 response pointing the client at a queued job"""
+    status_url = url_for('get_job', job_id=job.id)
+    response = jsonify({'success': True, 'job': job.to_dict(), 'status_url': status_url})
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+
+class RateLimiter:
+    """Token buckets and concurrency slots shared by all worker processes.
+
+    State lives in a small SQLite file separate from the admissions database,
+    so limiter bookkeeping never competes with submission writes. Every
+    decision is one short BEGIN IMMEDIATE transaction. Per-limiter hit and
+    reject counters are kept in the same file for monitoring.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS bucket (name TEXT, key TEXT, tokens REAL, updated_at REAL, PRIMARY KEY (name, key))",
+        "CREATE TABLE IF NOT EXISTS slot (id TEXT PRIMARY KEY, name TEXT, expires_at REAL)",
+        "CREATE TABLE IF NOT EXISTS limiter_stat (name TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, rejects INTEGER DEFAULT 0)",
+    ]
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            path = app.config['RATE_LIMIT_DB']
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # losing limiter state on power loss is harmless
+            for ddl in self.SCHEMA:
+                conn.execute(ddl)
+            self.local.conn = conn
+        return conn
+
+    def count(self, conn, name, allowed):
+        column = 'hits' if allowed else 'rejects'
+        conn.execute(
+            f"INSERT INTO limiter_stat (name, {column}) VALUES (?, 1) "
+            f"ON CONFLICT (name) DO UPDATE SET {column} = {column} + 1",
+            (name,),
+        )
+
+    def consume(self, name, key, rate, capacity):
+        """Take one token from a bucket; returns (allowed, retry_after_seconds)"""
+        conn = self.connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM bucket WHERE name = ? AND key = ?", (name, key)
+            ).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO bucket (name, key, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                (name, key, tokens, now),
+            )
+            self.count(conn, name, allowed)
+            if secrets.randbelow(1000) == 0:
+                # Buckets idle long enough to be full again carry no state
+                conn.execute("DELETE FROM bucket WHERE name = ? AND updated_at < ?", (name, now - capacity / rate))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def acquire_slot(self, name, limit, ttl):
+        """Claim one of `limit` concurrent slots; returns a slot id or None"""
+        conn = self.connection()
+        now = time.time()
+        slot_id = uuid.uuid4().hex
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM slot WHERE name = ? AND expires_at < ?", (name, now))
+            in_use = conn.execute("SELECT count(*) FROM slot WHERE name = ?", (name,)).fetchone()[0]
+            allowed = in_use < limit
+            if allowed:
+                conn.execute("INSERT INTO slot (id, name, expires_at) VALUES (?, ?, ?)", (slot_id, name, now + ttl))
+            self.count(conn, name, allowed)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return slot_id if allowed else None
+
+    def release_slot(self, slot_id):
+        self.connection().execute("DELETE FROM slot WHERE id = ?", (slot_id,))
+
+    def stats(self):
+        """Hit/reject counters per limiter, summed over all workers"""
+        rows = self.connection().execute("SELECT name, hits, rejects FROM limiter_stat ORDER BY name")
+        return {name: {'hits': hits, 'rejects': rejects} for name, hits, rejects in rows}
+
+
+rate_limiter = RateLimiter()
+
+
+def too_many_requests(retry_after):
+    """429 response with a Retry-After header (whole seconds, at least 1)"""
+    response = jsonify({'success': False, 'error': 'Too many submissions, please try again shortly'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+
+def submission_limits(f):
+    """Decorator applying per-IP and global rate limits plus the upload concurrency cap.
+
+    The rate limits run before the request body is parsed, so rejected floods
+    are never buffered. Only submissions that store a picture (a file or an
+    upload token) take an upload slot; text-only forms never wait on one.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not app.config['RATE_LIMIT_ENABLED']:
+            return f(*args, **kwargs)
+
+        rate, burst = app.config['RATE_LIMIT_PER_IP']
+        allowed, retry_after = rate_limiter.consume('submit_per_ip', get_client_ip() or 'unknown', rate, burst)
+        if not allowed:
+            return too_many_requests(retry_after)
+
+        rate, burst = app.config['RATE_LIMIT_GLOBAL']
+        allowed, retry_after = rate_limiter.consume('submit_global', '*', rate, burst)
+        if not allowed:
+            return too_many_requests(retry_after)
+
+        if not stores_picture():
+            return f(*args, **kwargs)
+        slot_id = rate_limiter.acquire_slot('upload_slots', app.config['MAX_CONCURRENT_UPLOADS'], app.config['UPLOAD_SLOT_TTL'])
+        if slot_id is None:
+            return too_many_requests(1)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            rate_limiter.release_slot(slot_id)
+    return decorated_function
+
+
+def stores_picture():
+    """Whether the submission carries a picture file or an upload token"""
+    picture = request.files.get('picture')
+    return bool(picture and picture.filename) or bool(request.form.get('upload_token', '').strip())
+
+
+class ResponseCache:
+    """Admin read responses keyed on path, query string and data version.
+
+    The version is the latest change-log sequence. Every write appends to
+    admission_change in its own transaction, so a write invalidates exactly
+    the entries cached before it, in every worker. Entries live in a
+    per-process LRU and, when RESPONSE_CACHE_DB is set, also in a SQLite
+    file shared by all workers.
+    """
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS entry (key TEXT PRIMARY KEY, body BLOB, mimetype TEXT, expires_at REAL)"
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.counts = {}
+        self.local = threading.local()
 
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            path = app.config['RESPONSE_CACHE_DB']
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a lost cache entry is just a miss
+            conn.execute(self.SCHEMA)
+            self.local.conn = conn
+        return conn
 
-def ensure_schema():
-    """Ensure required columns exist in SQLite database."""
-    try:
-        with db.engine.connect() as conn:
-            result = conn.execute(text("PRAGMA table_info(admission)"))
-            existing_cols = {row[1] for row in result}
-
-            required_cols = {
-                'nationality': "ALTER TABLE admission ADD COLUMN nationality VARCHAR(100) NOT NULL DEFAULT ''",
-                'activity': "ALTER TABLE admission ADD COLUMN activity VARCHAR(200) NOT NULL DEFAULT ''",
-                'picture_hash': "ALTER TABLE admission ADD COLUMN picture_hash VARCHAR(64)",
-                'ip_address': "ALTER TABLE admission ADD COLUMN ip_address VARCHAR(50)",
-                'status': "ALTER TABLE admission ADD COLUMN status VARCHAR(20) DEFAULT 'submitted'",
-                'notes': "ALTER TABLE admission ADD COLUMN notes TEXT",
-                'archived': "ALTER TABLE admission ADD COLUMN archived BOOLEAN DEFAULT 0",
-            }
+    def get(self, key):
+        """Return ((body, mimetype), result) where result is hit, shared_hit or miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return value, 'hit'
+                del self.entries[key]
 
-            for col, ddl in required_cols.items():
-                if col not in existing_cols:
-                    conn.execute(text(ddl))
-    except Exception as exc:
-        app.logger.error(f"Schema check failed: {exc}")
+        if app.config['RESPONSE_CACHE_DB']:
+            row = self.connection().execute(
+                "SELECT body, mimetype FROM entry WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            if row is not None:
+                self.store_local(key, (row[0], row[1]))
+                return (row[0], row[1]), 'shared_hit'
+        return None, 'miss'
 
+    def put(self, key, value):
+        self.store_local(key, value)
+        if app.config['RESPONSE_CACHE_DB']:
+            now = time.time()
+            conn = self.connection()
+            conn.execute("INSERT OR REPLACE INTO entry (key, body, mimetype, expires_at) VALUES (?, ?, ?, ?)",
+                         (key, value[0], value[1], now + app.config['RESPONSE_CACHE_TTL']))
+            if secrets.randbelow(100) == 0:
+                conn.execute("DELETE FROM entry WHERE expires_at < ?", (now,))
 
-# Database Model
-class Admission(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(20), nullable=False)
-    workplace = db.Column(db.String(200), nullable=False)
-    nationality = db.Column(db.String(100), nullable=False)
-    activity = db.Column(db.String(200), nullable=False)
-    picture = db.Column(db.String(300), nullable=True)
-    picture_hash = db.Column(db.String(64), nullable=True)
-    submission_date = db.Column(db.DateTime, default=datetime.utcnow)
-    ip_address = db.Column(db.String(50), nullable=True)
-    status = db.Column(db.String(20), default='submitted')  # submitted, verified, approved
-    notes = db.Column(db.Text, nullable=True)
-    archived = db.Column(db.Boolean, default=False)
+    def clear(self):
+        """Drop every entry, local and shared"""
+        with self.lock:
+            self.entries.clear()
+        if app.config['RESPONSE_CACHE_DB']:
+            self.connection().execute("DELETE FROM entry")
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'phone': self.phone,
-            'workplace': self.workplace,
-            'nationality': self.nationality,
-            'activity': self.activity,
-            'picture': self.picture,
-            'submission_date': self.submission_date.isoformat(),
-            'status': self.status,
-            'archived': self.archived
-        }
+    def store_local(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + app.config['RESPONSE_CACHE_TTL'], value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > app.config['RESPONSE_CACHE_SIZE']:
+                self.entries.popitem(last=False)
 
+    def record(self, endpoint, result):
+        with self.lock:
+            counts = self.counts.setdefault(endpoint, {'hit': 0, 'shared_hit': 0, 'miss': 0})
+            counts[result] += 1
+        metrics.inc('response_cache_requests_total', endpoint=endpoint, result=result)
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    def stats(self):
+        """Entry count and per-endpoint hit/miss counters for this process"""
+        with self.lock:
+            endpoints = {}
+            for endpoint, counts in self.counts.items():
+                served = sum(counts.values())
+                endpoints[endpoint] = dict(counts, hit_ratio=round((counts['hit'] + counts['shared_hit']) / served, 3))
+            return {'entries': len(self.entries), 'shared': bool(app.config['RESPONSE_CACHE_DB']), 'endpoints': endpoints}
 
 
-def get_client_ip():
-    """Get client IP address"""
-    if request.headers.getlist("X-Forwarded-For"):
-        return request.headers.getlist("X-Forwarded-For")[0]
-    return request.remote_addr
+response_cache = ResponseCache()
+
+
+def cached_response(f):
+    """Decorator serving a GET view from response_cache until the admission data changes.
+
+    Only 200 responses are stored; X-Cache reports HIT or MISS.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not app.config['RESPONSE_CACHE_ENABLED']:
+            return f(*args, **kwargs)
+
+        # Read the version before the data, so an entry is never newer-keyed than its contents
+        version = current_change_seq()
+        key = f"{version}|{request.path}|{urlencode(sorted(request.args.items(multi=True)))}"
+        cached, result = response_cache.get(key)
+        response_cache.record(request.endpoint, result)
+        if cached is not None:
+            body, mimetype = cached
+            response = app.response_class(body, mimetype=mimetype)
+        else:
+            response = app.make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                response_cache.put(key, (response.get_data(), response.mimetype))
+        response.headers['X-Cache'] = 'MISS' if cached is None else 'HIT'
+        return response
+    return decorated_function
 
 
 def login_required(f):
@@ -117,43 +3422,91 @@ def login_required(f):
     return decorated_function
 
 
-def generate_qr_code(data):
-    """Generate QR code as base64 image"""
-    try:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
+QR_CACHE_SIZE = 64
+QR_MAX_BOX_SIZE = 40
+QR_MAX_BORDER = 10
+
 
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr_code(data, image_format='png', box_size=10, border=4):
+    """Render a QR code to image bytes, cached per data and QR parameters.
+
+    Returns (content, etag) where etag is the SHA-256 of the content.
+    """
+    started = time.perf_counter()
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    if image_format == 'svg':
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        img.save(buffer)
+    else:
         img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64
-        buffer = BytesIO()
         img.save(buffer, format='PNG')
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        return img_base64
+    content = buffer.getvalue()
+    metrics.observe('qr_render_seconds', time.perf_counter() - started)
+    return content, hashlib.sha256(content).hexdigest()
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def qr_code_base64(data):
+    """Base64-encoded PNG QR code, cached per data"""
+    content, _ = render_qr_code(data)
+    return base64.b64encode(content).decode()
+
+
+def generate_qr_code(data):
+    """Generate QR code as base64 image"""
+    try:
+        return qr_code_base64(data)
     except Exception as e:
         app.logger.error(f"QR generation failed: {str(e)}")
         return None
 
 
+def get_form_url():
+    """Absolute URL of the admission form for the current host"""
+    # Handle both local and Replit URLs
+    if request.host_url:
+        return request.host_url.rstrip('/') + url_for('admission_form')
+    return url_for('admission_form', _external=True)
+
+
+def qr_code_response(image_format, mimetype):
+    """Serve the form QR code with a strong ETag and long-lived caching"""
+    try:
+        box_size = min(max(int(request.args.get('box_size', 10)), 1), QR_MAX_BOX_SIZE)
+        border = min(max(int(request.args.get('border', 4)), 0), QR_MAX_BORDER)
+    except ValueError:
+        return jsonify({'error': 'box_size and border must be integers'}), 400
+
+    try:
+        content, etag = render_qr_code(get_form_url(), image_format, box_size, border)
+    except Exception as e:
+        app.logger.error(f"QR generation failed: {str(e)}")
+        return jsonify({'error': 'QR Code generation temporarily unavailable'}), 500
+
+    response = Response(content, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['QR_CACHE_MAX_AGE']
+    response.vary.add('Host')
+    return response.make_conditional(request)
+
+
 @app.route('/')
 def index():
     """Main page with QR code"""
     try:
         # Generate QR code pointing to the form
-        # Handle both local and Replit URLs
-        if request.host_url:
-            form_url = request.host_url.rstrip('/') + url_for('admission_form')
-        else:
-            form_url = url_for('admission_form', _external=True)
-        
+        form_url = get_form_url()
         qr_code = generate_qr_code(form_url)
         
         return render_template('index.html', qr_code=qr_code, form_url=form_url)
@@ -164,10 +3517,88 @@ def index():
         return render_template('index.html', qr_code=None, form_url=form_url, error="QR Code generation temporarily unavailable")
 
 
+@app.route('/qr.png')
+def qr_code_png():
+    """Form QR code as a PNG image"""
+    return qr_code_response('png', 'image/png')
+
+
+@app.route('/qr.svg')
+def qr_code_svg():
+    """Form QR code as an SVG image"""
+    return qr_code_response('svg', 'image/svg+xml')
+
+
+@lru_cache(maxsize=1)
+def asset_manifest():
+    """Source name -> built file name, from static/dist/manifest.json (empty if not built)"""
+    try:
+        with open(os.path.join(app.static_folder, 'dist', 'manifest.json')) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return {}
+
+
+@app.template_global()
+def asset_url(name):
+    """URL of a static asset: the hashed build when there is one, else the source file"""
+    built = asset_manifest().get(name)
+    if built and not app.debug:
+        return url_for('hashed_asset', filename=built)
+    return url_for('static', filename=name)
+
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    """Serve a built asset, precompressed when the client accepts it, cached forever"""
+    path = safe_join(os.path.join(app.static_folder, 'dist'), filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'Not found'}), 404
+
+    encoding = negotiate_encoding()
+    suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+    if suffix and not os.path.isfile(path + suffix):
+        encoding = 'gzip' if os.path.isfile(path + '.gz') and 'gzip' in request.accept_encodings else None
+        suffix = '.gz' if encoding else None
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response = send_file(path + suffix if encoding else path, mimetype=mimetype,
+                         conditional=True, max_age=app.config['ASSET_MAX_AGE'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+# template -> rendered page and its compressed variants
+PAGE_CACHE = {}
+
+
+def cached_page(template):
+    """Serve a template that has no per-request data, rendered and compressed once per process"""
+    page = PAGE_CACHE.get(template)
+    if page is None or app.debug:
+        body = render_template(template).encode('utf-8')
+        page = {'etag': hashlib.sha256(body).hexdigest()[:32], None: body}
+        for encoding in ('gzip', 'br') if brotli is not None else ('gzip',):
+            page[encoding] = compress_bytes(body, encoding, best=True)
+        PAGE_CACHE[template] = page
+
+    encoding = negotiate_encoding() if app.config['COMPRESS_ENABLED'] else None
+    response = app.response_class(page[encoding], mimetype='text/html')
+    response.set_etag(f"{page['etag']}-{encoding}" if encoding else page['etag'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @app.route('/admission-form')
 def admission_form():
     """Admission form page"""
-    return render_template('admission_form.html')
+    return cached_page('admission_form.html')
 
 
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -197,13 +3628,43 @@ def admin_logout():
 @login_required
 def admin_dashboard():
     """Admin dashboard to view admissions"""
-    return render_template('admin.html')
+    return cached_page('admin.html')
 
 
 @app.route('/api/submit-admission', methods=['POST'])
+@submission_limits
 def submit_admission():
-    """Handle admission form submission"""
+    """Handle admission form submission
+
+    An optional submission_id (32 hex characters, generated by the client
+    once per form) makes the request safe to retry: it is stored as the
+    admission's ack_id, and a replay returns the admission it created.
+    """
+    picture_filename = None
+    upload_token = None
     try:
+        submission_id = request.form.get('submission_id', '').strip() or None
+        if submission_id and not SUBMISSION_ID_PATTERN.match(submission_id):
+            return jsonify({'success': False, 'error': 'Invalid submission_id'}), 400
+        if submission_id:
+            replayed = Admission.query.filter_by(ack_id=submission_id).first()
+            if replayed is not None:
+                return jsonify({
+                    'success': True,
+                    'message': 'Your admission form has been submitted successfully!',
+                    'admission_id': replayed.id,
+                    'replayed': True,
+                    'data': replayed.to_dict()
+                }), 200
+            if app.config['SUBMISSION_QUEUE_ENABLED'] and submission_queue.is_pending(submission_id):
+                return jsonify({
+                    'success': True,
+                    'message': 'Your admission form has been submitted successfully!',
+                    'admission_id': None,
+                    'ack_id': submission_id,
+                    'replayed': True,
+                }), 202
+
         # Validate required fields
         name = request.form.get('name', '').strip()
         phone = request.form.get('phone', '').strip()
@@ -231,44 +3692,98 @@ def submit_admission():
         if len(activity) < 2:
             return jsonify({'success': False, 'error': 'Invalid activity'}), 400
 
-        # Handle image upload
-        picture_filename = None
+        # Handle image upload, either finished through /api/uploads or sent inline
         picture_hash = None
+        upload_token = request.form.get('upload_token', '').strip()
 
-        if 'picture' in request.files:
+        if upload_token:
+            try:
+                picture_filename, picture_hash = claim_upload(upload_token)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        elif 'picture' in request.files:
             file = request.files['picture']
             if file and file.filename and allowed_file(file.filename):
-                # Generate secure filename
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                filename = secure_filename(file.filename)
-                picture_filename = timestamp + filename
-
-                # Save file
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], picture_filename)
-                file.save(filepath)
-
-                # Calculate file hash
-                with open(filepath, 'rb') as f:
-                    picture_hash = hashlib.sha256(f.read()).hexdigest()
+                try:
+                    picture_filename, picture_hash = store_upload(file)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': str(e)}), 400
 
             elif file and file.filename:
                 return jsonify({'success': False, 'error': 'Invalid file format. Allowed: PNG, JPG, JPEG, GIF, WEBP'}), 400
 
+        record = {
+            'name': name,
+            'phone': phone,
+            'workplace': workplace,
+            'nationality': nationality,
+            'activity': activity,
+            'picture': picture_filename,
+            'picture_hash': picture_hash,
+            'ip_address': get_client_ip(),
+            'fingerprint': admission_fingerprint(name, phone),
+            'ack_id': submission_id,
+        }
+
+        policy = app.config['DUPLICATE_POLICY']
+        duplicate = find_duplicate(record['fingerprint']) if policy != 'off' else None
+        if duplicate is None and picture_hash and policy != 'off':
+            shared = find_shared_picture(picture_hash, record['fingerprint'])
+            if shared is not None:
+                # Not the same person, so never merged or rejected; just surfaced
+                metrics.inc('duplicate_picture_reviews_total')
+                app.logger.warning(f"Submission from {record['ip_address']} reuses the picture of admission {shared.id} under another name/phone")
+        if duplicate and policy == 'reject':
+            release_picture(picture_filename)
+            return jsonify({
+                'success': False,
+                'error': 'This submission was already received',
+                'duplicate_of': duplicate.id,
+            }), 409
+        if duplicate and policy == 'merge':
+            previous_picture = duplicate.picture
+            for field in ('name', 'phone', 'workplace', 'nationality', 'activity', 'fingerprint'):
+                setattr(duplicate, field, record[field])
+            if picture_filename:
+                duplicate.picture = picture_filename
+                duplicate.picture_hash = picture_hash
+            record_change(duplicate.id, 'merged')
+            db.session.commit()
+            if picture_filename and previous_picture != picture_filename:
+                release_picture(previous_picture)
+                schedule_derivatives(picture_filename)
+            return jsonify({
+                'success': True,
+                'message': 'Your earlier submission has been updated',
+                'admission_id': duplicate.id,
+                'merged': True,
+                'data': duplicate.to_dict()
+            }), 200
+        if duplicate:
+            record['duplicate_of'] = duplicate.id
+
+        if app.config['SUBMISSION_QUEUE_ENABLED']:
+            ack_id = submission_queue.enqueue(record, submission_id)
+            if picture_filename:
+                schedule_derivatives(picture_filename)
+            return jsonify({
+                'success': True,
+                'message': 'Your admission form has been submitted successfully!',
+                'admission_id': None,
+                'ack_id': ack_id,
+            }), 202
+
         # Create admission record
-        admission = Admission(
-            name=name,
-            phone=phone,
-            workplace=workplace,
-            nationality=nationality,
-            activity=activity,
-            picture=picture_filename,
-            picture_hash=picture_hash,
-            ip_address=get_client_ip()
-        )
+        admission = Admission(**record)
 
         db.session.add(admission)
+        db.session.flush()
+        record_change(admission.id, 'created')
         db.session.commit()
 
+        if picture_filename:
+            schedule_derivatives(picture_filename)
+
         return jsonify({
             'success': True,
             'message': 'Your admission form has been submitted successfully!',
@@ -278,52 +3793,619 @@ def submit_admission():
 
     except Exception as e:
         db.session.rollback()
+        try:
+            if upload_token and picture_filename:
+                unclaim_upload(upload_token)  # keep the token usable for the client's retry
+            else:
+                release_picture(picture_filename)
+        except (OSError, ValueError) as exc:
+            app.logger.error(f"Cleaning up after a failed submission failed: {exc}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable picture upload
+
+    JSON body: {"filename": "photo.jpg", "size": <bytes>}. Chunks are then
+    sent with PUT /api/uploads/<id>?offset=<n>, and POST
+    /api/uploads/<id>/finalize returns the upload_token that the form
+    submits instead of the file.
+    """
+    if app.config['RATE_LIMIT_ENABLED']:
+        rate, burst = app.config['RATE_LIMIT_PER_IP']
+        allowed, retry_after = rate_limiter.consume('upload_per_ip', get_client_ip() or 'unknown', rate, burst)
+        if not allowed:
+            return too_many_requests(retry_after)
+
+    payload = request.get_json(silent=True) or {}
+    filename = str(payload.get('filename') or '')
+    size = payload.get('size')
+    max_size = app.config['MAX_CONTENT_LENGTH']
+    if not allowed_file(filename):
+        return jsonify({'success': False, 'error': 'Invalid file format. Allowed: PNG, JPG, JPEG, GIF, WEBP'}), 400
+    if not isinstance(size, int) or isinstance(size, bool) or not 0 < size <= max_size:
+        return jsonify({'success': False, 'error': f'size must be between 1 and {max_size} bytes'}), 400
+
+    ext = filename.rsplit('.', 1)[1].lower()
+    upload_id = uuid.uuid4().hex
+    data_path, meta_path = upload_session_paths(upload_id)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    if secrets.randbelow(50) == 0:
+        expire_upload_sessions()
+    open(data_path, 'wb').close()
+    save_upload_session(meta_path, {'ext': 'jpg' if ext == 'jpeg' else ext, 'size': size})
+
+    return jsonify({
+        'success': True,
+        'upload_id': upload_id,
+        'offset': 0,
+        'size': size,
+        'chunk_size': app.config['UPLOAD_SESSION_CHUNK_SIZE'],
+    }), 201
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Bytes received so far, so an interrupted client knows where to resume"""
+    try:
+        data_path, _, meta = load_upload_session(upload_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    return jsonify({
+        'upload_id': upload_id,
+        'offset': os.path.getsize(data_path),
+        'size': meta['size'],
+        'finalized': bool(meta.get('picture_hash')),
+    })
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Append the request body at `offset`
+
+    The body is streamed to disk UPLOAD_CHUNK_SIZE bytes at a time. A
+    retried or out-of-order chunk gets 409 with the offset to resume from.
+    """
+    try:
+        data_path, _, meta = load_upload_session(upload_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    if meta.get('picture_hash'):
+        return jsonify({'success': False, 'error': 'Upload is already finalized'}), 409
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'offset must be an integer'}), 400
+    length = request.content_length
+    if not length or length > app.config['UPLOAD_SESSION_CHUNK_SIZE']:
+        return jsonify({'success': False, 'error': f"Chunks must be 1 to {app.config['UPLOAD_SESSION_CHUNK_SIZE']} bytes"}), 400
+
+    slot_id = None
+    if app.config['RATE_LIMIT_ENABLED']:
+        slot_id = rate_limiter.acquire_slot('upload_slots', app.config['MAX_CONCURRENT_UPLOADS'], app.config['UPLOAD_SLOT_TTL'])
+        if slot_id is None:
+            return too_many_requests(1)
+    received = 0
+    try:
+        with open(data_path, 'r+b') as out:
+            if fcntl is not None:
+                fcntl.flock(out.fileno(), fcntl.LOCK_EX)
+            current = os.fstat(out.fileno()).st_size
+            if offset != current:
+                return jsonify({'success': False, 'error': 'Offset mismatch', 'offset': current}), 409
+            if current + length > meta['size']:
+                return jsonify({'success': False, 'error': 'Chunk runs past the declared size', 'offset': current}), 400
+            out.seek(current)
+            while True:
+                piece = request.stream.read(app.config['UPLOAD_CHUNK_SIZE'])
+                if not piece:
+                    break
+                out.write(piece)
+                received += len(piece)
+    finally:
+        if slot_id is not None:
+            rate_limiter.release_slot(slot_id)
+        metrics.inc('upload_bytes_total', received)
+
+    return jsonify({'success': True, 'offset': current + received, 'size': meta['size']})
+
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Hash and validate a completely received upload and return its upload_token"""
+    try:
+        data_path, meta_path, meta = load_upload_session(upload_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+
+    if not meta.get('picture_hash'):
+        with open(data_path, 'rb') as data:
+            if fcntl is not None:
+                fcntl.flock(data.fileno(), fcntl.LOCK_EX)
+            received = os.fstat(data.fileno()).st_size
+            if received != meta['size']:
+                return jsonify({'success': False, 'error': 'Upload is incomplete', 'offset': received}), 409
+
+            hasher = hashlib.sha256()
+            started = time.perf_counter()
+            for piece in iter(lambda: data.read(app.config['UPLOAD_CHUNK_SIZE']), b''):
+                hasher.update(piece)
+            metrics.observe('upload_hash_seconds', time.perf_counter() - started)
+            try:
+                validate_image(data_path)
+            except ValueError as e:
+                os.remove(data_path)
+                os.remove(meta_path)
+                return jsonify({'success': False, 'error': str(e)}), 400
+            meta['picture_hash'] = hasher.hexdigest()
+            save_upload_session(meta_path, meta)
+
+    return jsonify({'success': True, 'upload_token': upload_id, 'picture_hash': meta['picture_hash']})
+
+
+@app.route('/api/submissions/<ack_id>', methods=['GET'])
+def get_submission_status(ack_id):
+    """Report whether a queued submission has been written to the database"""
+    admission_id = db.session.query(Admission.id).filter(Admission.ack_id == ack_id).scalar()
+    if admission_id is None:
+        return jsonify({'ack_id': ack_id, 'status': 'pending', 'admission_id': None})
+    return jsonify({'ack_id': ack_id, 'status': 'committed', 'admission_id': admission_id})
+
+
 @app.route('/api/admissions', methods=['GET'])
 @login_required
+@cached_response
 def get_admissions():
-    """Get all admissions (admin endpoint)"""
-    admissions = Admission.query.all()
-    return jsonify([adm.to_dict() for adm in admissions])
+    """Get one page of admissions (admin endpoint)
+
+    Query parameters: date_from, date_to, name, q (full-text search),
+    archived (true/false/all), status, order (asc/desc/relevance), limit,
+    cursor, include_total, fields (comma-separated subset of LIST_FIELDS).
+
+    Unless archived=false, cold admissions are listed too. Only the
+    requested columns are selected, as tuples rather than ORM objects, and
+    the page is encoded in a single dump_json call.
+    """
+    try:
+        fields = parse_fields_param(request.args.get('fields'), LIST_FIELDS)
+        source = admission_source(request.args, fields)
+        total = (db.session.query(db.func.count()).select_from(source).scalar()
+                 if parse_bool_param(request.args.get('include_total')) else None)
+        rows, next_cursor = paginate_admissions(source, fields, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = {
+        'items': list(row_dicts(fields, rows)),
+        'next_cursor': next_cursor,
+    }
+    if total is not None:
+        response['total'] = total
+    return Response(dump_json(response), mimetype='application/json')
+
+
+@app.route('/api/admissions/export', methods=['GET'])
+@login_required
+def export_admissions():
+    """Stream every admission matching the list filters as CSV, JSONL or XLSX
+
+    Rows are read through a server-side cursor and encoded batch by batch,
+    so memory use does not grow with the table; `fields` picks a subset of
+    EXPORT_FIELDS. With `pictures=thumb` (or medium/full) the export and
+    the pictures are bundled in a zip. `async=1` writes the file from a
+    background job instead and returns 202 with the job to poll.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_ENCODERS:
+        return jsonify({'error': 'format must be one of: ' + ', '.join(EXPORT_ENCODERS)}), 400
+
+    pictures = request.args.get('pictures')
+    if pictures and pictures not in app.config['IMAGE_SIZES']:
+        return jsonify({'error': 'pictures must be one of: ' + ', '.join(app.config['IMAGE_SIZES'])}), 400
+
+    try:
+        fields = parse_fields_param(request.args.get('fields'), EXPORT_FIELDS)
+        source = admission_source(request.args, fields + ['picture'] if pictures else fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if parse_bool_param(request.args.get('async')):
+        params = {key: value for key, value in request.args.items() if key != 'async'}
+        return job_accepted(job_runner.enqueue('export', params))
+
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    if pictures:
+        body = export_zip(source, export_format, fields, pictures)
+        filename = f'admissions_{timestamp}.zip'
+        mimetype = 'application/zip'
+    else:
+        body = EXPORT_ENCODERS[export_format](iter_export_rows(source, fields), fields)
+        filename = f'admissions_{timestamp}.{export_format}'
+        mimetype = EXPORT_MIMETYPES[export_format]
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/admissions/stats', methods=['GET'])
+@login_required
+@cached_response
+def get_admission_stats():
+    """Admission counts by day, status, nationality, workplace and activity
+
+    Read from the trigger-maintained admission_stat summary, so the cost
+    does not depend on the number of admissions. `archived` (true/false/all)
+    restricts the breakdowns; `days` limits by_day to recent days (default 30).
+    """
+    try:
+        archived = parse_bool_param(request.args.get('archived'))
+        days = int(request.args.get('days', 30))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    since_day = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+    breakdowns = {f'by_{dimension}': {} for dimension in STAT_DIMENSIONS}
+    total = archived_total = 0
+
+    for stat in AdmissionStat.query.filter(AdmissionStat.count != 0):
+        if stat.dimension == 'status':
+            total += stat.count
+            if stat.archived:
+                archived_total += stat.count
+        if archived is not None and stat.archived != archived:
+            continue
+        if stat.dimension == 'day' and stat.key < since_day:
+            continue
+        bucket = breakdowns[f'by_{stat.dimension}']
+        bucket[stat.key] = bucket.get(stat.key, 0) + stat.count
+
+    return jsonify({
+        'total': total,
+        'archived': archived_total,
+        'active': total - archived_total,
+        **breakdowns,
+    })
+
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Recompute search_tokens for every admission and rebuild the full-text index
+
+    The supported repair after writing admissions with other tools: their
+    rows are stored fine but are not searchable until this runs.
+    """
+    with db.engine.begin() as conn:
+        reindex_search(conn)
+        count = conn.execute(text("SELECT count(*) FROM admission")).scalar()
+    click.echo(f"Reindexed {count} admissions")
+
+
+@app.cli.command('rebuild-stats')
+@click.option('--check', is_flag=True, help='Only report differences, do not rewrite the summary.')
+def rebuild_stats_command(check):
+    """Recompute admission_stat from the admission and admission_archive tables"""
+    with db.engine.connect() as conn:
+        current = {(row.dimension, row.key, bool(row.archived)): row.count
+                   for row in conn.execute(text("SELECT dimension, key, archived, count FROM admission_stat WHERE count != 0"))}
+        rebuild_stats(conn)
+        expected = {(row.dimension, row.key, bool(row.archived)): row.count
+                    for row in conn.execute(text("SELECT dimension, key, archived, count FROM admission_stat"))}
+        if check:
+            conn.rollback()
+        else:
+            conn.commit()
+
+    mismatches = {key for key in current.keys() | expected.keys() if current.get(key, 0) != expected.get(key, 0)}
+    for dimension, key, archived in sorted(mismatches):
+        click.echo(f"{dimension} {key!r} archived={archived}: "
+                   f"summary={current.get((dimension, key, archived), 0)} actual={expected.get((dimension, key, archived), 0)}")
+    if check:
+        click.echo(f"{len(mismatches)} mismatched buckets")
+    else:
+        click.echo(f"Rebuilt statistics ({len(mismatches)} buckets corrected)")
+
+
+@app.cli.command('find-duplicates')
+@click.option('--flag', is_flag=True, help='Mark later members of each cluster as duplicates of the earliest.')
+def find_duplicates_command(flag):
+    """List clusters of duplicate admissions across the whole table"""
+    backfilled = backfill_fingerprints()
+    if backfilled:
+        click.echo(f"Computed fingerprints for {backfilled} admissions")
+
+    clusters = find_duplicate_clusters()
+    for ids in clusters:
+        click.echo(f"{ids[0]}: {', '.join(str(i) for i in ids[1:])}")
+    if flag:
+        click.echo(f"Flagged {flag_duplicate_clusters(clusters)} admissions as duplicates")
+    click.echo(f"{len(clusters)} duplicate clusters")
+
+    shared_pictures = find_shared_picture_clusters(clusters)
+    for ids in shared_pictures:
+        click.echo(f"Same picture, different people (review, not flagged): {', '.join(str(i) for i in ids)}")
+
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations and list the applied ones"""
+    migrate()
+    with db.engine.connect() as conn:
+        for version, description, applied_at in conn.execute(text(
+                "SELECT version, description, applied_at FROM schema_version ORDER BY version")):
+            click.echo(f"{version:>3}  {applied_at}  {description}")
+    click.echo(f"Schema is at version {schema_version()}")
+
+
+@app.cli.command('archive-cold')
+@click.option('--days', type=int, default=None, help='Archived for more than this many days (default ARCHIVE_COLD_AFTER_DAYS).')
+def archive_cold_command(days):
+    """Move long-archived admissions and their pictures to the cold tier"""
+    moved, pictures = move_to_cold(days)
+    click.echo(f"Moved {moved} admissions and {pictures} pictures to cold storage")
+
+
+@app.cli.command('backup')
+@click.option('--list', 'list_only', is_flag=True, help='List existing snapshots instead of taking one.')
+def backup_command(list_only):
+    """Take an online snapshot of the database and pictures while the app keeps running"""
+    if not list_only:
+        manifest = create_backup()
+        click.echo(f"Backup {manifest['name']}: {manifest['db_bytes']} bytes of database "
+                   f"({manifest['db_blocks_written']} new of {len(manifest['db_blocks'])} blocks), "
+                   f"{manifest['pictures_copied']} new of {len(manifest['pictures'])} pictures "
+                   f"in {manifest['seconds']}s")
+        for picture in manifest['pictures_missing']:
+            click.echo(f"  missing: {picture}")
+        for picture in manifest['pictures_corrupt']:
+            click.echo(f"  checksum mismatch: {picture}")
+        return
+    for manifest in list_backups():
+        click.echo(f"{manifest['name']}  {manifest['admissions']} admissions  "
+                   f"{len(manifest['pictures'])} pictures  schema {manifest['schema_version']}")
+
+
+@app.cli.command('restore-backup')
+@click.argument('name')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+def restore_backup_command(name, yes):
+    """Replace the database and pictures with snapshot NAME (stop the app first)"""
+    if not yes:
+        click.confirm(f"Overwrite {db.engine.url.database} and restore pictures from backup {name}?", abort=True)
+    try:
+        manifest, placed = restore_backup(name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored backup {name} ({manifest['admissions']} admissions, {placed} pictures put back)")
+
+
+@app.cli.command('run-jobs')
+def run_jobs_command():
+    """Run queued background jobs until interrupted (the Procfile worker)"""
+    require_current_schema()
+    job_runner.start()
+    click.echo(f"Running background jobs with {app.config['JOB_WORKERS']} workers")
+    while job_runner.thread.is_alive():
+        job_runner.thread.join(1)
+
+
+@app.route('/api/admissions/changes', methods=['GET'])
+@login_required
+def get_admission_changes():
+    """Get admissions changed after the `since` change sequence
+
+    Without `since` only the current cursor is returned, so clients can
+    start following the feed after their initial page load. Deleted
+    admissions are reported as tombstones with no data.
+    """
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an integer'}), 400
+
+    # The body depends on both the requested cursor and the head
+    head = current_change_seq()
+    etag = f'changes-{head}' if since is None else f'changes-{since}-{head}'
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    changes = []
+    cursor = head
+    has_more = False
+    if since is not None:
+        changes, cursor, has_more = collect_changes(since, app.config['CHANGES_MAX_PAGE_SIZE'])
+
+    response = jsonify({'cursor': cursor, 'has_more': has_more, 'changes': changes})
+    if not has_more:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+stream_slots = {'open': 0, 'lock': threading.Lock()}
+
+
+def acquire_stream_slot():
+    """Count one more open SSE stream in this process, unless SSE_MAX_STREAMS are open"""
+    with stream_slots['lock']:
+        if stream_slots['open'] >= app.config['SSE_MAX_STREAMS']:
+            return False
+        stream_slots['open'] += 1
+        return True
+
+
+def release_stream_slot():
+    with stream_slots['lock']:
+        stream_slots['open'] -= 1
+
+
+@app.route('/api/admissions/stream')
+@login_required
+def stream_admissions():
+    """Server-Sent Events stream of admission changes
+
+    Every worker tails the shared admission_change table, so events reach
+    admins regardless of which gunicorn worker handled the write. Streams
+    resume from `Last-Event-ID` (or `since`) and close after
+    SSE_MAX_DURATION so the browser reconnects and workers are recycled.
+    Past SSE_MAX_STREAMS open streams in this process it answers 503.
+    """
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since') or current_change_seq())
+    except ValueError:
+        return jsonify({'error': 'since must be an integer'}), 400
+
+    if not acquire_stream_slot():
+        response = jsonify({'error': 'Too many open streams, poll /api/admissions/changes instead'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(app.config['SSE_MAX_DURATION'])
+        return response
+
+    poll_interval = app.config['SSE_POLL_INTERVAL']
+    heartbeat_interval = app.config['SSE_HEARTBEAT_INTERVAL']
+    max_backlog = app.config['SSE_MAX_BACKLOG']
+    deadline = time.monotonic() + app.config['SSE_MAX_DURATION']
+
+    def format_event(event, data, event_id=None):
+        lines = [f"id: {event_id}"] if event_id is not None else []
+        lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+        return "\n".join(lines) + "\n\n"
+
+    def generate():
+        cursor = since
+        last_sent = time.monotonic()
+        yield f"retry: {int(poll_interval * 1000) + 1000}\n\n"
+        while time.monotonic() < deadline:
+            head = current_change_seq()
+            if head - cursor > max_backlog:
+                # Too far behind to replay within the buffer: ask for a full reload
+                cursor = head
+                yield format_event('resync', {'cursor': cursor}, cursor)
+                last_sent = time.monotonic()
+            elif head > cursor:
+                changes, cursor, _ = collect_changes(cursor, max_backlog)
+                for change in changes:
+                    yield format_event('change', change, change['seq'])
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= heartbeat_interval:
+                yield ": heartbeat\n\n"
+                last_sent = time.monotonic()
+            # Release the read transaction so the stream never pins a snapshot
+            db.session.rollback()
+            time.sleep(poll_interval)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    # Runs when the server closes the body, even if the stream never started
+    response.call_on_close(release_stream_slot)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @app.route('/api/admissions/<int:admission_id>', methods=['GET'])
 @login_required
+@cached_response
 def get_admission(admission_id):
-    """Get specific admission"""
-    admission = Admission.query.get_or_404(admission_id)
+    """Get specific admission, reading through to the cold tier"""
+    admission = Admission.query.get(admission_id) or AdmissionArchive.query.get_or_404(admission_id)
     return jsonify(admission.to_dict())
 
 
+def set_picture_cache_headers(response):
+    """Mark a picture response as privately cacheable forever"""
+    response.cache_control.no_cache = None
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['PICTURE_MAX_AGE']
+    response.cache_control.immutable = True
+
+
 @app.route('/api/admissions/<int:admission_id>/picture')
 @login_required
 def get_picture(admission_id):
-    """Get admission picture"""
-    admission = Admission.query.get_or_404(admission_id)
-    if admission.picture:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], admission.picture)
-        if os.path.exists(filepath):
-            return send_file(filepath, mimetype='image/jpeg')
-    return jsonify({'error': 'Picture not found'}), 404
+    """Get admission picture
+
+    `size` selects a rendition: thumb, medium or full (normalized, the
+    default). The original upload is served while renditions are pending
+    or failed (retried after DERIVATIVE_RETRY_AFTER), and for cold
+    admissions, whose renditions were dropped. Renditions
+    carry picture_hash as a strong ETag and are cached as immutable;
+    Range requests are honored by send_file.
+    """
+    size = request.args.get('size', 'full')
+    if size not in app.config['IMAGE_SIZES']:
+        return jsonify({'error': 'size must be one of: ' + ', '.join(app.config['IMAGE_SIZES'])}), 400
+
+    row = (db.session.query(Admission.picture, Admission.picture_hash)
+           .filter(Admission.id == admission_id)
+           .first()
+           or db.session.query(AdmissionArchive.picture, AdmissionArchive.picture_hash)
+           .filter(AdmissionArchive.id == admission_id)
+           .first())
+    if row is None:
+        return jsonify({'error': 'Not found'}), 404
+    picture, picture_hash = row
+    if not picture:
+        return jsonify({'error': 'Picture not found'}), 404
+
+    etag = f"{picture_hash}-{size}" if picture_hash else None
+    if etag and request.if_none_match.contains(etag):
+        # Pictures never change under a given hash, so skip the filesystem entirely
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        set_picture_cache_headers(response)
+        return response
+
+    upload_folder = app.config['UPLOAD_FOLDER']
+    relative_path = derivative_path(picture, size)
+    filepath = os.path.join(upload_folder, relative_path)
+    cold = False
+    if not os.path.exists(filepath):
+        relative_path = picture
+        filepath = locate_picture(picture)
+        if filepath is None:
+            return jsonify({'error': 'Picture not found'}), 404
+        cold = filepath == cold_picture_path(picture)
+        if not cold:
+            request_derivatives(picture)
+        # Serve the original for now; it must not be cached as the rendition
+        etag = None
+
+    mimetype = mimetypes.guess_type(filepath)[0] or 'application/octet-stream'
+    if app.config['X_ACCEL_REDIRECT_PREFIX'] and not cold:
+        response = app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = app.config['X_ACCEL_REDIRECT_PREFIX'].rstrip('/') + '/' + relative_path.replace(os.sep, '/')
+    else:
+        response = send_file(filepath, mimetype=mimetype, etag=etag or True, conditional=True)
+
+    if etag:
+        response.set_etag(etag)
+        set_picture_cache_headers(response)
+    else:
+        response.cache_control.no_cache = True
+    return response
 
 
 @app.route('/api/admissions/<int:admission_id>', methods=['DELETE'])
 @login_required
 def delete_admission(admission_id):
-    """Delete an admission"""
+    """Delete an admission, hot or cold"""
     try:
-        admission = Admission.query.get_or_404(admission_id)
-        
-        # Delete picture file if exists
-        if admission.picture:
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], admission.picture)
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        admission = Admission.query.get(admission_id) or AdmissionArchive.query.get_or_404(admission_id)
+        picture = admission.picture
         
         db.session.delete(admission)
+        record_change(admission_id, 'deleted')
         db.session.commit()
+
+        # Pictures are shared between identical uploads; drop the last reference only
+        release_picture(picture)
         
         return jsonify({'success': True, 'message': 'Admission deleted successfully'}), 200
     except Exception as e:
@@ -331,16 +4413,63 @@ def delete_admission(admission_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/admissions/bulk', methods=['POST'])
+@login_required
+def bulk_admissions():
+    """Archive, unarchive, change status of, or delete many admissions at once
+
+    JSON body: {"action": "archive" | "unarchive" | "set_status" | "delete",
+    "ids": [...] or "filter": {<list-view filters>}, "status": "verified"}.
+    Everything runs as set-based statements in a single transaction; only
+    rows whose state actually changes are touched and logged. Unarchiving
+    also restores matching admissions from the cold tier. With
+    "async": true the action runs as a background job instead (202).
+    """
+    payload = request.get_json(silent=True) or {}
+    action = payload.get('action')
+
+    try:
+        plan = plan_bulk_action(payload)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if payload.get('async'):
+        return job_accepted(job_runner.enqueue('bulk', payload))
+
+    try:
+        restored = restore_from_cold(cold_selection(payload)) if action == 'unarchive' else 0
+        affected, pictures = apply_bulk_action(*plan)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    affected += restored
+
+    if pictures:
+        image_executor.submit(cleanup_pictures, pictures)
+
+    return jsonify({'success': True, 'action': action, 'affected': affected}), 200
+
+
 @app.route('/api/admissions/<int:admission_id>/archive', methods=['POST'])
 @login_required
 def archive_admission(admission_id):
-    """Archive/Unarchive an admission"""
+    """Archive/Unarchive an admission; unarchiving a cold admission restores it"""
     try:
-        admission = Admission.query.get_or_404(admission_id)
+        admission = Admission.query.get(admission_id)
+        if admission is None:
+            if not restore_from_cold([admission_id]):
+                return jsonify({'success': False, 'error': 'Admission not found'}), 404
+            return jsonify({
+                'success': True,
+                'message': 'Admission unarchived successfully',
+                'archived': False
+            }), 200
+
         admission.archived = not admission.archived
+        admission.archived_at = datetime.utcnow() if admission.archived else None
+        action = 'archived' if admission.archived else 'unarchived'
+        record_change(admission.id, action)
         db.session.commit()
         
-        action = 'archived' if admission.archived else 'unarchived'
         return jsonify({
             'success': True, 
             'message': f'Admission {action} successfully',
@@ -351,10 +4480,117 @@ def archive_admission(admission_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/jobs', methods=['POST'])
+@login_required
+def create_job():
+    """Queue a background job
+
+    JSON body: {"kind": "derivatives" | "duplicates" | "export" | "bulk" | "archive" | "backup",
+    "params": {...}}. Exports and bulk actions can also be queued from
+    their own endpoints with async.
+    """
+    payload = request.get_json(silent=True) or {}
+    kind = payload.get('kind')
+    params = payload.get('params') or {}
+    if kind not in JOB_HANDLERS:
+        return jsonify({'success': False, 'error': 'kind must be one of: ' + ', '.join(JOB_HANDLERS)}), 400
+    if not isinstance(params, dict):
+        return jsonify({'success': False, 'error': 'params must be an object'}), 400
+    return job_accepted(job_runner.enqueue(kind, params))
+
+
+@app.route('/api/backups', methods=['GET'])
+@login_required
+def get_backups():
+    """List backup snapshots, newest first (restoring is CLI-only: flask restore-backup)"""
+    return jsonify({'backups': [{key: value for key, value in manifest.items() if key != 'pictures'}
+                                for manifest in list_backups()]})
+
+
+@app.route('/api/backups', methods=['POST'])
+@login_required
+def create_backup_job():
+    """Queue an online backup snapshot as a background job"""
+    return job_accepted(job_runner.enqueue('backup', {}))
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """Status, progress and result of a background job"""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/jobs/<job_id>/download', methods=['GET'])
+@login_required
+def download_job_result(job_id):
+    """Download the file a finished job produced"""
+    job = db.session.get(Job, job_id)
+    if job is None or not job.result_file:
+        return jsonify({'error': 'Not found'}), 404
+    filepath = os.path.join(app.config['JOB_RESULT_DIR'], job.result_file)
+    if not os.path.exists(filepath):
+        return jsonify({'error': 'Result has expired'}), 410
+    return send_file(os.path.abspath(filepath), as_attachment=True,
+                     download_name=os.path.basename(job.result_file))
+
+
+def check_database_settings():
+    """Read back the effective SQLite settings and pool configuration"""
+    settings = {}
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            for pragma in app.config['SQLITE_PRAGMAS']:
+                settings[pragma] = conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+    pool = db.engine.pool
+    settings['pool'] = {
+        'class': type(pool).__name__,
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+    }
+    return settings
+
+
+@app.route('/api/rate-limits', methods=['GET'])
+@login_required
+def get_rate_limit_stats():
+    """Hit/reject counters for each submission limiter"""
+    return jsonify(rate_limiter.stats())
+
+
+@app.route('/api/cache-stats', methods=['GET'])
+@login_required
+def get_cache_stats():
+    """Response cache size and hit/miss counters for this worker process"""
+    return jsonify(response_cache.stats())
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text-format metrics summed over all worker processes"""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    limiter_counters = {}
+    for name, counts in rate_limiter.stats().items():
+        limiter_counters[('rate_limit_hits_total', (('limiter', name),))] = counts['hits']
+        limiter_counters[('rate_limit_rejects_total', (('limiter', name),))] = counts['rejects']
+    return Response(metrics.render(limiter_counters), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/health')
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'ok', 'timestamp': datetime.utcnow().isoformat()})
+    try:
+        database = check_database_settings()
+    except Exception as e:
+        app.logger.error(f"Database health check failed: {e}")
+        return jsonify({'status': 'error', 'timestamp': datetime.utcnow().isoformat(), 'database': None}), 503
+    return jsonify({'status': 'ok', 'timestamp': datetime.utcnow().isoformat(), 'database': database})
 
 
 @app.errorhandler(404)
@@ -368,10 +4604,25 @@ def server_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 
+# Upgrades run as their own step (`flask --app app migrate`, first on the
+# Procfile's web line), never inside gunicorn workers where a long migration
+# would outlast the worker timeout. Importing the app only creates the schema
+# of a brand-new database and otherwise refuses to run on an outdated one.
+# Flask CLI commands load the app inside a click context and are exempt, so
+# `migrate` itself can run; the others check for themselves where it matters.
+# `python app.py` migrates below, as a single-process development server.
+with app.app_context():
+    if __name__ != '__main__' and click.get_current_context(silent=True) is None:
+        if database_is_new():
+            migrate()
+        else:
+            require_current_schema()
+
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
-        ensure_schema()
+        migrate()
+        app.logger.info(f"Database settings: {check_database_settings()}")
     
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Load test and benchmark for the admission flow
+Seeds synthetic admissions, drives a realistic request mix at a given
+concurrency and reports latency percentiles and throughput per endpoint
+
+Usage:
+    python benchmark.py                                  # in-process server on a temp database
+    python benchmark.py --seed 20000 --requests 5000 --concurrency 32
+    python benchmark.py --url http://127.0.0.1:5000 --admin-password secret
+    python benchmark.py --output bench.json --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+from io import BytesIO
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, build_opener, HTTPCookieProcessor
+
+# Relative weights of each operation in the request mix
+DEFAULT_MIX = {
+    'qr_page': 40,
+    'submit': 10,
+    'dashboard_poll': 30,
+    'picture': 20,
+}
+
+
+def make_image(seed, size=(640, 480)):
+    """Small JPEG with a seed-dependent colour, so pictures hash differently"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    colour = tuple(rng.randrange(256) for _ in range(3))
+    buffer = BytesIO()
+    Image.new('RGB', size, colour).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def random_name(rng):
+    return ' '.join(
+        rng.choice(string.ascii_uppercase) + ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
+        for _ in range(2)
+    )
+
+
+def random_phone(rng):
+    return '01' + ''.join(rng.choices(string.digits, k=9))
+
+
+def multipart_body(fields, files):
+    """Encode form fields and (name, filename, content) files as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, filename, content in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def start_local_server(workdir, seed_count, images):
+    """Import the app against a temp database, seed it and serve it on a free port"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'admissions.db')
+    os.environ['RATE_LIMIT_DB'] = os.path.join(workdir, 'ratelimit.db')
+    os.environ['METRICS_DIR'] = os.path.join(workdir, 'metrics')
+    os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+    # A single load generator would otherwise trip the per-IP limiter
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    import app as admission_app
+
+    flask_app = admission_app.app
+    flask_app.config['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    flask_app.config['DUPLICATE_POLICY'] = 'off'
+    os.makedirs(flask_app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    with flask_app.app_context():
+        seed_database(admission_app, seed_count, images)
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def seed_database(admission_app, count, images):
+    """Insert `count` admissions directly, spread over 90 days, sharing a pool of pictures"""
+    import hashlib
+
+    db, Admission = admission_app.db, admission_app.Admission
+    upload_folder = admission_app.app.config['UPLOAD_FOLDER']
+    pictures = []
+    for content in images:
+        picture_hash = hashlib.sha256(content).hexdigest()
+        picture = os.path.join(picture_hash[:2], picture_hash[2:4], f'{picture_hash}.jpg')
+        os.makedirs(os.path.join(upload_folder, os.path.dirname(picture)), exist_ok=True)
+        with open(os.path.join(upload_folder, picture), 'wb') as out:
+            out.write(content)
+        pictures.append((picture, picture_hash))
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    batch = []
+    for index in range(count):
+        picture, picture_hash = rng.choice(pictures)
+        batch.append(Admission(
+            name=random_name(rng),
+            phone=random_phone(rng),
+            workplace=rng.choice(['Cairo University', 'Alexandria Port', 'Giza Hospital', 'Aswan School']),
+            nationality=rng.choice(['Egypt', 'Sudan', 'Jordan', 'Syria']),
+            activity=rng.choice(['football', 'chess', 'swimming', 'volunteering']),
+            picture=picture,
+            picture_hash=picture_hash,
+            submission_date=now - timedelta(minutes=rng.randrange(90 * 24 * 60)),
+            status=rng.choice(['submitted', 'verified', 'approved']),
+            archived=rng.random() < 0.1,
+        ))
+        if len(batch) == 1000:
+            db.session.add_all(batch)
+            db.session.commit()
+            batch = []
+    db.session.add_all(batch)
+    db.session.commit()
+    for picture, _ in pictures:
+        admission_app.generate_derivatives(
+            upload_folder, picture,
+            admission_app.app.config['IMAGE_SIZES'], admission_app.app.config['IMAGE_QUALITY'],
+        )
+
+
+def admin_cookie(base_url, username, password):
+    """Log in to the admin area and return the session cookie header"""
+    jar = CookieJar()
+    opener = build_opener(HTTPCookieProcessor(jar))
+    data = urlencode({'username': username, 'password': password}).encode()
+    opener.open(Request(base_url + '/admin/login', data=data), timeout=30).read()
+    cookies = '; '.join(f'{cookie.name}={cookie.value}' for cookie in jar)
+    if 'session=' not in cookies:
+        raise SystemExit('Admin login failed; check --admin-user/--admin-password')
+    return cookies
+
+
+class LoadGenerator:
+    """Runs the weighted request mix and records per-operation latencies"""
+
+    def __init__(self, base_url, cookie, images, seed_count, rng_seed):
+        self.base_url = base_url
+        self.cookie = cookie
+        self.images = images
+        self.seed_count = max(seed_count, 1)
+        self.rng_seed = rng_seed
+        self.opener = build_opener()
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def request(self, path, data=None, headers=None, admin=False):
+        request = Request(self.base_url + path, data=data, headers=headers or {})
+        if admin:
+            request.add_header('Cookie', self.cookie)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def qr_page(self, rng):
+        return self.request('/')
+
+    def submit(self, rng):
+        fields = {
+            'name': random_name(rng),
+            'phone': random_phone(rng),
+            'workplace': 'Benchmark Workplace',
+            'nationality': 'Egypt',
+            'activity': 'benchmarking',
+        }
+        body, content_type = multipart_body(fields, [('picture', 'photo.jpg', rng.choice(self.images))])
+        return self.request('/api/submit-admission', data=body, headers={'Content-Type': content_type})
+
+    def dashboard_poll(self, rng):
+        return self.request('/api/admissions?archived=false&limit=50', admin=True)
+
+    def picture(self, rng):
+        admission_id = rng.randint(1, self.seed_count)
+        return self.request(f'/api/admissions/{admission_id}/picture?size=thumb', admin=True)
+
+    def run_one(self, operation, index):
+        rng = random.Random(self.rng_seed * 1000003 + index)
+        started = time.perf_counter()
+        try:
+            status = getattr(self, operation)(rng)
+            failed = status >= 400 and status != 404
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies.setdefault(operation, []).append(elapsed)
+            if failed:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def run(self, operations, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index, operation in enumerate(operations):
+                pool.submit(self.run_one, operation, index)
+        return time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, wall_time):
+    endpoints = {}
+    for operation, values in sorted(latencies.items()):
+        values = sorted(values)
+        endpoints[operation] = {
+            'requests': len(values),
+            'errors': errors.get(operation, 0),
+            'rps': round(len(values) / wall_time, 2),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        }
+    total = sum(len(values) for values in latencies.values())
+    return endpoints, {'requests': total, 'rps': round(total / wall_time, 2), 'wall_seconds': round(wall_time, 2)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_report(results):
+    print(f"\n{'endpoint':<16}{'reqs':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print('-' * 72)
+    for operation, stats in results['endpoints'].items():
+        print(f"{operation:<16}{stats['requests']:>8}{stats['errors']:>8}{stats['rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    total = results['total']
+    print('-' * 72)
+    print(f"{'total':<16}{total['requests']:>8}{'':>8}{total['rps']:>10}   in {total['wall_seconds']}s\n")
+
+
+def print_comparison(results, baseline):
+    print(f"Compared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp')}):")
+    for operation, stats in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(operation)
+        if not before:
+            continue
+        deltas = []
+        for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if before[key]:
+                deltas.append(f"{key} {(stats[key] - before[key]) / before[key] * 100:+.1f}%")
+        print(f"  {operation:<16}" + '  '.join(deltas))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the admission flow')
+    parser.add_argument('--url', help='Benchmark a running instance instead of an in-process server')
+    parser.add_argument('--admin-user', default=os.environ.get('ADMIN_USERNAME', 'admin'))
+    parser.add_argument('--admin-password', default=os.environ.get('ADMIN_PASSWORD', 'egy$4119'))
+    parser.add_argument('--seed', type=int, default=2000, help='Synthetic admissions to seed (in-process mode)')
+    parser.add_argument('--requests', type=int, default=2000, help='Measured requests')
+    parser.add_argument('--warmup', type=int, default=100, help='Unmeasured requests run first')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', help='Weights, e.g. qr_page=40,submit=10,dashboard_poll=30,picture=20')
+    parser.add_argument('--images', type=int, default=20, help='Distinct synthetic pictures')
+    parser.add_argument('--random-seed', type=int, default=1)
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    args = parser.parse_args()
+
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix = {name: int(weight) for name, weight in (item.split('=') for item in args.mix.split(','))}
+        unknown = set(mix) - set(DEFAULT_MIX)
+        if unknown:
+            parser.error(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+
+    print("\n" + "=" * 72)
+    print("⏱️  Online Admission System - Benchmark")
+    print("=" * 72)
+
+    images = [make_image(seed) for seed in range(args.images)]
+    server = None
+    with tempfile.TemporaryDirectory(prefix='admission-bench-') as workdir:
+        if args.url:
+            base_url = args.url.rstrip('/')
+            seed_count = args.seed
+        else:
+            print(f"🌱 Seeding {args.seed} admissions into a temporary database...")
+            server, base_url = start_local_server(workdir, args.seed, images)
+            seed_count = args.seed
+        print(f"🎯 Target: {base_url}")
+
+        cookie = admin_cookie(base_url, args.admin_user, args.admin_password)
+        rng = random.Random(args.random_seed)
+        names, weights = zip(*mix.items())
+
+        if args.warmup:
+            warmup = LoadGenerator(base_url, cookie, images, seed_count, args.random_seed + 1)
+            warmup.run(rng.choices(names, weights, k=args.warmup), args.concurrency)
+
+        print(f"🚀 Running {args.requests} requests at concurrency {args.concurrency}...")
+        generator = LoadGenerator(base_url, cookie, images, seed_count, args.random_seed)
+        wall_time = generator.run(rng.choices(names, weights, k=args.requests), args.concurrency)
+
+        if server is not None:
+            server.shutdown()
+
+    endpoints, total = summarize(generator.latencies, generator.errors, wall_time)
+    results = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'commit': git_commit(),
+        'config': {
+            'url': args.url or 'in-process',
+            'seed': args.seed,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'mix': mix,
+        },
+        'endpoints': endpoints,
+        'total': total,
+    }
+    print_report(results)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            print_comparison(results, json.load(baseline_file))
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(results, out, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
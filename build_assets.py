@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Build static assets for production
+Minifies static/css and static/js, writes content-hashed copies plus
+gzip/brotli variants to static/dist, and records them in manifest.json.
+Templates reference assets through asset_url(), which picks up the
+manifest on the next app start.
+
+Usage:
+    python build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip variants are written
+    brotli = None
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+SOURCE_DIRS = ["css", "js"]
+
+
+def minify_css(source):
+    """Drop comments and collapse whitespace around CSS punctuation"""
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,>])\s*", r"\1", source)
+    source = re.sub(r":\s+", ":", source)  # after colons only; "a :hover" is a descendant selector
+    return source.replace(";}", "}").strip() + "\n"
+
+
+def minify_js(source):
+    """Conservative JS minification: strip indentation, blank lines and whole-line comments
+
+    Line breaks are kept so automatic semicolon insertion behaves as before.
+    """
+    lines = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("//"):
+            continue
+        lines.append(stripped)
+    return "\n".join(lines) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def build_asset(path):
+    """Minify one source file and write its hashed and precompressed copies"""
+    content = MINIFIERS[path.suffix](path.read_text(encoding="utf-8")).encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    built_name = f"{path.stem}.{digest}{path.suffix}"
+    target = DIST_DIR / built_name
+    target.write_bytes(content)
+    (DIST_DIR / (built_name + ".gz")).write_bytes(gzip.compress(content, 9, mtime=0))
+    if brotli is not None:
+        (DIST_DIR / (built_name + ".br")).write_bytes(brotli.compress(content, quality=11))
+    return built_name, path.stat().st_size, len(content)
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("📦 Online Admission System - Asset Build")
+    print("=" * 70 + "\n")
+
+    DIST_DIR.mkdir(parents=True, exist_ok=True)
+    for old in DIST_DIR.iterdir():
+        old.unlink()
+
+    manifest = {}
+    for directory in SOURCE_DIRS:
+        for path in sorted((STATIC_DIR / directory).glob("*")):
+            if path.suffix not in MINIFIERS:
+                continue
+            name = f"{directory}/{path.name}"
+            built_name, original_size, minified_size = build_asset(path)
+            manifest[name] = built_name
+            print(f"  ✅ {name} → dist/{built_name} ({original_size} → {minified_size} bytes)")
+
+    if not manifest:
+        print("❌ No assets found under static/css or static/js")
+        sys.exit(1)
+
+    with open(DIST_DIR / "manifest.json", "w") as out:
+        json.dump(manifest, out, indent=2, sort_keys=True)
+    if brotli is None:
+        print("\n⚠️  brotli not installed; only gzip variants were written")
+    print(f"\n✅ Built {len(manifest)} assets into {os.path.relpath(DIST_DIR)}")
+    print("\n" + "=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
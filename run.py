@@ -41,14 +41,17 @@ def main():
     print("Starting application...\n")
     print("-" * 60)
 
+    # Apply pending schema migrations; importing app refuses an outdated schema
+    if os.system(f'"{sys.executable}" -m flask --app app migrate') != 0:
+        print("\n❌ Database migration failed")
+        sys.exit(1)
+
     # Try to import and run
     try:
-        from app import app, db
-        
-        # Create tables
+        from app import app, schema_version
+
         with app.app_context():
-            db.create_all()
-            print("✅ Database initialized")
+            print(f"✅ Database initialized (schema version {schema_version()})")
 
         print("\n🌐 Application URLs:")
         print("   QR Code Page:    https://127.0.0.1:5000/")
@@ -0,0 +1,345 @@
+let allAdmissions = [];
+let showArchived = false;
+let nextCursor = null;
+let changeCursor = null;
+let changeEtag = null;
+
+function buildQuery(extra = {}) {
+    const params = new URLSearchParams();
+    const dateFrom = document.getElementById('dateFrom').value;
+    const dateTo = document.getElementById('dateTo').value;
+    const searchName = document.getElementById('searchName').value.trim();
+
+    params.set('archived', showArchived ? 'true' : 'false');
+    if (dateFrom) params.set('date_from', dateFrom);
+    if (dateTo) params.set('date_to', dateTo);
+    if (searchName) params.set('q', searchName);
+    Object.entries(extra).forEach(([key, value]) => params.set(key, value));
+    return params.toString();
+}
+
+function exportAdmissions(format) {
+    window.location = '/api/admissions/export?' + buildQuery({ format });
+}
+
+async function fetchPage(cursor) {
+    const response = await fetch('/api/admissions?' + buildQuery(cursor ? { cursor } : {}));
+    return response.json();
+}
+
+async function loadAdmissions() {
+    try {
+        // Re-anchor the change feed before reading the first page
+        changeCursor = null;
+        changeEtag = null;
+        await pollChanges();
+        const page = await fetchPage(null);
+        allAdmissions = page.items;
+        nextCursor = page.next_cursor;
+        displayAdmissions(allAdmissions);
+        updateStats();
+    } catch (error) {
+        console.error('Error loading admissions:', error);
+        document.getElementById('admissionsTable').innerHTML = '<tr><td colspan="9" style="text-align: center; color: #e74c3c;">Error loading data</td></tr>';
+    }
+}
+
+async function loadMore() {
+    if (!nextCursor) return;
+    try {
+        const page = await fetchPage(nextCursor);
+        allAdmissions = allAdmissions.concat(page.items);
+        nextCursor = page.next_cursor;
+        displayAdmissions(allAdmissions);
+    } catch (error) {
+        console.error('Error loading admissions:', error);
+    }
+}
+
+function matchesView(admission) {
+    const dateFrom = document.getElementById('dateFrom').value;
+    const dateTo = document.getElementById('dateTo').value;
+    const searchName = document.getElementById('searchName').value.trim().toLowerCase();
+    const day = admission.submission_date.slice(0, 10);
+
+    if (admission.archived !== showArchived) return false;
+    if (dateFrom && day < dateFrom) return false;
+    if (dateTo && day > dateTo) return false;
+    if (searchName) {
+        const haystack = [admission.name, admission.phone, admission.workplace, admission.nationality, admission.activity]
+            .join(' ').toLowerCase();
+        if (!searchName.split(/\s+/).every(word => haystack.includes(word))) return false;
+    }
+    return true;
+}
+
+function applyChange(change) {
+    allAdmissions = allAdmissions.filter(a => a.id !== change.id);
+    if (change.data && matchesView(change.data)) {
+        allAdmissions.push(change.data);
+    }
+    allAdmissions.sort((a, b) => b.submission_date.localeCompare(a.submission_date) || b.id - a.id);
+}
+
+function openStream() {
+    const source = new EventSource('/api/admissions/stream' + (changeCursor !== null ? '?since=' + changeCursor : ''));
+    source.addEventListener('change', event => {
+        const change = JSON.parse(event.data);
+        changeCursor = Math.max(changeCursor || 0, change.seq);
+        applyChange(change);
+        displayAdmissions(allAdmissions);
+        updateStats();
+    });
+    source.addEventListener('resync', () => loadAdmissions());
+    source.addEventListener('error', () => {
+        // A refused stream (e.g. 503 when the server is at its stream cap)
+        // is not retried by the browser, so fall back to polling
+        if (source.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    });
+}
+
+function startPolling() {
+    // Poll the change feed every 30 seconds; idle polls return 304
+    setInterval(refreshChanges, 30000);
+}
+
+async function pollChanges() {
+    const url = '/api/admissions/changes' + (changeCursor !== null ? '?since=' + changeCursor : '');
+    const headers = changeEtag ? { 'If-None-Match': changeEtag } : {};
+    const response = await fetch(url, { headers });
+    if (response.status === 304) {
+        return false;
+    }
+
+    const feed = await response.json();
+    const firstPoll = changeCursor === null;
+    changeCursor = feed.cursor;
+    changeEtag = response.headers.get('ETag');
+    if (firstPoll) {
+        return false;
+    }
+
+    feed.changes.forEach(applyChange);
+
+    if (feed.has_more) {
+        await pollChanges();
+    }
+    return true;
+}
+
+async function refreshChanges() {
+    try {
+        if (await pollChanges()) {
+            displayAdmissions(allAdmissions);
+            updateStats();
+        }
+    } catch (error) {
+        console.error('Error polling changes:', error);
+    }
+}
+
+function renderRow(admission) {
+    const date = new Date(admission.submission_date);
+    const row = document.createElement('tr');
+    if (admission.archived) {
+        row.classList.add('archived-row');
+    }
+
+    row.innerHTML = `
+        <td>${admission.id}</td>
+        <td>${escapeHtml(admission.name)}</td>
+        <td>${escapeHtml(admission.phone)}</td>
+        <td>${escapeHtml(admission.workplace)}</td>
+        <td>${admission.picture ? '✓' : '—'}</td>
+        <td>
+            <span class="status-badge status-${admission.status}">${admission.status}</span>
+            ${admission.duplicate_of ? `<br><small style="color: #e67e22;">⚠️ Duplicate of #${admission.duplicate_of}</small>` : ''}
+        </td>
+        <td>${date.toLocaleDateString()}</td>
+        <td>${admission.archived ? '<span style="color: #ff9800;">📦 Archived</span>' : ''}</td>
+        <td>
+            <div class="action-buttons">
+                <button class="btn-small btn-view" onclick="viewDetails(${admission.id})">View</button>
+                ${admission.picture ? `<button class="btn-small btn-download" onclick="downloadPicture(${admission.id}, '${admission.picture_hash || ''}')">Download</button>` : ''}
+                <button class="btn-small btn-archive" onclick="archiveAdmission(${admission.id})">${admission.archived ? 'Unarchive' : 'Archive'}</button>
+                <button class="btn-small btn-delete" onclick="deleteAdmission(${admission.id})">Delete</button>
+            </div>
+        </td>
+    `;
+    return row;
+}
+
+function displayAdmissions(admissions) {
+    const tbody = document.getElementById('admissionsTable');
+    tbody.innerHTML = '';
+
+    if (admissions.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="9" class="no-data">No submissions found</td></tr>';
+    } else {
+        admissions.forEach(admission => tbody.appendChild(renderRow(admission)));
+    }
+
+    document.getElementById('loadMoreBtn').style.display = nextCursor ? 'inline-block' : 'none';
+}
+
+function applyFilters() {
+    loadAdmissions();
+}
+
+function clearFilters() {
+    document.getElementById('dateFrom').value = '';
+    document.getElementById('dateTo').value = '';
+    document.getElementById('searchName').value = '';
+    loadAdmissions();
+}
+
+function toggleShowArchived() {
+    showArchived = !showArchived;
+    const btn = document.getElementById('toggleArchivedBtn');
+    btn.textContent = showArchived ? '👁️ Show Active' : '👁️ Show Archived';
+    loadAdmissions();
+}
+
+async function deleteAdmission(id) {
+    if (!confirm('Are you sure you want to delete this admission? This action cannot be undone.')) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/admissions/${id}`, {
+            method: 'DELETE'
+        });
+
+        const result = await response.json();
+
+        if (result.success) {
+            alert('Admission deleted successfully!');
+            refreshChanges();
+        } else {
+            alert('Error: ' + result.error);
+        }
+    } catch (error) {
+        console.error('Error deleting admission:', error);
+        alert('Error deleting admission');
+    }
+}
+
+async function archiveAdmission(id) {
+    try {
+        const response = await fetch(`/api/admissions/${id}/archive`, {
+            method: 'POST'
+        });
+
+        const result = await response.json();
+
+        if (result.success) {
+            refreshChanges();
+        } else {
+            alert('Error: ' + result.error);
+        }
+    } catch (error) {
+        console.error('Error archiving admission:', error);
+        alert('Error archiving admission');
+    }
+}
+
+async function updateStats() {
+    const today = new Date().toISOString().slice(0, 10);
+
+    try {
+        const response = await fetch('/api/admissions/stats?archived=false&days=1');
+        const stats = await response.json();
+        document.getElementById('totalCount').textContent = stats.total;
+        document.getElementById('todayCount').textContent = stats.by_day[today] || 0;
+        document.getElementById('archivedCount').textContent = stats.archived;
+    } catch (error) {
+        console.error('Error loading stats:', error);
+    }
+}
+
+async function viewDetails(id) {
+    try {
+        const response = await fetch(`/api/admissions/${id}`);
+        const admission = await response.json();
+
+        const date = new Date(admission.submission_date);
+        const modalBody = document.getElementById('modalBody');
+
+        let pictureHtml = '';
+        if (admission.picture) {
+            pictureHtml = `<img src="${pictureUrl(admission, 'medium')}" alt="Picture" class="preview-image">`;
+        }
+
+        modalBody.innerHTML = `
+            <div class="detail-row">
+                <div class="detail-label">Name</div>
+                <div class="detail-value">${escapeHtml(admission.name)}</div>
+            </div>
+            <div class="detail-row">
+                <div class="detail-label">Phone</div>
+                <div class="detail-value">${escapeHtml(admission.phone)}</div>
+            </div>
+            <div class="detail-row">
+                <div class="detail-label">Workplace</div>
+                <div class="detail-value">${escapeHtml(admission.workplace)}</div>
+            </div>
+            <div class="detail-row">
+                <div class="detail-label">Status</div>
+                <div class="detail-value"><span class="status-badge status-${admission.status}">${admission.status}</span></div>
+            </div>
+            <div class="detail-row">
+                <div class="detail-label">Submitted Date</div>
+                <div class="detail-value">${date.toLocaleString()}</div>
+            </div>
+            ${pictureHtml ? `
+            <div class="detail-row">
+                <div class="detail-label">Picture</div>
+                ${pictureHtml}
+            </div>
+            ` : ''}
+        `;
+
+        document.getElementById('detailModal').classList.add('show');
+    } catch (error) {
+        console.error('Error loading details:', error);
+        alert('Error loading admission details');
+    }
+}
+
+function closeModal() {
+    document.getElementById('detailModal').classList.remove('show');
+}
+
+// Pictures are cached as immutable, so version the URL by content hash
+function pictureUrl(admission, size) {
+    return `/api/admissions/${admission.id}/picture?size=${size}&v=${admission.picture_hash || ''}`;
+}
+
+function downloadPicture(id, pictureHash) {
+    window.open(pictureUrl({ id, picture_hash: pictureHash }, 'full'), '_blank');
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+// Load admissions on page load, then follow changes as they happen
+window.addEventListener('load', async () => {
+    await loadAdmissions();
+    if (window.EventSource) {
+        openStream();
+    } else {
+        startPolling();
+    }
+});
+
+// Close modal on outside click
+document.getElementById('detailModal').addEventListener('click', (e) => {
+    if (e.target.id === 'detailModal') {
+        closeModal();
+    }
+});
@@ -0,0 +1,348 @@
+const form = document.getElementById('admissionForm');
+const submitBtn = document.getElementById('submitBtn');
+const successMessage = document.getElementById('successMessage');
+const pictureInput = document.getElementById('picture');
+const fileLabel = document.querySelector('.file-input-label');
+const imagePreview = document.getElementById('imagePreview');
+const previewImage = document.getElementById('previewImage');
+const progressFill = document.querySelector('.progress-fill');
+
+// File preview
+pictureInput.addEventListener('change', function() {
+    if (this.files && this.files[0]) {
+        const file = this.files[0];
+
+        // Validate file
+        const validTypes = ['image/png', 'image/jpeg', 'image/gif', 'image/webp'];
+        if (!validTypes.includes(file.type)) {
+            showError('pictureError', 'Invalid file type. Please upload PNG, JPG, GIF, or WEBP.');
+            this.value = '';
+            return;
+        }
+
+        if (file.size > 10 * 1024 * 1024) {
+            showError('pictureError', 'File size exceeds 10MB limit.');
+            this.value = '';
+            return;
+        }
+
+        // Show preview
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            previewImage.src = e.target.result;
+            imagePreview.style.display = 'block';
+            fileLabel.classList.add('has-file');
+            clearError('pictureError');
+        };
+        reader.readAsDataURL(file);
+    }
+});
+
+// Drag and drop
+fileLabel.addEventListener('dragover', (e) => {
+    e.preventDefault();
+    fileLabel.style.borderColor = '#764ba2';
+    fileLabel.style.background = '#f0f4ff';
+});
+
+fileLabel.addEventListener('dragleave', () => {
+    fileLabel.style.borderColor = '#667eea';
+    fileLabel.style.background = '#f8f9ff';
+});
+
+fileLabel.addEventListener('drop', (e) => {
+    e.preventDefault();
+    fileLabel.style.borderColor = '#667eea';
+    fileLabel.style.background = '#f8f9ff';
+
+    if (e.dataTransfer.files && e.dataTransfer.files[0]) {
+        pictureInput.files = e.dataTransfer.files;
+        pictureInput.dispatchEvent(new Event('change', { bubbles: true }));
+    }
+});
+
+// Form validation
+function validateForm() {
+    let isValid = true;
+
+    // Validate name (allow Arabic and English characters)
+    const name = document.getElementById('name').value.trim();
+    if (!name) {
+        showError('nameError', 'الاسم مطلوب - Name is required');
+        isValid = false;
+    } else if (name.length < 2) {
+        showError('nameError', 'الاسم يجب أن يكون حرفين على الأقل - Name must be at least 2 characters');
+        isValid = false;
+    } else {
+        clearError('nameError');
+    }
+
+    // Validate phone
+    const phone = document.getElementById('phone').value.trim();
+    if (!phone) {
+        showError('phoneError', 'رقم الهاتف مطلوب - Phone number is required');
+        isValid = false;
+    } else if (!/^\+?[0-9\s\-()]{10,}$/.test(phone)) {
+        showError('phoneError', 'رقم الهاتف غير صحيح - Invalid phone number');
+        isValid = false;
+    } else {
+        clearError('phoneError');
+    }
+
+    // Validate nationality
+    const nationality = document.getElementById('nationality').value.trim();
+    if (!nationality) {
+        showError('nationalityError', 'الجنسية مطلوبة - Nationality is required');
+        isValid = false;
+    } else if (nationality.length < 2) {
+        showError('nationalityError', 'الجنسية يجب أن تكون حرفين على الأقل - Nationality must be at least 2 characters');
+        isValid = false;
+    } else {
+        clearError('nationalityError');
+    }
+
+    // Validate workplace
+    const workplace = document.getElementById('workplace').value.trim();
+    if (!workplace) {
+        showError('workplaceError', 'مكان العمل مطلوب - Workplace is required');
+        isValid = false;
+    } else if (workplace.length < 2) {
+        showError('workplaceError', 'مكان العمل يجب أن يكون حرفين على الأقل - Workplace must be at least 2 characters');
+        isValid = false;
+    } else {
+        clearError('workplaceError');
+    }
+
+    // Validate activity
+    const activity = document.getElementById('activity').value.trim();
+    if (!activity) {
+        showError('activityError', 'الفعالية مطلوبة - Activity is required');
+        isValid = false;
+    } else if (activity.length < 2) {
+        showError('activityError', 'الفعالية يجب أن تكون حرفين على الأقل - Activity must be at least 2 characters');
+        isValid = false;
+    } else {
+        clearError('activityError');
+    }
+
+    // Validate picture
+    if (!pictureInput.files || !pictureInput.files[0]) {
+        showError('pictureError', 'الرجاء تحميل صورة - Please upload a picture');
+        isValid = false;
+    } else {
+        clearError('pictureError');
+    }
+
+    return isValid;
+}
+
+function showError(elementId, message) {
+    const errorEl = document.getElementById(elementId);
+    errorEl.textContent = message;
+    errorEl.classList.add('show');
+}
+
+function clearError(elementId) {
+    const errorEl = document.getElementById(elementId);
+    errorEl.textContent = '';
+    errorEl.classList.remove('show');
+}
+
+// Photos are re-encoded to at most this size before upload
+const UPLOAD_MAX_EDGE = 1600;
+const UPLOAD_QUALITY = 0.85;
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+// fetch() that retries network errors, 429 and 5xx with exponential backoff
+async function fetchWithRetry(url, options = {}, attempts = 5) {
+    for (let attempt = 1; ; attempt++) {
+        try {
+            const response = await fetch(url, options);
+            if ((response.status < 500 && response.status !== 429) || attempt >= attempts) {
+                return response;
+            }
+        } catch (error) {
+            if (attempt >= attempts) throw error;
+        }
+        await sleep(Math.min(8000, 500 * 2 ** attempt));
+    }
+}
+
+// Downscale and re-encode a photo as JPEG; keeps the original if that is smaller
+async function downscaleImage(file) {
+    if (file.type === 'image/gif' || !window.createImageBitmap) return file;
+    try {
+        const bitmap = await createImageBitmap(file, { imageOrientation: 'from-image' });
+        const scale = Math.min(1, UPLOAD_MAX_EDGE / Math.max(bitmap.width, bitmap.height));
+        const canvas = document.createElement('canvas');
+        canvas.width = Math.round(bitmap.width * scale);
+        canvas.height = Math.round(bitmap.height * scale);
+        const context = canvas.getContext('2d');
+        context.fillStyle = '#fff';  // transparent PNGs get a white background
+        context.fillRect(0, 0, canvas.width, canvas.height);
+        context.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+        bitmap.close();
+        const blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', UPLOAD_QUALITY));
+        if (!blob || blob.size >= file.size) return file;
+        return new File([blob], file.name.replace(/\.[^.]+$/, '') + '.jpg', { type: 'image/jpeg' });
+    } catch (error) {
+        return file;
+    }
+}
+
+// Send a picture in chunks, resuming where the last attempt stopped; returns the upload token
+async function uploadPicture(file, key) {
+    let upload = JSON.parse(sessionStorage.getItem(key) || 'null');
+    if (upload && upload.token) return upload.token;
+
+    if (upload) {
+        const response = await fetchWithRetry('/api/uploads/' + upload.id);
+        if (response.ok) {
+            upload.offset = (await response.json()).offset;
+        } else {
+            upload = null;  // expired
+        }
+    }
+    if (!upload) {
+        const response = await fetchWithRetry('/api/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size })
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.error || 'Upload failed');
+        upload = { id: data.upload_id, offset: data.offset, chunkSize: data.chunk_size };
+    }
+    sessionStorage.setItem(key, JSON.stringify(upload));
+
+    while (upload.offset < file.size) {
+        const chunk = file.slice(upload.offset, upload.offset + upload.chunkSize);
+        const response = await fetchWithRetry(`/api/uploads/${upload.id}?offset=${upload.offset}`, {
+            method: 'PUT',
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: chunk
+        });
+        const data = await response.json();
+        // 409 means the server already has more (or less) than we thought
+        if (!response.ok && !(response.status === 409 && data.offset !== undefined)) {
+            throw new Error(data.error || 'Upload failed');
+        }
+        upload.offset = data.offset;
+        sessionStorage.setItem(key, JSON.stringify(upload));
+        progressFill.style.width = (10 + 80 * upload.offset / file.size) + '%';
+    }
+
+    const response = await fetchWithRetry(`/api/uploads/${upload.id}/finalize`, { method: 'POST' });
+    const data = await response.json();
+    if (!response.ok) {
+        sessionStorage.removeItem(key);
+        throw new Error(data.error || 'Upload failed');
+    }
+    upload.token = data.upload_token;
+    sessionStorage.setItem(key, JSON.stringify(upload));
+    return upload.token;
+}
+
+// Idempotency key for this form's submission, kept until the server gives a definite answer
+// so a retry after a lost response returns the admission already created instead of a duplicate
+function submissionId() {
+    let id = sessionStorage.getItem('submission_id');
+    if (!id) {
+        const bytes = crypto.getRandomValues(new Uint8Array(16));
+        id = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+        sessionStorage.setItem('submission_id', id);
+    }
+    return id;
+}
+
+// Form submission
+form.addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    if (!validateForm()) {
+        return;
+    }
+
+    // Prepare form data
+    const formData = new FormData(form);
+
+    // Show loading state
+    submitBtn.disabled = true;
+    submitBtn.innerHTML = '<div class="loading-spinner"></div> Submitting...';
+    progressFill.style.width = '10%';
+
+    try {
+        const original = pictureInput.files[0];
+        const picture = await downscaleImage(original);
+        const uploadKey = ['upload', original.name, original.lastModified, picture.size].join(':');
+        const uploadToken = await uploadPicture(picture, uploadKey);
+        formData.delete('picture');
+        formData.append('upload_token', uploadToken);
+        formData.append('submission_id', submissionId());
+
+        // Safe to retry: submission_id makes a replay return the first attempt's result
+        const response = await fetchWithRetry('/api/submit-admission', {
+            method: 'POST',
+            body: formData
+        }, 3);
+
+        const data = await response.json();
+
+        progressFill.style.width = '100%';
+        // Claiming a token is idempotent and undone on server errors, so it stays
+        // reusable unless the submission went through or the upload itself is gone
+        if (data.success || /upload/i.test(data.error || '')) {
+            sessionStorage.removeItem(uploadKey);
+        }
+        if (response.status < 500) {
+            sessionStorage.removeItem('submission_id');
+        }
+
+        if (data.success) {
+            // Show success message
+            successMessage.innerHTML = `
+                ✓ <strong>Success!</strong><br>
+                Your admission form has been submitted successfully!<br>
+                <small>ID: ${data.admission_id || data.ack_id}</small>
+            `;
+            successMessage.classList.add('show');
+
+            // Reset form
+            setTimeout(() => {
+                form.reset();
+                fileLabel.classList.remove('has-file');
+                imagePreview.style.display = 'none';
+                progressFill.style.width = '0%';
+                successMessage.classList.remove('show');
+            }, 3000);
+        } else {
+            showError('nameError', data.error || 'An error occurred');
+        }
+    } catch (error) {
+        showError('nameError', error.message && error.message !== 'Failed to fetch'
+            ? error.message : 'Network error. Please try again.');
+    } finally {
+        submitBtn.disabled = false;
+        submitBtn.innerHTML = '✓ Submit Form';
+    }
+});
+
+// Track progress
+form.addEventListener('input', () => {
+    const fields = ['name', 'phone', 'workplace'];
+    const filled = fields.filter(id => document.getElementById(id).value.trim()).length;
+    const hasFile = pictureInput.files && pictureInput.files[0];
+    const total = fields.length + 1;
+    const completed = filled + (hasFile ? 1 : 0);
+    progressFill.style.width = (completed / total * 100) + '%';
+});
+
+function resetForm() {
+    form.reset();
+    sessionStorage.removeItem('submission_id');
+    fileLabel.classList.remove('has-file');
+    imagePreview.style.display = 'none';
+    progressFill.style.width = '0%';
+    document.querySelectorAll('.error-message').forEach(el => el.classList.remove('show'));
+}
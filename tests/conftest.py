@@ -0,0 +1,86 @@
+"""Shared fixtures: the app module imported against throwaway storage"""
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORAGE = tempfile.mkdtemp(prefix='admissions-tests-')
+
+# app.py reads these at import time
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(STORAGE, 'admissions.db')}",
+    'RATE_LIMIT_DB': os.path.join(STORAGE, 'ratelimit.db'),
+    'METRICS_DIR': os.path.join(STORAGE, 'metrics'),
+    'JOB_RESULT_DIR': os.path.join(STORAGE, 'jobs'),
+    'MIGRATION_LOCK': os.path.join(STORAGE, 'migrate.lock'),
+    'BACKUP_DIR': os.path.join(STORAGE, 'backups'),
+    'SUBMISSION_JOURNAL_DIR': os.path.join(STORAGE, 'queue'),
+    'COLD_FOLDER': os.path.join(STORAGE, 'uploads', '.cold'),
+    'JOB_RUNNER': 'external',
+})
+sys.path.insert(0, ROOT)
+
+import app as app_module  # noqa: E402
+
+app_module.app.config['UPLOAD_FOLDER'] = os.path.join(STORAGE, 'uploads')
+os.makedirs(os.path.join(STORAGE, 'uploads', '.sessions'), exist_ok=True)
+with app_module.app.app_context():
+    app_module.migrate()
+
+
+def picture_bytes(color='red', size=(40, 40)):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def app():
+    """The Flask app with empty tables and default limits"""
+    flask_app = app_module.app
+    config = dict(flask_app.config)
+    flask_app.config['RATE_LIMIT_ENABLED'] = False
+    with flask_app.app_context():
+        db = app_module.db
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.execute(db.text("INSERT INTO admission_fts(admission_fts) VALUES ('delete-all')"))
+        db.session.commit()
+    app_module.response_cache.clear()
+    yield flask_app
+    flask_app.config.update(config)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(client):
+    """A test client logged in as admin"""
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client
+
+
+@pytest.fixture
+def submit(client):
+    """Post the admission form; keyword arguments override the default fields"""
+    def post(picture=None, **fields):
+        data = {
+            'name': 'Sara Ali',
+            'phone': '01012345678',
+            'workplace': 'Cairo Office',
+            'nationality': 'Egyptian',
+            'activity': 'Volunteering',
+        }
+        data.update(fields)
+        if picture is not None:
+            data['picture'] = (io.BytesIO(picture), 'photo.jpg')
+        return client.post('/api/submit-admission', data=data, content_type='multipart/form-data')
+    return post
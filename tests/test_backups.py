@@ -0,0 +1,57 @@
+"""Backups: database blocks are stored incrementally and restore round-trips"""
+import os
+import time
+
+import pytest
+
+from conftest import app_module, picture_bytes
+
+Admission = app_module.Admission
+
+
+@pytest.fixture
+def backups(app, tmp_path):
+    app.config['BACKUP_DIR'] = str(tmp_path / 'backups')
+    app.config['BACKUP_DB_BLOCK_SIZE'] = 4096
+    return app
+
+
+def take_backup(app):
+    with app.app_context():
+        manifest = app_module.create_backup()
+    time.sleep(1.01)  # snapshot names have one-second resolution
+    return manifest
+
+
+def test_second_backup_stores_only_changed_blocks(backups, submit):
+    for n in range(50):
+        submit(name=f'Person {n}', phone=f'0101{n:07d}')
+    first = take_backup(backups)
+    assert first['db_blocks_written'] == len(set(first['db_blocks']))
+
+    submit(name='One More', phone='01099999999')
+    second = take_backup(backups)
+    assert 0 < second['db_blocks_written'] < len(second['db_blocks'])
+    snapshot = os.path.join(backups.config['BACKUP_DIR'], 'snapshots', second['name'])
+    assert os.listdir(snapshot) == ['manifest.json']
+
+
+def test_restore_round_trip(backups, submit):
+    kept = submit(picture=picture_bytes('purple')).get_json()['admission_id']
+    manifest = take_backup(backups)
+    submit(name='After Backup', phone='01099999998')
+
+    with backups.app_context():
+        restored, _ = app_module.restore_backup(manifest['name'])
+        assert restored['name'] == manifest['name']
+        assert [a.id for a in Admission.query.all()] == [kept]
+
+
+def test_restore_rejects_missing_block(backups, submit):
+    submit()
+    manifest = take_backup(backups)
+    digest = manifest['db_blocks'][-1]
+    os.remove(os.path.join(backups.config['BACKUP_DIR'], 'db-blocks', digest[:2], digest))
+    with backups.app_context():
+        with pytest.raises(ValueError, match='missing'):
+            app_module.restore_backup(manifest['name'])
@@ -0,0 +1,33 @@
+"""Change feed: cursors, paging and conditional requests"""
+
+
+def test_changes_after_cursor(admin, submit):
+    cursor = admin.get('/api/admissions/changes').get_json()['cursor']
+    admission_id = submit().get_json()['admission_id']
+
+    body = admin.get(f'/api/admissions/changes?since={cursor}').get_json()
+    assert [change['id'] for change in body['changes']] == [admission_id]
+    assert body['cursor'] > cursor
+    assert not body['has_more']
+
+
+def test_etag_is_bound_to_since(admin, submit):
+    cursor = admin.get('/api/admissions/changes').get_json()['cursor']
+    submit()
+
+    first = admin.get(f'/api/admissions/changes?since={cursor}')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert admin.get(f'/api/admissions/changes?since={cursor}',
+                     headers={'If-None-Match': etag}).status_code == 304
+
+    # Same head, earlier cursor: a different body, so the tag must not match
+    older = admin.get(f'/api/admissions/changes?since={cursor - 1}', headers={'If-None-Match': etag})
+    assert older.status_code == 200
+    assert len(older.get_json()['changes']) == 1
+
+
+def test_invalid_since_is_rejected_before_etag(admin):
+    etag = admin.get('/api/admissions/changes').headers['ETag']
+    response = admin.get('/api/admissions/changes?since=abc', headers={'If-None-Match': etag})
+    assert response.status_code == 400
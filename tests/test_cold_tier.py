@@ -0,0 +1,94 @@
+"""Cold tier: archived admissions moved to admission_archive stay reachable"""
+import csv
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import app_module, picture_bytes
+
+db = app_module.db
+Admission = app_module.Admission
+AdmissionArchive = app_module.AdmissionArchive
+
+
+@pytest.fixture
+def cold(app, admin, submit):
+    """Three admissions: one hot, two archived long ago and moved to the cold tier"""
+    hot = submit(name='Hot Person', phone='01000000001').get_json()['admission_id']
+    ids = [submit(name=name, phone=phone, picture=picture_bytes(color)).get_json()['admission_id']
+           for name, phone, color in [('Cold Karim', '01222223333', 'blue'), ('Cold Mona', '01444445555', 'green')]]
+    for admission_id in ids:
+        assert admin.post(f'/api/admissions/{admission_id}/archive').get_json()['archived'] is True
+    with app.app_context():
+        Admission.query.filter(Admission.id.in_(ids)).update(
+            {'archived_at': datetime.utcnow() - timedelta(days=200)}, synchronize_session=False)
+        db.session.commit()
+        assert app_module.move_to_cold(days=90) == (2, 2)
+    return hot, ids
+
+
+def listed_ids(admin, **params):
+    response = admin.get('/api/admissions', query_string=params)
+    assert response.status_code == 200
+    return [item['id'] for item in response.get_json()['items']]
+
+
+def test_archived_list_reads_through(admin, cold):
+    hot, ids = cold
+    assert sorted(listed_ids(admin, archived='true')) == ids
+    assert listed_ids(admin, archived='false') == [hot]
+    assert sorted(listed_ids(admin, archived='all')) == sorted(ids + [hot])
+    total = admin.get('/api/admissions?archived=true&include_total=1').get_json()['total']
+    stats = admin.get('/api/admissions/stats').get_json()
+    assert total == stats['archived'] == 2
+
+
+def test_keyset_pages_cross_tiers(admin, cold):
+    hot, ids = cold
+    seen, cursor = [], None
+    while True:
+        params = {'archived': 'all', 'limit': 1, 'order': 'asc'}
+        if cursor:
+            params['cursor'] = cursor
+        page = admin.get('/api/admissions', query_string=params).get_json()
+        seen += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == sorted([hot] + ids)
+
+
+def test_search_finds_cold_rows(admin, cold):
+    hot, ids = cold
+    assert listed_ids(admin, archived='true', q='karim') == [ids[0]]
+    assert listed_ids(admin, archived='all', q='4444 5555') == [ids[1]]
+    assert listed_ids(admin, archived='all', q='person', order='relevance') == [hot]
+
+
+def test_export_includes_cold_rows(admin, cold):
+    hot, ids = cold
+    response = admin.get('/api/admissions/export?format=csv&archived=true&fields=id,name')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert sorted(int(row['id']) for row in rows) == ids
+
+
+def test_cold_picture_is_served(app, admin, cold):
+    hot, ids = cold
+    with app.app_context():
+        picture = db.session.get(AdmissionArchive, ids[0]).picture
+    assert os.path.exists(app_module.cold_picture_path(picture))
+    response = admin.get(f'/api/admissions/{ids[0]}/picture?size=thumb')
+    assert response.status_code == 200
+    response.close()
+
+
+def test_bulk_unarchive_by_filter_restores(app, admin, cold):
+    hot, ids = cold
+    response = admin.post('/api/admissions/bulk', json={'action': 'unarchive', 'filter': {'archived': 'true'}})
+    assert response.get_json()['affected'] == 2
+    with app.app_context():
+        assert AdmissionArchive.query.count() == 0
+        assert Admission.query.filter(Admission.archived.is_(False)).count() == 3
+    assert listed_ids(admin, archived='true') == []
@@ -0,0 +1,76 @@
+"""Duplicate detection: only the same person (fingerprint) is a duplicate"""
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, app_module, picture_bytes
+
+Admission = app_module.Admission
+
+
+def test_flag_marks_same_person(app, submit):
+    first = submit().get_json()['admission_id']
+    second = submit(phone='+20 10 1234 5678').get_json()['admission_id']
+    with app.app_context():
+        assert app_module.db.session.get(Admission, second).duplicate_of == first
+
+
+def test_shared_picture_is_not_a_duplicate(app, submit):
+    picture = picture_bytes()
+    first = submit(picture=picture).get_json()['admission_id']
+    second = submit(picture=picture, name='Third Person', phone='01555554444').get_json()['admission_id']
+    with app.app_context():
+        assert app_module.db.session.get(Admission, second).duplicate_of is None
+        assert app_module.db.session.get(Admission, first).name == 'Sara Ali'
+
+
+def test_merge_never_overwrites_another_person(app, submit):
+    app.config['DUPLICATE_POLICY'] = 'merge'
+    picture = picture_bytes()
+    first = submit(picture=picture).get_json()['admission_id']
+    response = submit(picture=picture, name='Third Person', phone='01555554444')
+    assert response.status_code == 201
+    assert response.get_json()['admission_id'] != first
+    with app.app_context():
+        sara = app_module.db.session.get(Admission, first)
+        assert (sara.name, sara.phone) == ('Sara Ali', '01012345678')
+
+
+def test_merge_updates_same_person(app, submit):
+    app.config['DUPLICATE_POLICY'] = 'merge'
+    first = submit().get_json()['admission_id']
+    response = submit(workplace='Giza Office')
+    assert response.status_code == 200
+    assert response.get_json()['merged'] is True
+    with app.app_context():
+        assert Admission.query.count() == 1
+        assert app_module.db.session.get(Admission, first).workplace == 'Giza Office'
+
+
+def test_reject_only_same_person(app, submit):
+    app.config['DUPLICATE_POLICY'] = 'reject'
+    picture = picture_bytes()
+    first = submit(picture=picture).get_json()['admission_id']
+    assert submit(picture=picture, name='Third Person', phone='01555554444').status_code == 201
+    response = submit()
+    assert response.status_code == 409
+    assert response.get_json()['duplicate_of'] == first
+
+
+def test_clusters_report_shared_pictures_separately(app, submit):
+    picture = picture_bytes()
+    sara = submit(picture=picture).get_json()['admission_id']
+    other = submit(picture=picture, name='Third Person', phone='01555554444').get_json()['admission_id']
+    again = submit(name='Third Person', phone='01555554444').get_json()['admission_id']
+    with app.app_context():
+        clusters = app_module.find_duplicate_clusters()
+        assert clusters == [[other, again]]
+        assert app_module.find_shared_picture_clusters(clusters) == [[sara, other]]
+
+
+def test_unknown_policy_stops_startup(tmp_path):
+    env = dict(os.environ, DUPLICATE_POLICY='merg', DATABASE_URL=f"sqlite:///{tmp_path / 'a.db'}")
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode != 0
+    assert 'DUPLICATE_POLICY must be one of' in result.stderr
@@ -0,0 +1,79 @@
+"""Schema migrations applied to a database created by the first release"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, app_module
+
+# The admission table as the first release created it, before schema_version
+BASELINE_SCHEMA = """
+CREATE TABLE admission (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(120) NOT NULL,
+    phone VARCHAR(20) NOT NULL,
+    workplace VARCHAR(200) NOT NULL,
+    nationality VARCHAR(100) NOT NULL,
+    activity VARCHAR(200) NOT NULL,
+    picture VARCHAR(300),
+    picture_hash VARCHAR(64),
+    submission_date DATETIME,
+    ip_address VARCHAR(50),
+    status VARCHAR(20),
+    notes TEXT,
+    archived BOOLEAN
+)
+"""
+
+
+@pytest.fixture
+def baseline_env(tmp_path):
+    """Environment for a subprocess pointed at a populated first-release database"""
+    path = tmp_path / 'admissions.db'
+    conn = sqlite3.connect(path)
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO admission (name, phone, workplace, nationality, activity, submission_date, status, archived) "
+        "VALUES (?, ?, 'Cairo Office', 'Egyptian', 'Volunteering', '2024-05-01 10:00:00', 'submitted', ?)",
+        [('Sara Ali', '01012345678', 0), ('Omar Said', '01198765432', 1), ('Mona Adel', '01234567890', 0)],
+    )
+    conn.commit()
+    conn.close()
+    return dict(os.environ, DATABASE_URL=f'sqlite:///{path}', MIGRATION_LOCK=str(tmp_path / 'migrate.lock'))
+
+
+def run(env, *args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def test_import_refuses_an_outdated_schema(baseline_env):
+    result = run(baseline_env, '-c', 'import app')
+    assert result.returncode != 0
+    assert 'run `flask --app app migrate`' in result.stderr
+
+
+def test_migrate_upgrades_and_keeps_rows(baseline_env):
+    result = run(baseline_env, '-m', 'flask', '--app', 'app', 'migrate')
+    assert result.returncode == 0, result.stderr
+    assert f'Schema is at version {app_module.SCHEMA_VERSION}' in result.stdout
+
+    check = run(baseline_env, '-c', (
+        "import app\n"
+        "with app.app.app_context():\n"
+        "    search = app.search_subquery('omar')\n"
+        "    print(app.db.session.query(search.c.id).scalar(),\n"
+        "          app.Admission.query.count(),\n"
+        "          app.db.session.query(app.db.func.sum(app.AdmissionStat.count))\n"
+        "          .filter(app.AdmissionStat.dimension == 'status', app.AdmissionStat.archived.is_(True)).scalar())\n"
+    ))
+    assert check.returncode == 0, check.stderr
+    assert check.stdout.split() == ['2', '3', '1']
+
+
+def test_migrate_is_idempotent(baseline_env):
+    assert run(baseline_env, '-m', 'flask', '--app', 'app', 'migrate').returncode == 0
+    result = run(baseline_env, '-m', 'flask', '--app', 'app', 'migrate')
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.count('\n') == app_module.SCHEMA_VERSION + 1
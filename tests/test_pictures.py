@@ -0,0 +1,84 @@
+"""Picture release: shared files survive, busy locks defer cleanup to the sweep"""
+import os
+import shutil
+import time
+
+import pytest
+
+from conftest import app_module, picture_bytes
+
+Admission = app_module.Admission
+fcntl = pytest.importorskip('fcntl')
+
+
+@pytest.fixture
+def pictures(app):
+    app.config['PICTURE_LOCK_RETRIES'] = 1
+    app.config['PICTURE_LOCK_RETRY_DELAY'] = 0.01
+    shutil.rmtree(os.path.join(app.config['UPLOAD_FOLDER'], '.release-pending'), ignore_errors=True)
+    return app
+
+
+def stored_picture(app, admission_id):
+    with app.app_context():
+        picture = app_module.db.session.get(Admission, admission_id).picture
+    return os.path.join(app.config['UPLOAD_FOLDER'], picture)
+
+
+def pending_releases(app):
+    directory = os.path.join(app.config['UPLOAD_FOLDER'], '.release-pending')
+    return [name for name in os.listdir(directory) if name.endswith('.json')] if os.path.isdir(directory) else []
+
+
+def hold_pin(app):
+    """A shared picture lock on its own file, as a concurrent submission holds it"""
+    lock_file = open(os.path.join(app.config['UPLOAD_FOLDER'], '.pictures.lock'), 'a')
+    fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+    return lock_file
+
+
+def test_delete_keeps_picture_shared_with_another_admission(pictures, submit, admin):
+    picture = picture_bytes('blue')
+    first = submit(picture=picture).get_json()['admission_id']
+    submit(picture=picture, name='Other Person', phone='01555554444')
+    filepath = stored_picture(pictures, first)
+
+    assert admin.delete(f'/api/admissions/{first}').status_code == 200
+    assert os.path.exists(filepath)
+
+
+def test_busy_lock_defers_release_to_sweep(pictures, submit, admin):
+    admission_id = submit(picture=picture_bytes('green')).get_json()['admission_id']
+    filepath = stored_picture(pictures, admission_id)
+
+    with hold_pin(pictures):
+        started = time.monotonic()
+        assert admin.delete(f'/api/admissions/{admission_id}').status_code == 200
+        assert time.monotonic() - started < 2
+        assert os.path.exists(filepath)
+        assert len(pending_releases(pictures)) == 1
+
+        # Still busy: the sweep records it again instead of waiting
+        with pictures.app_context():
+            assert app_module.sweep_picture_releases() == 1
+        assert len(pending_releases(pictures)) == 1
+
+    with pictures.app_context():
+        assert app_module.sweep_picture_releases() == 1
+    assert not os.path.exists(filepath)
+    assert pending_releases(pictures) == []
+
+
+def test_sweep_keeps_picture_referenced_again(pictures, submit, admin):
+    picture = picture_bytes('yellow')
+    admission_id = submit(picture=picture).get_json()['admission_id']
+    filepath = stored_picture(pictures, admission_id)
+    with hold_pin(pictures):
+        admin.delete(f'/api/admissions/{admission_id}')
+    # The same picture is submitted again before the sweep runs
+    submit(picture=picture, name='Later Person', phone='01555553333')
+
+    with pictures.app_context():
+        app_module.sweep_picture_releases()
+    assert os.path.exists(filepath)
+    assert pending_releases(pictures) == []
@@ -0,0 +1,108 @@
+"""Submission rate limits, client addresses and the upload slot cap"""
+import io
+
+import pytest
+
+from conftest import app_module, picture_bytes
+
+
+@pytest.fixture
+def limited(app):
+    """Rate limiting on, with empty limiter state and a tight per-IP bucket"""
+    conn = app_module.rate_limiter.connection()
+    for table in ('bucket', 'slot', 'limiter_stat'):
+        conn.execute(f"DELETE FROM {table}")
+    app.config['RATE_LIMIT_ENABLED'] = True
+    app.config['RATE_LIMIT_PER_IP'] = (0.001, 2)
+    app.config['RATE_LIMIT_GLOBAL'] = (1000.0, 1000)
+    return app
+
+
+def post_from(client, ip, headers=None, **fields):
+    data = {
+        'name': 'Sara Ali',
+        'phone': '01012345678',
+        'workplace': 'Cairo Office',
+        'nationality': 'Egyptian',
+        'activity': 'Volunteering',
+    }
+    data.update(fields)
+    return client.post('/api/submit-admission', data=data, content_type='multipart/form-data',
+                       headers=headers or {}, environ_base={'REMOTE_ADDR': ip})
+
+
+def test_bucket_refills_at_rate(limited):
+    limiter = app_module.rate_limiter
+    allowed, retry_after = limiter.consume('test', 'slow', 0.5, 1)
+    assert allowed
+    allowed, retry_after = limiter.consume('test', 'slow', 0.5, 1)
+    assert not allowed
+    assert 0 < retry_after <= 2
+
+
+def test_per_ip_limit_returns_429_with_retry_after(limited):
+    client = limited.test_client()
+    assert post_from(client, '10.0.0.1', phone='01011111111').status_code == 201
+    assert post_from(client, '10.0.0.1', phone='01011111112').status_code == 201
+    response = post_from(client, '10.0.0.1', phone='01011111113')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    # A different address has its own bucket
+    assert post_from(client, '10.0.0.2', phone='01011111114').status_code == 201
+
+
+def test_forwarded_for_ignored_without_trusted_proxy(limited):
+    assert limited.config['TRUSTED_PROXY_COUNT'] == 0
+    client = limited.test_client()
+    for n in range(2):
+        spoofed = {'X-Forwarded-For': f'192.0.2.{n}'}
+        assert post_from(client, '10.0.0.3', spoofed, phone=f'0102222222{n}').status_code == 201
+    response = post_from(client, '10.0.0.3', {'X-Forwarded-For': '192.0.2.9'}, phone='01022222229')
+    assert response.status_code == 429
+
+
+def test_forwarded_for_used_behind_trusted_proxy(limited):
+    limited.config['TRUSTED_PROXY_COUNT'] = 1
+    client = limited.test_client()
+    for n in range(3):
+        # The proxy appends the real client; anything left of it is client-supplied
+        headers = {'X-Forwarded-For': f'203.0.113.99, 198.51.100.{n}'}
+        assert post_from(client, '10.0.0.4', headers, phone=f'0103333333{n}').status_code == 201
+
+
+def test_slots_cap_concurrency(limited):
+    limiter = app_module.rate_limiter
+    first = limiter.acquire_slot('test_slots', 2, 60)
+    second = limiter.acquire_slot('test_slots', 2, 60)
+    assert first and second
+    assert limiter.acquire_slot('test_slots', 2, 60) is None
+    limiter.release_slot(first)
+    assert limiter.acquire_slot('test_slots', 2, 60) is not None
+
+
+def test_expired_slots_are_reclaimed(limited):
+    limiter = app_module.rate_limiter
+    assert limiter.acquire_slot('test_slots', 1, -1) is not None  # already expired
+    assert limiter.acquire_slot('test_slots', 1, 60) is not None
+
+
+def test_text_only_submission_skips_upload_slot(limited):
+    limited.config['MAX_CONCURRENT_UPLOADS'] = 0
+    client = limited.test_client()
+    assert post_from(client, '10.0.0.5').status_code == 201
+    stats = app_module.rate_limiter.stats()
+    assert 'upload_slots' not in stats
+
+
+def test_picture_submission_takes_upload_slot(limited):
+    limited.config['MAX_CONCURRENT_UPLOADS'] = 0
+    client = limited.test_client()
+    response = post_from(client, '10.0.0.6', picture=(io.BytesIO(picture_bytes()), 'photo.jpg'))
+    assert response.status_code == 429
+    assert app_module.rate_limiter.stats()['upload_slots'] == {'hits': 0, 'rejects': 1}
+
+    limited.config['MAX_CONCURRENT_UPLOADS'] = 1
+    response = post_from(client, '10.0.0.6', picture=(io.BytesIO(picture_bytes()), 'photo.jpg'))
+    assert response.status_code == 201
+    assert app_module.rate_limiter.stats()['upload_slots'] == {'hits': 1, 'rejects': 1}
+    assert app_module.rate_limiter.connection().execute("SELECT count(*) FROM slot").fetchone()[0] == 0
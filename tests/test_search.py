@@ -0,0 +1,52 @@
+"""Full-text search, including partial phone numbers and writes from other tools"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import ROOT, STORAGE, app_module
+
+
+def search(admin, q):
+    response = admin.get('/api/admissions', query_string={'q': q, 'archived': 'all'})
+    assert response.status_code == 200
+    return [item['id'] for item in response.get_json()['items']]
+
+
+def test_partial_phone_numbers_match(admin, submit):
+    sara = submit(phone='+20 101 234 5678').get_json()['admission_id']
+    for q in ['1012345678', '0101 234', '234 5678', '+20 101-234']:
+        assert search(admin, q) == [sara], q
+
+
+def test_search_follows_orm_updates(app, admin, submit):
+    app.config['DUPLICATE_POLICY'] = 'merge'
+    sara = submit(workplace='Cairo Office').get_json()['admission_id']
+    submit(workplace='Giza Branch')
+    assert search(admin, 'giza') == [sara]
+    assert search(admin, 'cairo') == []
+
+
+def test_triggers_need_no_app_functions(app):
+    with app.app_context():
+        triggers = app_module.db.session.execute(app_module.db.text(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'admission_fts%'")).scalars().all()
+    assert len(triggers) == 3
+    assert not any('search_normalize' in sql or 'phone_search_tokens' in sql for sql in triggers)
+
+
+def test_foreign_writes_are_searchable_after_rebuild(app, admin):
+    conn = sqlite3.connect(os.path.join(STORAGE, 'admissions.db'))  # no app SQL functions registered
+    conn.execute(
+        "INSERT INTO admission (name, phone, workplace, nationality, activity, status, archived) "
+        "VALUES ('Yousef Nabil', '01099990000', 'Alexandria Port', 'Egyptian', 'Teaching', 'submitted', 0)")
+    conn.commit()
+    conn.close()
+    assert search(admin, 'alexandria') == []
+
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'rebuild-search'],
+                            cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    app_module.response_cache.clear()
+    assert len(search(admin, 'alexandria')) == 1
+    assert len(search(admin, '9999')) == 1
@@ -0,0 +1,121 @@
+"""Resumable uploads: create, chunked PUTs, finalize, claim and unclaim"""
+import os
+
+from conftest import app_module, picture_bytes
+
+Admission = app_module.Admission
+
+
+def start_upload(client, data, filename='photo.jpg'):
+    response = client.post('/api/uploads', json={'filename': filename, 'size': len(data)})
+    assert response.status_code == 201
+    return response.get_json()['upload_id']
+
+
+def put_chunk(client, upload_id, offset, chunk):
+    return client.put(f'/api/uploads/{upload_id}?offset={offset}', data=chunk,
+                      content_type='application/octet-stream')
+
+
+def upload_picture(client, data):
+    """Send data in two chunks and finalize; returns the upload token"""
+    upload_id = start_upload(client, data)
+    half = len(data) // 2
+    assert put_chunk(client, upload_id, 0, data[:half]).get_json()['offset'] == half
+    assert put_chunk(client, upload_id, half, data[half:]).get_json()['offset'] == len(data)
+    response = client.post(f'/api/uploads/{upload_id}/finalize')
+    assert response.status_code == 200
+    return response.get_json()['upload_token']
+
+
+def test_create_rejects_bad_requests(client):
+    assert client.post('/api/uploads', json={'filename': 'notes.txt', 'size': 10}).status_code == 400
+    assert client.post('/api/uploads', json={'filename': 'photo.jpg', 'size': 0}).status_code == 400
+    assert client.post('/api/uploads', json={'filename': 'photo.jpg', 'size': True}).status_code == 400
+    assert client.get('/api/uploads/unknown').status_code == 404
+
+
+def test_out_of_order_chunk_reports_offset_to_resume(client):
+    data = picture_bytes('orange')
+    upload_id = start_upload(client, data)
+    assert put_chunk(client, upload_id, 0, data[:100]).status_code == 200
+
+    # A retried first chunk and a gap both get 409 with the real offset
+    for offset in (0, 200):
+        response = put_chunk(client, upload_id, offset, data[offset:offset + 100])
+        assert response.status_code == 409
+        assert response.get_json()['offset'] == 100
+
+    status = client.get(f'/api/uploads/{upload_id}').get_json()
+    assert status['offset'] == 100 and not status['finalized']
+    assert put_chunk(client, upload_id, 100, data[100:] + b'extra').status_code == 400
+
+
+def test_finalize_requires_every_byte(client):
+    data = picture_bytes('orange')
+    upload_id = start_upload(client, data)
+    put_chunk(client, upload_id, 0, data[:100])
+    response = client.post(f'/api/uploads/{upload_id}/finalize')
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 100
+
+
+def test_finalize_rejects_non_images(client):
+    data = b'not an image at all'
+    upload_id = start_upload(client, data)
+    put_chunk(client, upload_id, 0, data)
+    assert client.post(f'/api/uploads/{upload_id}/finalize').status_code == 400
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+
+def test_finalized_upload_is_frozen_and_finalize_is_idempotent(client):
+    data = picture_bytes('orange')
+    token = upload_picture(client, data)
+    assert put_chunk(client, token, len(data), b'x').status_code == 409
+    again = client.post(f'/api/uploads/{token}/finalize').get_json()
+    assert again['upload_token'] == token
+    assert client.get(f'/api/uploads/{token}').get_json()['finalized']
+
+
+def test_submit_claims_upload_and_retry_reuses_it(app, client, submit):
+    token = upload_picture(client, picture_bytes('teal'))
+    first = submit(upload_token=token, submission_id='a' * 32)
+    assert first.status_code == 201
+    admission_id = first.get_json()['admission_id']
+    with app.app_context():
+        picture = app_module.db.session.get(Admission, admission_id).picture
+    assert os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], picture))
+
+    # A retry of the same submission presents the claimed token again
+    retry = submit(upload_token=token, submission_id='a' * 32)
+    assert retry.status_code in (200, 201)
+    assert retry.get_json()['admission_id'] == admission_id
+
+
+def test_failed_submit_unclaims_upload_for_retry(app, client, submit, monkeypatch):
+    token = upload_picture(client, picture_bytes('navy'))
+    record_change = app_module.record_change
+
+    def fail_once(*args, **kwargs):
+        monkeypatch.setattr(app_module, 'record_change', record_change)
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(app_module, 'record_change', fail_once)
+
+    assert submit(upload_token=token).status_code == 500
+    with app.app_context():
+        data_path, _, meta = app_module.load_upload_session(token)
+    assert not meta.get('claimed')
+    assert os.path.exists(data_path)
+
+    response = submit(upload_token=token)
+    assert response.status_code == 201
+    with app.app_context():
+        assert app_module.db.session.get(Admission, response.get_json()['admission_id']).picture_hash
+
+
+def test_unfinalized_token_is_refused(client, submit):
+    data = picture_bytes('olive')
+    upload_id = start_upload(client, data)
+    put_chunk(client, upload_id, 0, data)
+    response = submit(upload_token=upload_id)
+    assert response.status_code == 400